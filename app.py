@@ -1,25 +1,52 @@
 # inventory_app/app.py
 from flask import Flask
-from routes.inventory import inventory_bp
-from routes.trailer_assignment import trailer_assignment_bp
-from routes.billing import billing_bp
-from routes.orders import orders_bp
-from database import init_db
+from database import db, init_db
 
-app = Flask(__name__)
-app.config.from_object('config.Config')
 
-init_db(app)
+def create_app(config_object='config.Config', **overrides):
+    """
+    Build the Flask app. Schema checks, column migrations and seed loading
+    run here, so under `gunicorn --preload` (see gunicorn.conf.py) they run
+    once in the master and workers fork with everything already loaded.
+    """
+    from routes.inventory import inventory_bp
+    from routes.trailer_assignment import trailer_assignment_bp
+    from routes.billing import billing_bp
+    from routes.orders import orders_bp
+    from routes.exports import exports_bp
+    from routes.health import health_bp
+    from routes.changes import changes_bp
+    from utils.stock_ledger import snapshot_stock_command
+    from utils.perf_seed import seed_perf_command
+    from utils.archive import archive_trailers_command
+    from utils.revenue_rollup import rebuild_revenue_rollup_command
+    from utils.reorder_forecast import forecast_reorder_command
+    from utils.change_log import prune_change_log_command
 
-# Register routes
-app.register_blueprint(inventory_bp)
-app.register_blueprint(trailer_assignment_bp)
-app.register_blueprint(billing_bp)
-app.register_blueprint(orders_bp)
+    app = Flask(__name__)
+    app.config.from_object(config_object)
+    app.config.update(overrides)
 
-from database import db 
+    init_db(app)
 
-__all__ = ['app', 'db']
+    # Register routes
+    for bp in (inventory_bp, trailer_assignment_bp, billing_bp, orders_bp, exports_bp, health_bp, changes_bp):
+        app.register_blueprint(bp)
+
+    # CLI commands (run via `flask --app app <command>`)
+    app.cli.add_command(snapshot_stock_command)
+    app.cli.add_command(seed_perf_command)
+    app.cli.add_command(archive_trailers_command)
+    app.cli.add_command(rebuild_revenue_rollup_command)
+    app.cli.add_command(forecast_reorder_command)
+    app.cli.add_command(prune_change_log_command)
+
+    return app
+
+
+app = create_app()
+
+__all__ = ['app', 'create_app', 'db']
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,319 @@
+# benchmarks/load_test.py
+"""
+Load-test / latency benchmark for every blueprint.
+
+Boots the app in-process against a throwaway SQLite file (default) or a
+Postgres URL, seeds a configurable dataset with the `flask seed-perf`
+generator, then drives a weighted mix of realistic requests from N
+threads. Reports p50/p95/p99 latency, throughput and SQL queries per
+request for each endpoint, and writes the run to JSON so results can be
+compared over time.
+
+    python -m benchmarks.load_test --requests 2000 --concurrency 4
+    python -m benchmarks.load_test --db-url postgresql+psycopg2://... --trailers 5000
+    python -m benchmarks.load_test --base-url http://localhost:8000   # over real HTTP
+
+With --base-url the app is not booted or seeded (point it at a server
+already loaded with data) and queries/request is not available.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+# ---------- App boot + seed ----------
+def build_app(db_url):
+    """The shipped app factory (app.create_app) against `db_url`, invoice files in a temp dir."""
+    # app.py also builds its module-level app on import; point that one at the bench DB too
+    os.environ['DATABASE_URL'] = db_url
+    from app import create_app
+    import utils.invoice_generator as invoice_generator
+    from pathlib import Path
+
+    app = create_app(SQLALCHEMY_DATABASE_URI=db_url,
+                     INVOICE_OUTPUT_PATH=tempfile.mkdtemp(prefix='bench_invoices_'))
+    # Keep generated invoice files out of static/invoices
+    invoice_generator.OUTPUT_DIR = Path(app.config['INVOICE_OUTPUT_PATH'])
+    return app
+
+
+def seed(app, trailers, products, orders, seed_value):
+    """Load a dataset with the `flask seed-perf` generator. Returns ids used by scenarios."""
+    from database import db
+    from models import Trailer, WarehouseOrder
+    from utils.perf_seed import generate
+
+    with app.app_context():
+        generate(seed=seed_value, trailers=trailers, products=products, orders=orders)
+        trailer_rows = db.session.query(Trailer.id, Trailer.status, Trailer.tooling_list_name).all()
+        return {
+            'trailers': trailer_rows,
+            'completed': [t for t in trailer_rows if t[1] == 'Completed'],
+            'orders': [oid for (oid,) in db.session.query(WarehouseOrder.id)],
+        }
+
+
+def _import_workbook(rows, rng):
+    import openpyxl
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet('Products')
+    ws.append(['Item Number', 'Item Name', 'Quantity', 'Reorder Point', 'Unit Cost'])
+    for i in range(rows):
+        ws.append([f'IMP {i:06d}', f'Imported item {i}', rng.randint(0, 100), 5, round(rng.uniform(1, 99), 2)])
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+# ---------- Transports ----------
+class InProcessTransport:
+    """Flask test client per thread, with per-thread SQL query counting."""
+
+    def __init__(self, app):
+        from sqlalchemy import event
+        from database import db
+        self.app = app
+        self._local = threading.local()
+        with app.app_context():
+            engine = db.engine
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            self._local.queries = getattr(self._local, 'queries', 0) + 1
+
+    def request(self, method, path, data=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        self._local.queries = 0
+        resp = client.open(path, method=method, data=data)
+        resp.close()
+        return resp.status_code, self._local.queries
+
+
+class HttpTransport:
+    """Plain urllib against a running server; query counts are unavailable."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, data=None):
+        from werkzeug.test import EnvironBuilder
+        body, headers = None, {}
+        if data is not None:
+            env = EnvironBuilder(method=method, data=data).get_environ()
+            body = env['wsgi.input'].read()
+            headers['Content-Type'] = env['CONTENT_TYPE']
+        req = urllib.request.Request(self.base_url + path, data=body, method=method, headers=headers)
+        try:
+            with urllib.request.urlopen(req, timeout=60) as resp:
+                resp.read()
+                return resp.status, None
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+urllib.request.install_opener(urllib.request.build_opener(_NoRedirect))
+
+
+# ---------- Scenarios ----------
+def build_scenarios(ids, rng, import_rows):
+    """Return [(weight, name, fn() -> (method, path, data))]."""
+    from utils.tooling_lists import tooling_lists
+    trailers = ids['trailers'] or [(1, 'Pending', 'Standard Trailer')]
+    completed = ids['completed'] or trailers
+    orders = ids['orders'] or [1]
+    workbook = _import_workbook(import_rows, rng)
+
+    def submit_inventory():
+        tid, _, list_name = rng.choice(trailers)
+        data = {'submitted_by': 'bench'}
+        for item in tooling_lists.get(list_name, []):
+            num = item['Item Number']
+            data[f'{num}_item_name'] = item['Item Name']
+            data[f'{num}_category'] = item['Category']
+            roll = rng.random()
+            if roll < 0.1:
+                data[f'{num}_status_missing'] = 'Missing'
+                data[f'{num}_note_missing'] = str(rng.randint(1, 3))
+            elif roll < 0.15:
+                data[f'{num}_status_redtag'] = 'Red Tag'
+                data[f'{num}_note_redtag'] = '1'
+            else:
+                data[f'{num}_status_complete'] = 'Complete'
+        return 'POST', f'/trailer/{tid}/update', data
+
+    def submit_order():
+        names = [rng.choice(['4.5" grinder', 'Shackles 5/8"', 'Caution tape', 'mystery widget']) for _ in range(3)]
+        return 'POST', '/orders/new', {'requester_name': 'bench', 'item_name': names, 'quantity': ['1', '2', '3']}
+
+    return [
+        (20, 'inventory.dashboard',           lambda: ('GET', '/', None)),
+        (15, 'inventory.inventory_form',      lambda: ('GET', f'/trailer/{rng.choice(trailers)[0]}', None)),
+        (5,  'trailer_assignment.update',     submit_inventory),
+        (10, 'inventory.pull_list',           lambda: ('GET', f'/trailer/{rng.choice(completed)[0]}/pull-list', None)),
+        (5,  'inventory.view_invoices',       lambda: ('GET', '/invoices', None)),
+        (3,  'trailer_assignment.assign',     lambda: ('GET', '/assign_trailer', None)),
+        (10, 'billing.billing_dashboard',     lambda: ('GET', '/billing/', None)),
+        (5,  'billing.generate_billing_invoice', lambda: ('GET', f'/billing/invoice/{rng.choice(completed)[0]}', None)),
+        (5,  'billing.metrics',               lambda: ('GET', '/billing/metrics', None)),
+        (5,  'billing.warehouse_inventory',   lambda: ('GET', '/billing/warehouse', None)),
+        (3,  'billing.view_order',            lambda: ('GET', f'/billing/warehouse/orders/{rng.choice(orders)}', None)),
+        (1,  'billing.import_warehouse',      lambda: ('POST', '/billing/warehouse/import',
+                                                       {'file': (io.BytesIO(workbook), 'bench.xlsx')})),
+        (5,  'orders.orders_list',            lambda: ('GET', '/orders/', None)),
+        (3,  'orders.new_order',              submit_order),
+    ]
+
+
+# ---------- Runner ----------
+def _percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return None
+    k = max(0, min(len(sorted_vals) - 1, int(round(pct / 100.0 * len(sorted_vals) + 0.5)) - 1))
+    return sorted_vals[k]
+
+
+def run(transport, scenarios, total_requests, concurrency, rng_seed):
+    weights = [w for w, _, _ in scenarios]
+    samples = defaultdict(list)   # name -> [(ms, status, queries)]
+    lock = threading.Lock()
+    counter = {'left': total_requests}
+
+    def worker(worker_id):
+        rng = random.Random(rng_seed + worker_id)
+        while True:
+            with lock:
+                if counter['left'] <= 0:
+                    return
+                counter['left'] -= 1
+            _, name, make = rng.choices(scenarios, weights=weights)[0]
+            method, path, data = make()
+            start = time.perf_counter()
+            try:
+                status, queries = transport.request(method, path, data)
+            except Exception:
+                status, queries = 599, None
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            with lock:
+                samples[name].append((elapsed_ms, status, queries))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    endpoints = {}
+    for name, rows in sorted(samples.items()):
+        lat = sorted(ms for ms, _, _ in rows)
+        qs = [q for _, _, q in rows if q is not None]
+        endpoints[name] = {
+            'requests': len(rows),
+            'errors': sum(1 for _, status, _ in rows if status >= 400),
+            'p50_ms': round(_percentile(lat, 50), 2),
+            'p95_ms': round(_percentile(lat, 95), 2),
+            'p99_ms': round(_percentile(lat, 99), 2),
+            'mean_ms': round(sum(lat) / len(lat), 2),
+            'throughput_rps': round(len(rows) / wall, 2),
+            'queries_per_request': round(sum(qs) / len(qs), 2) if qs else None,
+        }
+    return {
+        'wall_seconds': round(wall, 3),
+        'total_requests': total_requests,
+        'throughput_rps': round(total_requests / wall, 2) if wall else None,
+        'endpoints': endpoints,
+    }
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def print_report(result):
+    print(f"{'endpoint':34} {'n':>6} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>8} {'q/req':>7}")
+    for name, r in result['endpoints'].items():
+        qpr = '-' if r['queries_per_request'] is None else f"{r['queries_per_request']:.1f}"
+        print(f"{name:34} {r['requests']:>6} {r['errors']:>5} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['throughput_rps']:>8.1f} {qpr:>7}")
+    print(f"total: {result['total_requests']} requests in {result['wall_seconds']}s "
+          f"({result['throughput_rps']} req/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db-url', help='database URL (default: temporary SQLite file)')
+    parser.add_argument('--base-url', help='benchmark a running server over HTTP instead of in-process')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--trailers', type=int, default=500)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--orders', type=int, default=300)
+    parser.add_argument('--import-rows', type=int, default=200)
+    parser.add_argument('--out', help='JSON results path (default: bench_results/<timestamp>.json)')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    dataset = {k: getattr(args, k) for k in ('trailers', 'products', 'orders', 'import_rows')}
+    if args.base_url:
+        transport = HttpTransport(args.base_url)
+        ids = {'trailers': [(i, 'Pending', 'Standard Trailer') for i in range(1, args.trailers + 1)],
+               'completed': [], 'orders': list(range(1, args.orders + 1))}
+        target = args.base_url
+    else:
+        db_url = args.db_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench_'), 'bench.db')
+        app = build_app(db_url)
+        t0 = time.perf_counter()
+        ids = seed(app, args.trailers, args.products, args.orders, args.seed)
+        print(f'seeded in {time.perf_counter() - t0:.1f}s ({db_url.split(":")[0]})')
+        transport = InProcessTransport(app)
+        target = db_url.split('://')[0]
+
+    scenarios = build_scenarios(ids, rng, args.import_rows)
+    result = run(transport, scenarios, args.requests, args.concurrency, args.seed)
+    result.update({
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_rev': _git_rev(),
+        'target': target,
+        'concurrency': args.concurrency,
+        'dataset': dataset,
+    })
+    print_report(result)
+
+    out = args.out or os.path.join(REPO_ROOT, 'bench_results',
+                                   f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, 'w') as fh:
+        json.dump(result, fh, indent=2)
+    print(f'results written to {out}')
+
+
+if __name__ == '__main__':
+    main()
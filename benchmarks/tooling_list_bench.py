@@ -0,0 +1,103 @@
+# benchmarks/tooling_list_bench.py
+"""
+Micro-benchmark: list-of-dicts tooling lists vs the indexed ToolingList.
+
+Replays what one form open + pull list + invoice computation does with a
+list (build the per-request item-number maps, group by category, look up
+every item) against each representation, and reports time and bytes
+allocated per request. The ToolingList is timed both built per request
+(construction included, as on a cache miss) and shared from the version
+cache. No database or app needed.
+
+    python -m benchmarks.tooling_list_bench
+    python -m benchmarks.tooling_list_bench --list "Semi Trailer" --iterations 5000
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+from itertools import groupby
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from utils.tooling_lists import ToolingList, normalize_list, tooling_lists  # noqa: E402
+
+
+def dict_request(raw, lookups):
+    """The pre-ToolingList path: copy/normalize, rebuild indexes and groups per request."""
+    items = normalize_list(raw)
+    expected_qty_map = {}
+    for item in items:
+        num = str(item.get('Item Number', '')).strip()
+        expected_qty_map[num] = int(item.get('Quantity', 0))
+    expected_map = {}
+    for item in items:
+        num = item.get('Item Number', '').strip()
+        expected_map[num] = {
+            'item_name': item.get('Item Name', ''),
+            'quantity': int(item.get('Quantity', 0)),
+            'category': (item.get('Category') or 'General').strip(),
+        }
+    groups = [(k, list(g)) for k, g in groupby(sorted(items, key=lambda d: d['Category']),
+                                                key=lambda d: d['Category'])]
+    total = 0
+    for num in lookups:
+        total += expected_qty_map.get(num, 0)
+    return total + len(groups) + len(expected_map)
+
+
+def compact_request(tl, lookups):
+    """ToolingList path: everything is prebuilt on the shared, immutable object."""
+    total = 0
+    for num in lookups:
+        total += tl.expected_qty(num)
+    return total + len(tl.groups) + len(tl.by_number)
+
+
+def built_request(name, raw, lookups):
+    """Cache miss: construct the ToolingList from the rows, then use it."""
+    return compact_request(ToolingList.from_dicts(name, raw), lookups)
+
+
+def _allocated(fn, *args):
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--list', default='Semi Trailer', choices=sorted(tooling_lists))
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    tl = tooling_lists[args.list]
+    raw = [dict(it) for it in tl]          # the old in-memory shape
+    lookups = [it.item_number for it in tl][::3]
+
+    assert dict_request(raw, lookups) == compact_request(tl, lookups)
+
+    assert built_request(args.list, raw, lookups) == compact_request(tl, lookups)
+
+    runs = [
+        ('list of dicts', dict_request, (raw, lookups)),
+        ('built/request', built_request, (args.list, raw, lookups)),
+        ('cached', compact_request, (tl, lookups)),
+    ]
+    print(f'{args.list}: {len(tl)} items, {len(lookups)} lookups/request, {args.iterations} iterations')
+    print(f'{"":14}{"us/request":>12}{"peak bytes/request":>22}')
+    seconds = {}
+    for label, fn, fn_args in runs:
+        seconds[label] = timeit.timeit(lambda: fn(*fn_args), number=args.iterations)
+        print(f'{label:14}{seconds[label] / args.iterations * 1e6:>12.1f}{_allocated(fn, *fn_args):>22,}')
+    print(f'speedup vs list of dicts: x{seconds["list of dicts"] / seconds["built/request"]:.1f} built per request, '
+          f'x{seconds["list of dicts"] / seconds["cached"]:.1f} cached')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,142 @@
 # inventory_app/database.py
+from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import text
+from flask_sqlalchemy.session import Session as _FlaskSession
+from sqlalchemy import event, func, inspect, text
+
+# Bind key of the optional read replica (DATABASE_REPLICA_URL)
+REPLICA_BIND = "replica"
+# session.info flag set by utils.db_routing.read_only for the current request
+REPLICA_INFO_KEY = "use_replica"
+
+
+class RoutingSession(_FlaskSession):
+    """
+    Sends plain SELECTs to the replica once a read-only route has set
+    REPLICA_INFO_KEY on the request's session. Flushes, DML, SELECT ... FOR
+    UPDATE, raw text and bare connection() calls always use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and self.info.get(REPLICA_INFO_KEY) and not self._flushing
+                and getattr(clause, "is_select", False) and getattr(clause, "_for_update_arg", None) is None):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+# Bump whenever ADDED_COLUMNS or the init_db migrations change; /readyz
+# reports not-ready until the database has been migrated to at least this.
+SCHEMA_VERSION = 8
+
+# Columns added after the first release: (table, column, DDL for ADD COLUMN)
+ADDED_COLUMNS = [
+    ("trailer", "ln_25s", "VARCHAR(120)"),
+    ("trailer", "notes", "TEXT"),
+    ("invoice", "billed", "BOOLEAN NOT NULL DEFAULT FALSE"),
+    ("invoice", "line_items_json", "TEXT"),
+    ("warehouse_order", "order_type", "VARCHAR(20) DEFAULT 'SALE'"),
+    ("warehouse_order", "billed", "BOOLEAN NOT NULL DEFAULT FALSE"),
+    ("warehouse_order", "order_total", "FLOAT DEFAULT 0.0"),
+    ("warehouse_order", "requester_name", "VARCHAR(100)"),
+    ("warehouse_order_line", "unit_price", "FLOAT DEFAULT 0.0"),
+    ("warehouse_order_line", "line_total", "FLOAT DEFAULT 0.0"),
+    ("trailer", "tooling_list_version_id", "INTEGER REFERENCES tooling_list_version(id)"),
+    ("trailer_archive", "tooling_list_version_id", "INTEGER REFERENCES tooling_list_version(id)"),
+    ("invoice", "billed_at", "TIMESTAMP"),
+    ("invoice_archive", "billed_at", "TIMESTAMP"),
+    ("warehouse_product", "category", "VARCHAR(50)"),
+    ("invoice", "billed_job_number", "VARCHAR(50)"),
+    ("invoice", "billed_list_name", "VARCHAR(100)"),
+    ("invoice_archive", "billed_job_number", "VARCHAR(50)"),
+    ("invoice_archive", "billed_list_name", "VARCHAR(100)"),
+]
+
+
+def _configure_sqlite(app, engine):
+    """WAL + tuned pragmas on every new SQLite connection, and savepoints that nest."""
+    cfg = app.config
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, connection_record):
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute(f"PRAGMA synchronous={cfg.get('SQLITE_SYNCHRONOUS', 'NORMAL')}")
+        cur.execute(f"PRAGMA cache_size=-{int(cfg.get('SQLITE_CACHE_SIZE_KB', 65536))}")
+        cur.execute(f"PRAGMA mmap_size={int(cfg.get('SQLITE_MMAP_SIZE', 268435456))}")
+        cur.execute(f"PRAGMA busy_timeout={int(cfg.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.execute("PRAGMA foreign_keys=ON")
+        cur.close()
+
+    @event.listens_for(engine, "savepoint")
+    def _begin_before_savepoint(conn, name):
+        # pysqlite only opens a transaction before DML, and a SAVEPOINT outside one starts
+        # its own that RELEASE commits; BEGIN first so it nests in the session's transaction.
+        # (Not SQLAlchemy's BEGIN-on-every-begin recipe: a read-first transaction could then
+        # not upgrade to a write once another worker commits, so concurrent writes would fail.)
+        if not conn.connection.dbapi_connection.in_transaction:
+            conn.exec_driver_sql("BEGIN")
+
+
+def _add_missing_columns(conn):
+    """Portable replacement for ADD COLUMN IF NOT EXISTS (SQLite lacks it)."""
+    insp = inspect(conn)
+    tables = set(insp.get_table_names())
+    existing = {}
+    for table, column, ddl in ADDED_COLUMNS:
+        if table not in tables:
+            continue
+        if table not in existing:
+            existing[table] = {c["name"] for c in insp.get_columns(table)}
+        if column not in existing[table]:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+            existing[table].add(column)
+
+
+def month_bucket(column):
+    """SQL expression truncating a timestamp to its month, for GROUP BY."""
+    if db.engine.dialect.name == "sqlite":
+        return func.strftime("%Y-%m-01", column)
+    return func.date_trunc("month", column)
+
+
+def as_month(value):
+    """Normalize a month_bucket() result (datetime or 'YYYY-MM-01' string) to a datetime."""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d")
+
+
+def _stamp_schema_version():
+    """Record SCHEMA_VERSION once migrations ran (never lowers it: an older build may boot mid-deploy)."""
+    from models import SchemaVersion
+    row = db.session.get(SchemaVersion, 1)
+    if row is None:
+        db.session.add(SchemaVersion(id=1, version=SCHEMA_VERSION))
+    elif row.version < SCHEMA_VERSION:
+        row.version = SCHEMA_VERSION
+    db.session.commit()
+
+
+def schema_version(conn):
+    """The schema version stamped in the database (None if never stamped)."""
+    return conn.execute(text("SELECT version FROM schema_version WHERE id = 1")).scalar()
 
-db = SQLAlchemy()
 
 def init_db(app):
+    replica_url = app.config.get("DATABASE_REPLICA_URL")
+    if replica_url:
+        app.config["SQLALCHEMY_BINDS"] = {**(app.config.get("SQLALCHEMY_BINDS") or {}), REPLICA_BIND: replica_url}
     db.init_app(app)
     with app.app_context():
-        from models import Trailer, InventoryResponse, Invoice, ItemPrice, WarehouseProduct, WarehouseOrder, WarehouseOrderLine, ToolingListItem, SpecialtyTool
+        if db.engine.dialect.name == "sqlite":
+            _configure_sqlite(app, db.engine)
+            db.engine.dispose()  # reconnect so the pragmas apply to every connection
+        from models import Trailer, InventoryResponse, Invoice, ItemPrice, WarehouseProduct, WarehouseOrder, WarehouseOrderLine, ToolingListItem, SpecialtyTool, StockMovement, StockSnapshot, ArchivedTrailer, ArchivedInventoryResponse, ArchivedInvoice, ToolingListVersion, ToolingListVersionItem, InvoiceLine, ArchivedInvoiceLine, SubmissionReceipt, SchemaVersion, BilledRevenueMonth, ReorderSuggestion, ItemPriceHistory, ChangeLog
         db.create_all()
 
         # Seed tooling list items from hardcoded lists if DB is empty
@@ -31,18 +160,8 @@ def init_db(app):
                     ))
             db.session.commit()
 
-        # Add new columns to existing tables if they don't exist yet
+        # Data fixes (portable SQL; run on every boot, all idempotent)
         migrations = [
-            "ALTER TABLE trailer ADD COLUMN IF NOT EXISTS ln_25s VARCHAR(120)",
-            "ALTER TABLE trailer ADD COLUMN IF NOT EXISTS notes TEXT",
-            "ALTER TABLE invoice ADD COLUMN IF NOT EXISTS billed BOOLEAN NOT NULL DEFAULT FALSE",
-            "ALTER TABLE invoice ADD COLUMN IF NOT EXISTS line_items_json TEXT",
-            "ALTER TABLE warehouse_order ADD COLUMN IF NOT EXISTS order_type VARCHAR(20) DEFAULT 'SALE'",
-            "ALTER TABLE warehouse_order ADD COLUMN IF NOT EXISTS billed BOOLEAN NOT NULL DEFAULT FALSE",
-            "ALTER TABLE warehouse_order ADD COLUMN IF NOT EXISTS order_total FLOAT DEFAULT 0.0",
-            "ALTER TABLE warehouse_order ADD COLUMN IF NOT EXISTS requester_name VARCHAR(100)",
-            "ALTER TABLE warehouse_order_line ADD COLUMN IF NOT EXISTS unit_price FLOAT DEFAULT 0.0",
-            "ALTER TABLE warehouse_order_line ADD COLUMN IF NOT EXISTS line_total FLOAT DEFAULT 0.0",
             # Remove legacy alias list names from DB; canonical names are Semi Trailer and Utility Trailer
             "DELETE FROM tooling_list_item WHERE list_name = 'Semi'",
             "DELETE FROM tooling_list_item WHERE list_name = 'Tool Trailer'",
@@ -54,8 +173,36 @@ def init_db(app):
             )""",
             # Normalize all warehouse_product item_numbers to uppercase
             "UPDATE warehouse_product SET item_number = UPPER(item_number)",
+            # Index for the version pin on databases that predate the column
+            "CREATE INDEX IF NOT EXISTS ix_trailer_tooling_list_version_id ON trailer (tooling_list_version_id)",
+            "CREATE INDEX IF NOT EXISTS ix_invoice_billed_at ON invoice (billed_at)",
+            "CREATE INDEX IF NOT EXISTS ix_invoice_archive_billed_at ON invoice_archive (billed_at)",
+            "CREATE INDEX IF NOT EXISTS ix_warehouse_product_category_item_name ON warehouse_product (category, item_name)",
         ]
         with db.engine.connect() as conn:
+            # Add new columns to existing tables if they don't exist yet
+            _add_missing_columns(conn)
             for sql in migrations:
                 conn.execute(text(sql))
             conn.commit()
+
+        # Pin already-started trailers to the list they were inventoried against
+        from utils.tooling_list_versions import backfill_trailer_versions
+        backfill_trailer_versions()
+
+        # Billed invoices from before invoice_line existed
+        from utils.invoice_lines import backfill_invoice_lines
+        backfill_invoice_lines()
+        from utils.revenue_rollup import backfill_rollup_keys, ensure_revenue_rollup
+        backfill_rollup_keys()
+        ensure_revenue_rollup()
+
+        # Pre-ledger stock levels, before any movement can be recorded against them
+        from utils.stock_ledger import backfill_opening_balances
+        backfill_opening_balances()
+
+        # Stored product categories (new column, or products written by raw SQL)
+        from utils.product_categories import backfill_product_categories
+        backfill_product_categories()
+
+        _stamp_schema_version()
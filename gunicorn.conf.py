@@ -0,0 +1,46 @@
+# gunicorn.conf.py — used by the Procfile (`gunicorn -c gunicorn.conf.py app:app`)
+"""
+Preforking setup.
+
+preload_app imports app.py once in the master: schema checks, migrations,
+seed loading and the hardcoded tooling lists happen there, and every
+worker forks with them already in memory. Before each fork the master
+closes its pooled DB connections (a socket shared across processes gets
+corrupted) and freezes the GC so the preloaded objects stay in shared
+copy-on-write pages instead of being dirtied by the workers' collectors.
+The master also runs utils.warmup.warm_up() first, and each worker opens
+its pool connections before accepting traffic (see /readyz).
+"""
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))  # up to EVENT_STREAMS_PER_WORKER held by SSE streams
+preload_app = True
+
+
+def when_ready(server):
+    # Fill caches once here so workers inherit them, then keep everything the
+    # app built so far (long-lived) out of collection
+    from app import app
+    from utils.warmup import warm_up
+    warm_up(app)
+    gc.collect()
+    gc.freeze()
+
+
+def pre_fork(server, worker):
+    from app import app
+    from database import db
+    with app.app_context():
+        for engine in db.engines.values():  # primary and replica, if configured
+            engine.dispose()
+
+
+def post_worker_init(worker):
+    # Runs in the worker before it accepts connections
+    from app import app
+    from utils.warmup import warm_pool
+    warm_pool(app)
@@ -27,6 +27,8 @@ class Trailer(db.Model):
 
     # Which predefined tooling list this trailer uses (e.g., "Standard Trailer", "Gang Box", etc.)
     tooling_list_name = db.Column(db.String(100), index=True)
+    # Immutable list version this trailer was inventoried against (pinned on first open/submit)
+    tooling_list_version_id = db.Column(db.Integer, db.ForeignKey('tooling_list_version.id'), nullable=True, index=True)
 
     foreman_name = db.Column(db.String(100))
     ln_25s = db.Column(db.String(120))
@@ -76,19 +78,77 @@ class Invoice(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     trailer_id = db.Column(db.Integer, db.ForeignKey('trailer.id'), index=True, nullable=False)
     file_path = db.Column(db.String(255))
-    billed = db.Column(db.Boolean, nullable=False, server_default='false', default=False)
+    billed = db.Column(db.Boolean, nullable=False, server_default=db.false(), default=False)
 
     # Snapshot of line items at time of billing (JSON). Once populated, invoice
     # prices are frozen and won't change when ItemPrice is updated.
     line_items_json = db.Column(db.Text, nullable=True)
+    # Same snapshot as rows (InvoiceLine) for SQL aggregation; set when billed
+    billed_at = db.Column(db.DateTime, nullable=True, index=True)
+    # Revenue rollup key at billing time, so unbilling reverses the same cell
+    # even if the trailer's job or list was edited in between
+    billed_job_number = db.Column(db.String(50), nullable=True)
+    billed_list_name = db.Column(db.String(100), nullable=True)
 
     # Timestamp (DB-side default)
     created_at = db.Column(db.DateTime, server_default=db.func.now(), nullable=False, index=True)
 
+    lines = db.relationship('InvoiceLine', backref='invoice', lazy=True, cascade='all, delete-orphan',
+                            passive_deletes=True, order_by='InvoiceLine.sort_order')
+
     def __repr__(self):
         return f"<Invoice id={self.id} trailer_id={self.trailer_id} created_at={self.created_at}>"
 
 
+class InvoiceLine(db.Model):
+    """One billed line of a trailer invoice (written by utils/invoice_lines.py when billed)."""
+    __tablename__ = 'invoice_line'
+    __table_args__ = (
+        db.Index('ix_invoice_line_item_number_billed_at', 'item_number', 'billed_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    invoice_id = db.Column(db.Integer, db.ForeignKey('invoice.id', ondelete='CASCADE'), index=True, nullable=False)
+    # Denormalized from the invoice so reports and archiving need no join
+    trailer_id = db.Column(db.Integer, index=True, nullable=False)
+    billed_at = db.Column(db.DateTime, index=True)
+    sort_order = db.Column(db.Integer, default=0)
+    item_number = db.Column(db.String(50))
+    item_name = db.Column(db.String(120))
+    category = db.Column(db.String(50))
+    expected_qty = db.Column(db.Integer, default=0)
+    missing_qty = db.Column(db.Integer, default=0)
+    redtag_qty = db.Column(db.Integer, default=0)
+    billable_qty = db.Column(db.Integer, default=0)
+    billable_unit = db.Column(db.String(10))
+    unit_price = db.Column(db.Float, default=0.0)
+    line_total = db.Column(db.Float, default=0.0)
+    note = db.Column(db.Text)
+
+    def __repr__(self):
+        return f"<InvoiceLine invoice_id={self.invoice_id} item={self.item_number!r} total={self.line_total}>"
+
+
+class BilledRevenueMonth(db.Model):
+    """Billed trailer revenue per month, job and tooling list (kept by utils/revenue_rollup.py)."""
+    __tablename__ = 'billed_revenue_month'
+    __table_args__ = (
+        db.UniqueConstraint('month', 'job_number', 'tooling_list_name', name='uq_billed_revenue_month_key'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Date, nullable=False, index=True)           # first day of the month
+    job_number = db.Column(db.String(50), nullable=False, default='')
+    job_name = db.Column(db.String(120))
+    tooling_list_name = db.Column(db.String(100), nullable=False, default='')
+    invoice_count = db.Column(db.Integer, nullable=False, default=0)
+    line_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<BilledRevenueMonth {self.month} job={self.job_number!r} list={self.tooling_list_name!r} ${self.revenue:.2f}>"
+
+
 class ItemPrice(db.Model):
     __tablename__ = 'item_price'
 
@@ -101,6 +161,25 @@ class ItemPrice(db.Model):
         return f"<ItemPrice item_number={self.item_number!r} price={self.price}>"
 
 
+class ItemPriceHistory(db.Model):
+    """Effective-dated prices from the import PRICES sheet (as-of lookups in utils/price_history.py)."""
+    __tablename__ = 'item_price_history'
+
+    id = db.Column(db.Integer, primary_key=True)
+    item_number = db.Column(db.String(50), nullable=False)      # uppercased
+    effective_from = db.Column(db.Date, nullable=False)
+    purchase_price = db.Column(db.Float, nullable=True)
+    sales_price = db.Column(db.Float, nullable=True)
+    imported_at = db.Column(db.DateTime, server_default=db.func.now(), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('item_number', 'effective_from', name='uq_item_price_history_item_effective'),
+    )
+
+    def __repr__(self):
+        return f"<ItemPriceHistory item={self.item_number!r} from={self.effective_from} cost={self.purchase_price}>"
+
+
 class SpecialtyTool(db.Model):
     __tablename__ = 'specialty_tool'
 
@@ -123,12 +202,75 @@ class WarehouseProduct(db.Model):
     quantity_on_hand = db.Column(db.Integer, default=0)
     reorder_point = db.Column(db.Integer, default=0)
     unit_cost = db.Column(db.Float, default=0.0)
+    # Resolved from tooling list items by item number (utils/product_categories.py)
+    category = db.Column(db.String(50), nullable=True)
     created_at = db.Column(db.DateTime, server_default=db.func.now(), nullable=False)
 
+    __table_args__ = (
+        db.Index('ix_warehouse_product_category_item_name', 'category', 'item_name'),
+    )
+
     def __repr__(self):
         return f"<WarehouseProduct item_number={self.item_number!r} qty={self.quantity_on_hand}>"
 
 
+class ReorderSuggestion(db.Model):
+    """Forecast reorder point/quantity per product (written by `flask forecast-reorder`, utils/reorder_forecast.py)."""
+    __tablename__ = 'reorder_suggestion'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('warehouse_product.id', ondelete='CASCADE'), primary_key=True)
+    daily_usage = db.Column(db.Float, nullable=False, default=0.0)    # recency-weighted units/day
+    usage_std = db.Column(db.Float, nullable=False, default=0.0)
+    reorder_point = db.Column(db.Integer, nullable=False, default=0)
+    order_qty = db.Column(db.Integer, nullable=False, default=0)
+    days_of_cover = db.Column(db.Float, nullable=True)                # on hand / daily usage at compute time
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+    product = db.relationship('WarehouseProduct')
+
+    def __repr__(self):
+        return f"<ReorderSuggestion product_id={self.product_id} rp={self.reorder_point} qty={self.order_qty}>"
+
+
+class StockMovement(db.Model):
+    """Append-only ledger of every change to WarehouseProduct.quantity_on_hand."""
+    __tablename__ = 'stock_movement'
+    __table_args__ = (
+        db.Index('ix_stock_movement_product_id_id', 'product_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # SET NULL so deleting a product keeps its history (item_number still identifies it)
+    product_id = db.Column(db.Integer, db.ForeignKey('warehouse_product.id', ondelete='SET NULL'), nullable=True)
+    item_number = db.Column(db.String(50), index=True)
+    delta = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(40), nullable=False)  # import, manual_edit, trailer_invoice, order_sale, ...
+    source_id = db.Column(db.Integer, nullable=True)   # invoice / order id that caused the movement
+    created_at = db.Column(db.DateTime, server_default=db.func.now(), nullable=False, index=True)
+
+    product = db.relationship('WarehouseProduct')
+
+    def __repr__(self):
+        return f"<StockMovement item={self.item_number!r} delta={self.delta} reason={self.reason!r}>"
+
+
+class StockSnapshot(db.Model):
+    """Periodic per-product stock level; `last_movement_id` is the ledger position it includes."""
+    __tablename__ = 'stock_snapshot'
+    __table_args__ = (
+        db.Index('ix_stock_snapshot_product_id_taken_at', 'product_id', 'taken_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('warehouse_product.id', ondelete='CASCADE'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    last_movement_id = db.Column(db.Integer, nullable=False, default=0)
+    taken_at = db.Column(db.DateTime, server_default=db.func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<StockSnapshot product_id={self.product_id} qty={self.quantity} taken_at={self.taken_at}>"
+
+
 class WarehouseOrder(db.Model):
     __tablename__ = 'warehouse_order'
 
@@ -175,3 +317,174 @@ class ToolingListItem(db.Model):
 
     def __repr__(self):
         return f"<ToolingListItem list={self.list_name!r} item={self.item_number!r}>"
+
+
+
+class ToolingListVersion(db.Model):
+    """Frozen copy of a tooling list; a new one is published whenever the list's contents change."""
+    __tablename__ = 'tooling_list_version'
+    __table_args__ = (
+        db.UniqueConstraint('list_name', 'version', name='uq_tooling_list_version_list_name_version'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    list_name = db.Column(db.String(100), nullable=False, index=True)
+    version = db.Column(db.Integer, nullable=False)
+    content_hash = db.Column(db.String(40), nullable=False)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, server_default=db.func.now(), nullable=False)
+
+    items = db.relationship('ToolingListVersionItem', lazy=True, cascade='all, delete-orphan',
+                            order_by='ToolingListVersionItem.sort_order')
+
+    def __repr__(self):
+        return f"<ToolingListVersion list={self.list_name!r} v{self.version}>"
+
+
+class ToolingListVersionItem(db.Model):
+    __tablename__ = 'tooling_list_version_item'
+    __table_args__ = (
+        db.Index('ix_tooling_list_version_item_version_id_sort_order', 'version_id', 'sort_order'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    version_id = db.Column(db.Integer, db.ForeignKey('tooling_list_version.id', ondelete='CASCADE'), nullable=False)
+    item_number = db.Column(db.String(50))
+    item_name = db.Column(db.String(120))
+    category = db.Column(db.String(50))
+    quantity = db.Column(db.Integer, default=0)
+    sort_order = db.Column(db.Integer, default=0)
+
+    def __repr__(self):
+        return f"<ToolingListVersionItem version_id={self.version_id} item={self.item_number!r}>"
+
+
+class SubmissionReceipt(db.Model):
+    """Result of an inventory submission, keyed by the form's idempotency key (see utils/idempotency.py)."""
+    __tablename__ = 'submission_receipt'
+
+    key = db.Column(db.String(64), primary_key=True)
+    trailer_id = db.Column(db.Integer, nullable=False)
+    endpoint = db.Column(db.String(80))
+    redirect_url = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, server_default=db.func.now(), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<SubmissionReceipt key={self.key!r} trailer_id={self.trailer_id}>"
+
+class ChangeLog(db.Model):
+    """Append-only change feed row, written in the same transaction as the change (utils/change_log.py)."""
+    __tablename__ = 'change_log'
+    __table_args__ = (
+        db.Index('ix_change_log_entity_id', 'entity', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)            # the feed cursor
+    entity = db.Column(db.String(40), nullable=False)       # trailer, invoice, warehouse_order, ...
+    entity_id = db.Column(db.Integer, nullable=True)
+    action = db.Column(db.String(20), nullable=False)       # insert, update, delete, billed, unbilled, ...
+    changed_fields = db.Column(db.JSON, nullable=True)      # column names, for updates
+    data = db.Column(db.JSON, nullable=True)                # row values after the change
+    created_at = db.Column(db.DateTime, server_default=db.func.now(), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ChangeLog {self.id} {self.entity}:{self.entity_id} {self.action}>"
+
+
+class SchemaVersion(db.Model):
+    """Single row: the schema level init_db last brought this database to (database.SCHEMA_VERSION)."""
+    __tablename__ = 'schema_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+    applied_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+
+
+# ---------- Archive tier (see utils/archive.py) ----------
+# Same columns and ids as the hot tables, plus archived_at. Written only by
+# the `archive-trailers` command; read by the billing archive pages.
+
+class ArchivedTrailer(db.Model):
+    __tablename__ = 'trailer_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    trailer_id = db.Column(db.String(64), index=True)
+    job_name = db.Column(db.String(120))
+    job_number = db.Column(db.String(50), index=True)
+    location = db.Column(db.String(120))
+    inventory_type = db.Column(db.String(50))
+    assigned_user = db.Column(db.String(80))
+    status = db.Column(db.String(50))
+    extra_tooling = db.Column(db.JSON)
+    tooling_list_name = db.Column(db.String(100))
+    tooling_list_version_id = db.Column(db.Integer, db.ForeignKey('tooling_list_version.id'), nullable=True)
+    foreman_name = db.Column(db.String(100))
+    ln_25s = db.Column(db.String(120))
+    notes = db.Column(db.Text)
+    archived_at = db.Column(db.DateTime, server_default=db.func.now(), nullable=False, index=True)
+
+    responses = db.relationship('ArchivedInventoryResponse', backref='trailer', lazy=True,
+                                order_by='ArchivedInventoryResponse.id')
+    invoices = db.relationship('ArchivedInvoice', backref='trailer', lazy=True,
+                               order_by='ArchivedInvoice.id')
+
+    def __repr__(self):
+        return f"<ArchivedTrailer id={self.id} job={self.job_name!r}>"
+
+
+class ArchivedInventoryResponse(db.Model):
+    __tablename__ = 'inventory_response_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    trailer_id = db.Column(db.Integer, db.ForeignKey('trailer_archive.id'), index=True, nullable=False)
+    item_number = db.Column(db.String(50))
+    item_name = db.Column(db.String(120))
+    status = db.Column(db.String(20))
+    note = db.Column(db.Text)
+    quantity = db.Column(db.Integer)
+    category = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<ArchivedInventoryResponse trailer_id={self.trailer_id} item={self.item_number!r}>"
+
+
+class ArchivedInvoice(db.Model):
+    __tablename__ = 'invoice_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    trailer_id = db.Column(db.Integer, db.ForeignKey('trailer_archive.id'), index=True, nullable=False)
+    file_path = db.Column(db.String(255))
+    billed = db.Column(db.Boolean, nullable=False, server_default=db.false(), default=False)
+    line_items_json = db.Column(db.Text, nullable=True)
+    billed_at = db.Column(db.DateTime, nullable=True, index=True)
+    billed_job_number = db.Column(db.String(50), nullable=True)
+    billed_list_name = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ArchivedInvoice id={self.id} trailer_id={self.trailer_id}>"
+
+
+class ArchivedInvoiceLine(db.Model):
+    __tablename__ = 'invoice_line_archive'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    invoice_id = db.Column(db.Integer, db.ForeignKey('invoice_archive.id'), index=True, nullable=False)
+    trailer_id = db.Column(db.Integer, index=True, nullable=False)
+    billed_at = db.Column(db.DateTime, index=True)
+    sort_order = db.Column(db.Integer, default=0)
+    item_number = db.Column(db.String(50), index=True)
+    item_name = db.Column(db.String(120))
+    category = db.Column(db.String(50))
+    expected_qty = db.Column(db.Integer, default=0)
+    missing_qty = db.Column(db.Integer, default=0)
+    redtag_qty = db.Column(db.Integer, default=0)
+    billable_qty = db.Column(db.Integer, default=0)
+    billable_unit = db.Column(db.String(10))
+    unit_price = db.Column(db.Float, default=0.0)
+    line_total = db.Column(db.Float, default=0.0)
+    note = db.Column(db.Text)
+
+    def __repr__(self):
+        return f"<ArchivedInvoiceLine invoice_id={self.invoice_id} item={self.item_number!r}>"
@@ -1,11 +1,16 @@
 # routes/billing.py
 from flask import (
     Blueprint, render_template, request, redirect, url_for,
-    flash, session, current_app, make_response, abort
+    flash, session, current_app, make_response, abort, jsonify
 )
-from models import ItemPrice, Trailer, InventoryResponse, WarehouseProduct, WarehouseOrder, WarehouseOrderLine, SpecialtyTool
-from database import db
-from utils.tooling_lists import get_tooling_list
+from models import ItemPrice, Trailer, InventoryResponse, WarehouseProduct, WarehouseOrder, WarehouseOrderLine, SpecialtyTool, BilledRevenueMonth, ReorderSuggestion
+from database import db, month_bucket, as_month
+from utils.tooling_list_versions import get_tooling_list_for_trailer, publish_version
+from utils import stock_ledger
+from utils.invoice_lines import bill_invoice, invoice_line_items
+from utils.product_index import get_item_index, auto_link_item_number
+from utils.db_routing import read_only
+from utils.price_history import sales_price, record_price_history, inventory_date
 from functools import wraps
 from collections import defaultdict
 from datetime import datetime
@@ -36,6 +41,7 @@ def logout():
 # ---------- Dashboard ----------
 @billing_bp.route('/')
 @billing_required
+@read_only
 def billing_dashboard():
     from models import Invoice as _Invoice
     from sqlalchemy import func
@@ -105,21 +111,11 @@ def billing_dashboard():
 # ---------- Pricing Management ----------
 
 # ---------- Shared helper: compute invoice line items from live DB ----------
-def _compute_line_items(trailer):
-    """Return (line_items, total) using current ItemPrice values."""
-    import json as _json
+def _compute_line_items(trailer, as_of=None):
+    """Return (line_items, total) priced at current cost, or at the prices in effect on `as_of` (a date)."""
+    from utils.price_history import prices_as_of
     responses = InventoryResponse.query.filter_by(trailer_id=trailer.id).all()
-    list_name = (trailer.tooling_list_name or trailer.inventory_type or '').strip()
-    tooling_list = get_tooling_list(list_name) or []
-
-    expected_map = {}
-    for item in tooling_list:
-        num = item.get('Item Number', '').strip()
-        expected_map[num] = {
-            'item_name': item.get('Item Name', ''),
-            'quantity': int(item.get('Quantity', 0)) if str(item.get('Quantity', 0)).isdigit() else 0,
-            'category': (item.get('Category') or 'General').strip(),
-        }
+    tooling_list = get_tooling_list_for_trailer(trailer)
 
     response_map = defaultdict(lambda: {'missing': 0, 'redtag': 0, 'note': ''})
     for r in responses:
@@ -133,19 +129,26 @@ def _compute_line_items(trailer):
             if r.note:
                 response_map[key]['note'] = r.note
 
-    # Sales price = purchase cost + 10% markup (key uppercased for case-insensitive lookup)
-    price_map = {p.item_number.strip().upper(): round(p.unit_cost * 1.10, 2) for p in WarehouseProduct.query.all()}
-
     # Items entered in rolls but billed by the pound (1 roll = 33 lbs)
     ROLL_TO_LBS = {
         'W .045X33 CS11',  # Coreshield Eleven
         'W .072X33 XLR8',  # XLR8 Wire
     }
 
+    billable = [num for num, resp in response_map.items() if resp['missing'] + resp['redtag'] > 0]
+    # Sales price = purchase cost x SALES_MARKUP (key uppercased for case-insensitive lookup)
+    if as_of is not None:
+        price_map = prices_as_of(billable, as_of)
+    else:
+        product_key = db.func.upper(db.func.trim(WarehouseProduct.item_number))
+        price_map = {num: sales_price(cost) for num, cost in
+                     db.session.query(product_key, WarehouseProduct.unit_cost)
+                     .filter(product_key.in_({(n or '').strip().upper() for n in billable}))}
+
     line_items = []
     total = 0.0
 
-    for num, info in expected_map.items():
+    for num, item in tooling_list.by_number.items():
         resp = response_map.get(num, {})
         missing_qty = resp.get('missing', 0)
         redtag_qty = resp.get('redtag', 0)
@@ -169,9 +172,9 @@ def _compute_line_items(trailer):
             note = (roll_note + ('  ' + note if note else ''))
         line_items.append({
             'item_number': num,
-            'item_name': info['item_name'],
-            'category': info.get('category', 'General'),
-            'expected_qty': info['quantity'],
+            'item_name': item.item_name,
+            'category': item.category,
+            'expected_qty': item.quantity,
             'missing_qty': missing_qty,
             'redtag_qty': redtag_qty,
             'billable_qty': billable_qty,
@@ -186,6 +189,19 @@ def _compute_line_items(trailer):
 
 
 # ---------- Generate Billing Invoice for a Trailer ----------
+def _price_as_of(trailer, raw):
+    """Parse the invoice pricing date: '' = current prices, 'inventory' = inventory date, or YYYY-MM-DD."""
+    raw = (raw or '').strip()
+    if not raw:
+        return None
+    if raw == 'inventory':
+        return inventory_date(trailer)
+    try:
+        return datetime.strptime(raw, '%Y-%m-%d').date()
+    except ValueError:
+        abort(400, 'price_as_of must be YYYY-MM-DD or "inventory"')
+
+
 @billing_bp.route('/invoice/<int:trailer_id>')
 @billing_required
 def generate_billing_invoice(trailer_id):
@@ -194,12 +210,16 @@ def generate_billing_invoice(trailer_id):
     trailer = Trailer.query.get_or_404(trailer_id)
     invoice = _Invoice.query.filter_by(trailer_id=trailer_id).order_by(_Invoice.id.desc()).first()
     is_billed = bool(invoice and invoice.billed)
+    price_as_of = None
 
-    if is_billed and invoice.line_items_json:
+    if is_billed and invoice.billed_at is not None:
+        line_items, total = invoice_line_items(invoice.id)
+    elif is_billed and invoice.line_items_json:
         line_items = _json.loads(invoice.line_items_json)
         total = sum(li['line_total'] for li in line_items)
     else:
-        line_items, total = _compute_line_items(trailer)
+        price_as_of = _price_as_of(trailer, request.args.get('price_as_of'))
+        line_items, total = _compute_line_items(trailer, as_of=price_as_of)
 
     return render_template(
         'billing_invoice.html',
@@ -208,37 +228,39 @@ def generate_billing_invoice(trailer_id):
         total=total,
         is_billed=is_billed,
         now=datetime.now,
+        price_as_of=price_as_of,
+        inventory_day=None if is_billed else inventory_date(trailer),
     )
 
 
 @billing_bp.route('/invoice/<int:trailer_id>/confirm', methods=['POST'])
 @billing_required
 def confirm_invoice(trailer_id):
-    import json as _json
     from models import Invoice as _Invoice
     trailer = Trailer.query.get_or_404(trailer_id)
 
     included_nums = set(request.form.getlist('include_item'))
 
-    # Recompute from live data, filter to only confirmed items
-    all_items, _ = _compute_line_items(trailer)
+    # Recompute from live data (at the previewed pricing date), filter to only confirmed items
+    all_items, _ = _compute_line_items(trailer, as_of=_price_as_of(trailer, request.form.get('price_as_of')))
     line_items = [item for item in all_items if item['item_number'] in included_nums]
     total = sum(item['line_total'] for item in line_items)
 
-    # Adjust warehouse stock
-    product_map = {p.item_number.upper(): p for p in WarehouseProduct.query.all()}
-    for item in line_items:
-        wp = product_map.get(item['item_number'].upper())
-        if wp:
-            wp.quantity_on_hand = max(0, wp.quantity_on_hand - item['billable_qty'])
-
     # Find or create invoice record, mark billed, snapshot line items
     invoice = _Invoice.query.filter_by(trailer_id=trailer_id).order_by(_Invoice.id.desc()).first()
     if not invoice:
         invoice = _Invoice(trailer_id=trailer_id)
         db.session.add(invoice)
-    invoice.billed = True
-    invoice.line_items_json = _json.dumps(line_items)
+        db.session.flush()
+    bill_invoice(invoice, line_items)
+
+    # Adjust warehouse stock (ledger rows reference the invoice)
+    product_map = {p.item_number.upper(): p for p in WarehouseProduct.query.all()}
+    for item in line_items:
+        wp = product_map.get(item['item_number'].upper())
+        if wp:
+            stock_ledger.set_quantity(wp, max(0, wp.quantity_on_hand - item['billable_qty']),
+                                      stock_ledger.TRAILER_INVOICE, source_id=invoice.id)
 
     db.session.commit()
     flash('Invoice confirmed and billed. Warehouse stock updated.', 'success')
@@ -246,38 +268,119 @@ def confirm_invoice(trailer_id):
 
 
 # ---------- Warehouse Stock ----------
+# Products per lazily loaded stock-page section request
+WAREHOUSE_PAGE_SIZE = 50
+# Typeahead matches considered when the stock page is searched
+WAREHOUSE_SEARCH_LIMIT = 500
+# Section key for products missing a name or price
+INCOMPLETE_SECTION = '__incomplete__'
+
+
+def _incomplete_filter():
+    return db.or_(WarehouseProduct.item_name.is_(None), db.func.trim(WarehouseProduct.item_name) == '',
+                  db.func.coalesce(WarehouseProduct.unit_cost, 0.0) == 0.0)
+
+
+def _stock_query(q):
+    """Products matching the stock page search (via the item index), or all of them."""
+    query = WarehouseProduct.query
+    if q:
+        ids = [m.ref_id for m in get_item_index().typeahead(q, limit=WAREHOUSE_SEARCH_LIMIT)]
+        query = query.filter(WarehouseProduct.id.in_(ids))
+    return query
+
+
 @billing_bp.route('/warehouse')
 @billing_required
 def warehouse_inventory():
-    from models import ToolingListItem
-    from collections import defaultdict as _dd
-    q = (request.args.get('q') or '').strip().lower()
-    products = WarehouseProduct.query.order_by(WarehouseProduct.item_name).all()
-    if q:
-        products = [p for p in products if q in (p.item_name or '').lower() or q in (p.item_number or '').lower()]
-    low_stock = [p for p in products if p.quantity_on_hand <= p.reorder_point]
-
-    # Build category map from tooling list items (item_number -> category)
-    cat_map = {}
-    for tli in ToolingListItem.query.all():
-        num = (tli.item_number or '').strip().upper()
-        if num and num not in cat_map:
-            cat_map[num] = (tli.category or 'Other').strip().replace('_', ' ').title()
-
-    incomplete = []
-    categorized = _dd(list)
-    for p in products:
-        missing_info = not (p.item_name and p.item_name.strip()) or p.unit_cost == 0.0
-        if missing_info:
-            incomplete.append(p)
-        else:
-            cat = cat_map.get((p.item_number or '').upper(), 'Other')
-            categorized[cat].append(p)
-
-    sorted_cats = sorted(categorized.items(), key=lambda x: x[0])
+    """Section headers and counts only; each section's rows load via warehouse_section."""
+    from utils.product_categories import DEFAULT_CATEGORY
+    q = (request.args.get('q') or '').strip()
+    base = _stock_query(q)
+    low_stock = base.filter(WarehouseProduct.quantity_on_hand <= WarehouseProduct.reorder_point).count()
+    incomplete = base.filter(_incomplete_filter()).count()
+    category = db.func.coalesce(WarehouseProduct.category, DEFAULT_CATEGORY)
+    sorted_cats = (base.filter(db.not_(_incomplete_filter()))
+                   .with_entities(category, db.func.count(WarehouseProduct.id))
+                   .group_by(category).order_by(category).all())
+
+    # Cached forecast (utils/reorder_forecast.py): products at or below their suggested reorder point
+    suggestions = (db.session.query(ReorderSuggestion, WarehouseProduct)
+                   .join(WarehouseProduct, WarehouseProduct.id == ReorderSuggestion.product_id)
+                   .filter(WarehouseProduct.quantity_on_hand <= ReorderSuggestion.reorder_point)
+                   .order_by(ReorderSuggestion.days_of_cover, WarehouseProduct.item_name)
+                   .all())
+    forecast_at = db.session.query(db.func.max(ReorderSuggestion.computed_at)).scalar()
     return render_template('billing_inventory.html',
                            sorted_cats=sorted_cats, incomplete=incomplete,
-                           low_stock=low_stock, q=q)
+                           low_stock=low_stock, q=q, incomplete_section=INCOMPLETE_SECTION,
+                           suggestions=suggestions, forecast_at=forecast_at)
+
+
+@billing_bp.route('/warehouse/section')
+@billing_required
+def warehouse_section():
+    """One page of a stock-page section as table rows (fetched by the page as it scrolls)."""
+    from utils.product_categories import DEFAULT_CATEGORY
+    q = (request.args.get('q') or '').strip()
+    section = (request.args.get('category') or '').strip() or DEFAULT_CATEGORY
+    query = _stock_query(q)
+    if section == INCOMPLETE_SECTION:
+        query = query.filter(_incomplete_filter())
+    else:
+        in_section = WarehouseProduct.category == section
+        if section == DEFAULT_CATEGORY:
+            in_section = db.or_(in_section, WarehouseProduct.category.is_(None))
+        query = query.filter(db.not_(_incomplete_filter()), in_section)
+    page = db.paginate(query.order_by(WarehouseProduct.item_name, WarehouseProduct.id),
+                       per_page=WAREHOUSE_PAGE_SIZE, error_out=False)
+    next_url = (url_for('billing.warehouse_section', category=section, q=q or None, page=page.next_num)
+                if page.has_next else None)
+    return render_template('billing_inventory_rows.html', products=page.items, next_url=next_url)
+
+
+@billing_bp.route('/warehouse/forecast', methods=['POST'])
+@billing_required
+def recompute_forecast():
+    from utils.reorder_forecast import compute_suggestions
+    count = compute_suggestions()
+    flash(f'Reorder forecast updated for {count} product(s) with recent usage.', 'success')
+    return redirect(url_for('billing.warehouse_inventory'))
+
+
+@billing_bp.route('/warehouse/forecast/apply', methods=['POST'])
+@billing_required
+def apply_forecast():
+    """Copy suggested reorder points onto the selected products (all listed if none selected)."""
+    from sqlalchemy import update
+    ids = [int(i) for i in request.form.getlist('product_id') if i.isdigit()]
+    q = db.session.query(ReorderSuggestion.product_id, ReorderSuggestion.reorder_point)
+    if ids:
+        q = q.filter(ReorderSuggestion.product_id.in_(ids))
+    from utils.change_log import record_bulk
+    rows = [{'id': pid, 'reorder_point': rp} for pid, rp in q]
+    if rows:
+        db.session.execute(update(WarehouseProduct), rows)  # bulk UPDATE by primary key
+        record_bulk('product', [r['id'] for r in rows], 'update', ['reorder_point'])
+        db.session.commit()
+    flash(f'Applied suggested reorder point to {len(rows)} product(s).', 'success')
+    return redirect(url_for('billing.warehouse_inventory'))
+
+
+@billing_bp.route('/warehouse/products/search')
+@billing_required
+def product_search():
+    """Typeahead JSON: prefix/substring matches on item number and name."""
+    q = (request.args.get('q') or '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit') or 20), 1), 50)
+    except ValueError:
+        limit = 20
+    matches = get_item_index().typeahead(q, limit=limit) if q else []
+    return jsonify(results=[
+        {'id': m.ref_id, 'item_number': m.item_number, 'item_name': m.item_name}
+        for m in matches
+    ])
 
 
 @billing_bp.route('/warehouse/product/<int:product_id>/edit', methods=['GET', 'POST'])
@@ -286,7 +389,8 @@ def edit_product(product_id):
     product = WarehouseProduct.query.get_or_404(product_id)
     if request.method == 'POST':
         product.item_name = request.form.get('item_name', product.item_name)
-        product.quantity_on_hand = int(request.form.get('quantity_on_hand', 0) or 0)
+        stock_ledger.set_quantity(product, int(request.form.get('quantity_on_hand', 0) or 0),
+                                  stock_ledger.MANUAL_EDIT)
         product.reorder_point = int(request.form.get('reorder_point', 0) or 0)
         try:
             product.unit_cost = float(request.form.get('unit_cost', 0) or 0)
@@ -302,6 +406,7 @@ def edit_product(product_id):
 @billing_required
 def delete_product(product_id):
     product = WarehouseProduct.query.get_or_404(product_id)
+    stock_ledger.set_quantity(product, 0, stock_ledger.PRODUCT_DELETE)
     db.session.delete(product)
     db.session.commit()
     flash(f'Removed {product.item_number}.', 'info')
@@ -322,11 +427,12 @@ def add_product():
     p = WarehouseProduct(
         item_number=item_number,
         item_name=(request.form.get('item_name') or '').strip(),
-        quantity_on_hand=int(request.form.get('quantity_on_hand', 0) or 0),
+        quantity_on_hand=0,
         reorder_point=int(request.form.get('reorder_point', 0) or 0),
         unit_cost=float(request.form.get('unit_cost', 0) or 0),
     )
     db.session.add(p)
+    stock_ledger.set_quantity(p, int(request.form.get('quantity_on_hand', 0) or 0), stock_ledger.MANUAL_ADD)
     db.session.commit()
     flash('Product added.', 'success')
     return redirect(url_for('billing.warehouse_inventory'))
@@ -335,6 +441,7 @@ def add_product():
 # ---------- Warehouse Orders ----------
 @billing_bp.route('/warehouse/orders')
 @billing_required
+@read_only
 def warehouse_orders():
     status_filter = request.args.get('status', '')
     q = WarehouseOrder.query.order_by(WarehouseOrder.created_at.desc())
@@ -381,7 +488,8 @@ def new_order():
                 qty = 0
             if qty <= 0:
                 continue
-            db.session.add(WarehouseOrderLine(order_id=order.id, item_name=name, quantity=qty))
+            db.session.add(WarehouseOrderLine(order_id=order.id, item_name=name, quantity=qty,
+                                              item_number=auto_link_item_number(name)))
             any_added = True
 
         if not any_added:
@@ -403,8 +511,14 @@ def new_order():
 def view_order(order_id):
     order = WarehouseOrder.query.get_or_404(order_id)
     trailer = Trailer.query.get(order.trailer_id) if order.trailer_id else None
-    products = WarehouseProduct.query.order_by(WarehouseProduct.item_name).all() if not order.billed else []
-    return render_template('billing_order_view.html', order=order, trailer=trailer, products=products)
+    # Ranked suggestions for lines that are not linked yet
+    suggestions = {}
+    if not order.billed:
+        index = get_item_index()
+        suggestions = {line.id: index.search(line.item_name, limit=3)
+                       for line in order.lines if not line.item_number}
+    return render_template('billing_order_view.html', order=order, trailer=trailer,
+                           suggestions=suggestions)
 
 
 @billing_bp.route('/warehouse/orders/<int:order_id>/status', methods=['POST'])
@@ -433,11 +547,29 @@ def link_order_line(order_id, line_id):
     return redirect(url_for('billing.view_order', order_id=order_id))
 
 
-def _resolve_product(line, products_by_num, products_by_name):
-    """Return warehouse product for a line: prefer item_number, fall back to name."""
-    if line.item_number:
-        return products_by_num.get(line.item_number.strip().upper())
-    return products_by_name.get((line.item_name or '').strip().lower())
+def _resolve_products(lines):
+    """Return {line.id: WarehouseProduct}: prefer the linked item_number, fall back to a
+    high-confidence index match on the name. One product query for all lines."""
+    index = get_item_index()
+    by_line = {}
+    for line in lines:
+        if line.item_number:
+            by_line[line.id] = ('num', line.item_number.strip().upper())
+        else:
+            match = index.best_match(line.item_name)
+            if match:
+                by_line[line.id] = ('id', match.ref_id)
+
+    nums = {v for k, v in by_line.values() if k == 'num'}
+    ids = {v for k, v in by_line.values() if k == 'id'}
+    if not nums and not ids:
+        return {}
+    products = WarehouseProduct.query.filter(
+        db.or_(WarehouseProduct.item_number.in_(nums), WarehouseProduct.id.in_(ids))
+    ).all()
+    found = {('num', p.item_number.strip().upper()): p for p in products}
+    found.update({('id', p.id): p for p in products})
+    return {line_id: found[key] for line_id, key in by_line.items() if key in found}
 
 
 @billing_bp.route('/warehouse/orders/<int:order_id>/invoice')
@@ -463,15 +595,13 @@ def order_invoice(order_id):
             total=total, is_billed=True, now=datetime.now)
 
     # Pending: compute prices — prefer linked item_number, fall back to name match
-    all_products = WarehouseProduct.query.order_by(WarehouseProduct.item_name).all()
-    products_by_num  = {p.item_number.strip().upper(): p for p in all_products}
-    products_by_name = {(p.item_name or '').strip().lower(): p for p in all_products if p.item_name}
+    resolved = _resolve_products(order.lines)
 
     line_items = []
     total = 0.0
     for line in order.lines:
-        product = _resolve_product(line, products_by_num, products_by_name)
-        unit_price = round(product.unit_cost * 1.10, 2) if product else 0.0
+        product = resolved.get(line.id)
+        unit_price = sales_price(product.unit_cost) if product else 0.0
         line_total = unit_price * line.quantity
         total += line_total
         line_items.append({
@@ -499,9 +629,7 @@ def confirm_order_invoice(order_id):
         return redirect(url_for('billing.order_invoice', order_id=order_id))
 
     included_ids = set(int(x) for x in request.form.getlist('include_line'))
-    all_products = WarehouseProduct.query.all()
-    products_by_num  = {p.item_number.strip().upper(): p for p in all_products}
-    products_by_name = {(p.item_name or '').strip().lower(): p for p in all_products if p.item_name}
+    resolved = _resolve_products([line for line in order.lines if line.id in included_ids])
 
     is_purchase = (order.order_type == 'PURCHASE')
     order_total = 0.0
@@ -512,13 +640,14 @@ def confirm_order_invoice(order_id):
             line.unit_price = 0.0
             line.line_total = 0.0
             continue
-        product = _resolve_product(line, products_by_num, products_by_name)
+        product = resolved.get(line.id)
         if product:
             if is_purchase:
-                product.quantity_on_hand += line.quantity
+                stock_ledger.record_movement(product, line.quantity, stock_ledger.ORDER_PURCHASE, source_id=order.id)
             else:
-                product.quantity_on_hand = max(0, product.quantity_on_hand - line.quantity)
-            unit_price = round(product.unit_cost * 1.10, 2)
+                stock_ledger.set_quantity(product, max(0, product.quantity_on_hand - line.quantity),
+                                          stock_ledger.ORDER_SALE, source_id=order.id)
+            unit_price = sales_price(product.unit_cost)
             line.unit_price = unit_price
             line.line_total = unit_price * line.quantity
             line.item_number = product.item_number
@@ -587,6 +716,7 @@ def tooling_list_add_item(list_name):
     db.session.add(ToolingListItem(list_name=list_name, item_number=item_number,
                                    item_name=item_name, category=category,
                                    quantity=quantity, sort_order=max_sort+1))
+    publish_version(list_name)
     db.session.commit()
     flash(f'Item added to {list_name}.', 'success')
     return redirect(url_for('billing.tooling_list_detail', list_name=list_name))
@@ -604,6 +734,7 @@ def tooling_list_edit_item(item_id):
         item.quantity = int(request.form.get('quantity') or item.quantity)
     except ValueError:
         pass
+    publish_version(item.list_name)
     db.session.commit()
     flash('Item updated.', 'success')
     return redirect(url_for('billing.tooling_list_detail', list_name=item.list_name))
@@ -616,11 +747,53 @@ def tooling_list_delete_item(item_id):
     item = ToolingListItem.query.get_or_404(item_id)
     list_name = item.list_name
     db.session.delete(item)
+    publish_version(list_name)
     db.session.commit()
     flash('Item removed.', 'info')
     return redirect(url_for('billing.tooling_list_detail', list_name=list_name))
 
 
+@billing_bp.route('/tooling-lists/<list_name>/batch', methods=['POST'])
+@billing_required
+def tooling_list_batch(list_name):
+    """Apply the whole edited list (adds, edits, deletes, order) in one transaction."""
+    from utils.tooling_list_editor import apply_list_batch, ListBatchError
+    payload = request.get_json(silent=True) or {}
+    try:
+        result = apply_list_batch(list_name, payload.get('items'))
+    except ListBatchError as e:
+        db.session.rollback()
+        return jsonify(ok=False, error=str(e)), 400
+    return jsonify(ok=True, **result)
+
+
+@billing_bp.route('/tooling-lists/<list_name>/replace', methods=['POST'])
+@billing_required
+def tooling_list_replace(list_name):
+    """Replace the list from pasted rows or an uploaded .xlsx."""
+    from utils.tooling_list_editor import parse_pasted_list, parse_xlsx_list, replace_list, ListBatchError
+    f = request.files.get('file')
+    try:
+        if f and f.filename:
+            if not f.filename.lower().endswith(('.xlsx', '.xlsm')):
+                flash('Upload an .xlsx file.', 'danger')
+                return redirect(url_for('billing.tooling_list_detail', list_name=list_name))
+            rows = parse_xlsx_list(f)
+        else:
+            rows = parse_pasted_list(request.form.get('pasted'))
+        if not rows:
+            flash('No rows found to import.', 'warning')
+            return redirect(url_for('billing.tooling_list_detail', list_name=list_name))
+        result = replace_list(list_name, rows)
+    except ListBatchError as e:
+        db.session.rollback()
+        flash(f'Nothing changed: {e}', 'danger')
+        return redirect(url_for('billing.tooling_list_detail', list_name=list_name))
+    flash(f"{list_name}: {result['added']} added, {result['updated']} updated, "
+          f"{result['deleted']} removed.", 'success')
+    return redirect(url_for('billing.tooling_list_detail', list_name=list_name))
+
+
 @billing_bp.route('/tooling-lists/new-list', methods=['POST'])
 @billing_required
 def tooling_list_create():
@@ -745,6 +918,7 @@ def import_warehouse():
         PRICE_SHEET_NAMES = {'prices', 'price', 'pricing', 'price list', 'price book',
                               'rate sheet', 'pricelist'}
         price_from_sheet = {}  # item_number (upper) -> best price float
+        history_rows = 0
         for sheet_name in wb.sheetnames:
             if sheet_name.strip().lower() in PRICE_SHEET_NAMES:
                 pws = wb[sheet_name]
@@ -809,9 +983,11 @@ def import_warehouse():
                         )
                     else:
                         continue
-                    _, purchase_price, sales_price = best
-                    # Store purchase_price in unit_cost — billing already adds 10% markup
-                    price_from_sheet[item_id] = purchase_price if purchase_price else sales_price
+                    _, purchase_price, sheet_sales_price = best
+                    # Store purchase_price in unit_cost — billing already adds the markup
+                    price_from_sheet[item_id] = purchase_price if purchase_price else sheet_sales_price
+                # Keep every dated row for as-of pricing (utils/price_history.py)
+                history_rows = record_price_history(price_records)
                 break  # only process first matching sheet
 
         # Pre-load existing records with UPPERCASE keys for case-insensitive matching
@@ -851,7 +1027,7 @@ def import_warehouse():
                     if item_name:
                         wp.item_name = item_name
                     if qty is not None:
-                        wp.quantity_on_hand = qty
+                        stock_ledger.set_quantity(wp, qty, stock_ledger.IMPORT)
                     if reorder is not None:
                         wp.reorder_point = reorder
                     if price is not None:
@@ -861,11 +1037,12 @@ def import_warehouse():
                     wp = WarehouseProduct(
                         item_number=item_number,
                         item_name=item_name,
-                        quantity_on_hand=qty or 0,
+                        quantity_on_hand=0,
                         reorder_point=reorder or 0,
                         unit_cost=price or 0.0,
                     )
                     new_products.append(wp)
+                    stock_ledger.set_quantity(wp, qty or 0, stock_ledger.IMPORT)
                     existing_products[item_number] = wp
                     added += 1
 
@@ -888,6 +1065,8 @@ def import_warehouse():
             db.session.add_all(new_prices)
         db.session.commit()
         price_note = f', {len(price_from_sheet)} prices from PRICES sheet' if price_from_sheet else ''
+        if history_rows:
+            price_note += f' ({history_rows} dated price rows kept)'
         flash(
             f'Import complete: {added} products added, {updated} updated, {priced} prices synced{price_note}.',
             'success'
@@ -897,9 +1076,56 @@ def import_warehouse():
     return render_template('billing_import.html')
 
 
+# ---------- Archive (read-only) ----------
+ARCHIVE_PAGE_SIZE = 50
+
+
+@billing_bp.route('/archive')
+@billing_required
+def archive_index():
+    from models import ArchivedTrailer
+    q = (request.args.get('q') or '').strip()
+    query = ArchivedTrailer.query
+    if q:
+        like = f'%{q}%'
+        query = query.filter(db.or_(ArchivedTrailer.job_name.ilike(like),
+                                    ArchivedTrailer.job_number.ilike(like),
+                                    ArchivedTrailer.trailer_id.ilike(like)))
+    page = db.paginate(query.order_by(ArchivedTrailer.archived_at.desc(), ArchivedTrailer.id.desc()),
+                       per_page=ARCHIVE_PAGE_SIZE, error_out=False)
+    return render_template('billing_archive.html', page=page, q=q)
+
+
+@billing_bp.route('/archive/trailer/<int:trailer_id>')
+@billing_required
+def archive_trailer(trailer_id):
+    import json as _json
+    from models import ArchivedTrailer
+    trailer = ArchivedTrailer.query.get_or_404(trailer_id)
+    invoices = []
+    for inv in trailer.invoices:
+        line_items = _json.loads(inv.line_items_json) if inv.line_items_json else []
+        invoices.append({'invoice': inv, 'line_items': line_items,
+                         'total': sum(li.get('line_total') or 0 for li in line_items)})
+    flagged = [r for r in trailer.responses if r.status in ('Missing', 'Red Tag')]
+    return render_template('billing_archive_trailer.html', trailer=trailer,
+                           invoices=invoices, flagged=flagged)
+
+
+@billing_bp.route('/archive/trailer/<int:trailer_id>/restore', methods=['POST'])
+@billing_required
+def restore_archived_trailer(trailer_id):
+    from utils.archive import restore_trailer
+    if not restore_trailer(trailer_id):
+        abort(404)
+    flash('Trailer restored from the archive.', 'success')
+    return redirect(url_for('billing.generate_billing_invoice', trailer_id=trailer_id))
+
+
 # ---------- Metrics ----------
 @billing_bp.route('/metrics')
 @billing_required
+@read_only
 def metrics():
     from sqlalchemy import func
     from datetime import timedelta
@@ -937,7 +1163,7 @@ def metrics():
     twelve_ago = datetime.now() - timedelta(days=365)
     monthly_rows = (
         db.session.query(
-            func.date_trunc('month', WarehouseOrder.created_at).label('month'),
+            month_bucket(WarehouseOrder.created_at).label('month'),
             WarehouseOrder.order_type,
             func.count(WarehouseOrder.id).label('order_count'),
             func.coalesce(func.sum(WarehouseOrder.order_total), 0).label('total_value'),
@@ -948,19 +1174,60 @@ def metrics():
         .order_by('month')
         .all()
     )
-    # Pivot: {month_str -> {SALE: {count,value}, PURCHASE: {count,value}}}
-    monthly_data = {}
+    # Billed trailer invoices, from the precomputed monthly rollup
+    first_month = twelve_ago.date().replace(day=1)
+    trailer_rows = (
+        db.session.query(
+            BilledRevenueMonth.month,
+            func.sum(BilledRevenueMonth.invoice_count).label('invoice_count'),
+            func.sum(BilledRevenueMonth.revenue).label('revenue'),
+        )
+        .filter(BilledRevenueMonth.month >= first_month)
+        .group_by(BilledRevenueMonth.month)
+        .all()
+    )
+
+    # Pivot: {month_str -> {SALE: {count,value}, PURCHASE: {count,value}, TRAILER: {count,value}}}
+    by_month = {}
+    def _cell(month):
+        return by_month.setdefault(month.date().replace(day=1) if isinstance(month, datetime) else month, {
+            'SALE':     {'count': 0, 'value': 0.0},
+            'PURCHASE': {'count': 0, 'value': 0.0},
+            'TRAILER':  {'count': 0, 'value': 0.0},
+        })
     for row in monthly_rows:
-        key = row.month.strftime('%b %Y') if row.month else 'Unknown'
-        if key not in monthly_data:
-            monthly_data[key] = {
-                'SALE':     {'count': 0, 'value': 0.0},
-                'PURCHASE': {'count': 0, 'value': 0.0},
-            }
+        month = as_month(row.month)
+        if month is None:
+            continue
         otype = (row.order_type or 'SALE').upper()
-        if otype in monthly_data[key]:
-            monthly_data[key][otype] = {'count': row.order_count, 'value': float(row.total_value or 0)}
-    months_list = list(monthly_data.keys())  # already ordered from query
+        cell = _cell(month)
+        if otype in cell:
+            cell[otype] = {'count': row.order_count, 'value': float(row.total_value or 0)}
+    for row in trailer_rows:
+        _cell(row.month)['TRAILER'] = {'count': int(row.invoice_count or 0), 'value': float(row.revenue or 0)}
+    monthly_data = {m.strftime('%b %Y'): by_month[m] for m in sorted(by_month)}
+    months_list = list(monthly_data.keys())
+
+    # Billed trailer revenue by tooling list and by job (top 15), same window
+    def _revenue_pivot(key_col, label_col=None, limit=None):
+        label = func.max(label_col if label_col is not None else key_col).label('label')
+        rows = (
+            db.session.query(key_col.label('key'), label, BilledRevenueMonth.month,
+                             func.sum(BilledRevenueMonth.revenue).label('revenue'))
+            .filter(BilledRevenueMonth.month >= first_month)
+            .group_by(key_col, BilledRevenueMonth.month)
+            .all()
+        )
+        pivot = {}
+        for row in rows:
+            entry = pivot.setdefault(row.key, {'key': row.key, 'label': row.label, 'months': {}, 'total': 0.0})
+            entry['months'][row.month.strftime('%b %Y')] = float(row.revenue or 0)
+            entry['total'] += float(row.revenue or 0)
+        ranked = sorted(pivot.values(), key=lambda e: -e['total'])
+        return ranked[:limit] if limit else ranked
+
+    revenue_by_list = _revenue_pivot(BilledRevenueMonth.tooling_list_name)
+    revenue_by_job = _revenue_pivot(BilledRevenueMonth.job_number, BilledRevenueMonth.job_name, limit=15)
 
     # --- Item date-range lookup ---
     item_search    = (request.args.get('item_search') or '').strip()
@@ -1029,6 +1296,8 @@ def metrics():
         order_status_map=order_status_map,
         monthly_data=monthly_data,
         months_list=months_list,
+        revenue_by_list=revenue_by_list,
+        revenue_by_job=revenue_by_job,
         item_results=item_results,
         item_totals=item_totals,
         item_search=item_search,
@@ -1038,14 +1307,91 @@ def metrics():
     )
 
 
+# ---------- Catalog Search ----------
+# Most hits one catalog search returns
+CATALOG_SEARCH_LIMIT = 500
+
+
+def _catalog_results(hits):
+    """Hits as display dicts with live quantities/prices (one query per kind) and a link."""
+    from models import ToolingListItem
+    from utils.catalog_search import KIND_LABELS
+    ids = defaultdict(list)
+    for h in hits:
+        ids[h.kind].append(h.ref_id)
+    live = {}
+    if ids['product']:
+        for p in WarehouseProduct.query.filter(WarehouseProduct.id.in_(ids['product'])):
+            live[('product', p.id)] = (f'{p.quantity_on_hand} on hand · {p.category or "Other"}',
+                                       url_for('billing.edit_product', product_id=p.id))
+    if ids['tool']:
+        for t in SpecialtyTool.query.filter(SpecialtyTool.id.in_(ids['tool'])):
+            live[('tool', t.id)] = (f'{t.quantity or 0} in stock · ${t.price or 0:.2f}',
+                                    url_for('billing.specialty_tools', q=t.item_number))
+    if ids['price']:
+        for ip in ItemPrice.query.filter(ItemPrice.id.in_(ids['price'])):
+            live[('price', ip.id)] = (f'${ip.price or 0:.2f}', None)
+    if ids['list_item']:
+        for it in ToolingListItem.query.filter(ToolingListItem.id.in_(ids['list_item'])):
+            live[('list_item', it.id)] = (f'{it.list_name} · {it.category or "General"} · qty {it.quantity}',
+                                          url_for('billing.tooling_list_detail', list_name=it.list_name))
+    results = []
+    for h in hits:
+        if (h.kind, h.ref_id) not in live:
+            continue  # deleted by another worker since the index was built
+        detail, link = live[(h.kind, h.ref_id)]
+        results.append({'kind': h.kind, 'kind_label': KIND_LABELS[h.kind], 'id': h.ref_id,
+                        'item_number': h.item_number, 'item_name': h.item_name,
+                        'detail': detail, 'url': link, 'score': h.score})
+    return results
+
+
+def _catalog_kinds():
+    from utils.catalog_search import KINDS
+    kinds = [k for k in request.args.getlist('kind') if k in KINDS]
+    return kinds or None
+
+
+@billing_bp.route('/catalog')
+@billing_required
+def catalog_search():
+    """One search box over products, specialty tools, prices and tooling list items."""
+    import time
+    from utils.catalog_search import KIND_LABELS, search_catalog
+    q = (request.args.get('q') or '').strip()
+    kinds = _catalog_kinds()
+    started = time.perf_counter()
+    results = _catalog_results(search_catalog(q, limit=CATALOG_SEARCH_LIMIT, kinds=kinds)) if q else []
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return render_template('billing_catalog_search.html', q=q, results=results, kinds=kinds or [],
+                           kind_labels=KIND_LABELS, elapsed_ms=elapsed_ms)
+
+
+@billing_bp.route('/catalog/search')
+@billing_required
+def catalog_search_json():
+    """Typeahead JSON for the catalog search box."""
+    from utils.catalog_search import search_catalog
+    q = (request.args.get('q') or '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit') or 20), 1), 100)
+    except ValueError:
+        limit = 20
+    hits = search_catalog(q, limit=limit, kinds=_catalog_kinds()) if q else []
+    return jsonify(results=_catalog_results(hits))
+
+
 # ---------- Specialty Tools ----------
 @billing_bp.route('/specialty-tools')
 @billing_required
 def specialty_tools():
+    from utils.catalog_search import search_catalog
     q = (request.args.get('q') or '').strip().lower()
-    tools = SpecialtyTool.query.order_by(SpecialtyTool.item_name).all()
+    query = SpecialtyTool.query
     if q:
-        tools = [t for t in tools if q in (t.item_name or '').lower() or q in (t.item_number or '').lower()]
+        ids = [h.ref_id for h in search_catalog(q, limit=CATALOG_SEARCH_LIMIT, kinds=('tool',))]
+        query = query.filter(SpecialtyTool.id.in_(ids))
+    tools = query.order_by(SpecialtyTool.item_name).all()
     return render_template('billing_specialty_tools.html', tools=tools, q=q)
 
 
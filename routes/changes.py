@@ -0,0 +1,45 @@
+# routes/changes.py — cursor-paginated change feed for accounting / ERP sync
+from flask import Blueprint, request, jsonify, abort
+from routes.billing import billing_required
+from utils.change_log import ENTITIES, changes_since
+
+changes_bp = Blueprint('changes', __name__, url_prefix='/api/changes')
+
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+
+@changes_bp.route('')
+@billing_required
+def change_feed():
+    """
+    GET /api/changes?since=<cursor>&limit=500[&entity=invoice&entity=...]
+
+    Returns changes after `since` (0 = from the start of retained history),
+    oldest first. Store `next_cursor` and pass it back as `since`; keep
+    polling immediately while `has_more` is true.
+    """
+    try:
+        since = int(request.args.get('since') or 0)
+        limit = min(max(int(request.args.get('limit') or DEFAULT_LIMIT), 1), MAX_LIMIT)
+    except ValueError:
+        abort(400, 'since and limit must be integers')
+    entities = request.args.getlist('entity')
+    unknown = sorted(set(entities) - set(ENTITIES))
+    if unknown:
+        abort(400, f'unknown entity: {", ".join(unknown)}')
+
+    rows, has_more = changes_since(since, limit, entities or None)
+    return jsonify(
+        changes=[{
+            'cursor': r.id,
+            'entity': r.entity,
+            'id': r.entity_id,
+            'action': r.action,
+            'fields': r.changed_fields,
+            'data': r.data,
+            'at': r.created_at.isoformat() if r.created_at else None,
+        } for r in rows],
+        next_cursor=rows[-1].id if rows else since,
+        has_more=has_more,
+    )
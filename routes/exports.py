@@ -0,0 +1,191 @@
+# routes/exports.py — accounting exports: CSV streamed row by row, XLSX built then sent
+from flask import Blueprint, render_template, request, Response, stream_with_context, abort
+from models import (
+    Trailer, InventoryResponse, InvoiceLine, WarehouseOrder, WarehouseOrderLine,
+    ArchivedTrailer, ArchivedInventoryResponse, ArchivedInvoiceLine,
+)
+from database import db
+from routes.billing import billing_required
+from utils.db_routing import read_only
+from datetime import datetime, timedelta
+import csv
+import io
+import os
+import tempfile
+
+exports_bp = Blueprint('exports', __name__, url_prefix='/billing/exports')
+
+# Rows fetched per round trip (server-side cursor on PostgreSQL)
+YIELD_PER = 1000
+# CSV rows buffered per chunk written to the socket
+CSV_CHUNK_ROWS = 200
+
+
+# ---------- Helpers ----------
+def _date_range():
+    """Parse ?start=YYYY-MM-DD&end=YYYY-MM-DD (end inclusive); missing bounds are open."""
+    def parse(name):
+        raw = (request.args.get(name) or '').strip()
+        if not raw:
+            return None
+        try:
+            return datetime.strptime(raw, '%Y-%m-%d')
+        except ValueError:
+            abort(400, f'{name} must be YYYY-MM-DD')
+    start, end = parse('start'), parse('end')
+    return start, (end + timedelta(days=1)) if end else None
+
+
+def _between(query, column, start, end):
+    if start:
+        query = query.filter(column >= start)
+    if end:
+        query = query.filter(column < end)
+    return query
+
+
+def _fmt(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if isinstance(value, datetime) else value
+
+
+def _csv_stream(header, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    for i, row in enumerate(rows, 1):
+        writer.writerow([_fmt(v) for v in row])
+        if i % CSV_CHUNK_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def _xlsx_stream(sheet_title, header, rows):
+    """
+    openpyxl write-only workbook spooled to a temp file, then sent in chunks.
+
+    Unlike the CSV path this does not stream: an xlsx is a zip archive, so
+    the first byte goes out only once the whole workbook is built, and the
+    temp file takes as much disk as the download. The file is removed when
+    the response finishes, including when the client disconnects.
+    """
+    import openpyxl
+    path = None
+    try:
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(sheet_title)
+        ws.append(header)
+        for row in rows:
+            ws.append(list(row))
+        wb.save(path)
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(64 * 1024)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        if path:
+            os.remove(path)
+
+
+def _export(basename, header, rows):
+    fmt = (request.args.get('format') or 'csv').lower()
+    stamp = datetime.now().strftime('%Y%m%d')
+    if fmt == 'xlsx':
+        body = _xlsx_stream(basename[:31], header, rows)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    elif fmt == 'csv':
+        body = _csv_stream(header, rows)
+        mimetype = 'text/csv'
+    else:
+        abort(400, 'format must be csv or xlsx')
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{basename}_{stamp}.{fmt}"',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+# ---------- Row generators ----------
+INVOICE_HEADER = ['Invoice #', 'Billed Date', 'Trailer DB ID', 'Trailer #', 'Job Name', 'Job #', 'Location',
+                  'Category', 'Item Number', 'Item Name', 'Expected', 'Missing', 'Red Tag',
+                  'Billable Qty', 'Unit', 'Unit Price', 'Line Total']
+
+
+def _invoice_rows(start, end):
+    """One row per billed invoice line (archive first, then live), dated by billed_at."""
+    for line_model, trailer_model in ((ArchivedInvoiceLine, ArchivedTrailer), (InvoiceLine, Trailer)):
+        ln = line_model
+        q = (db.session.query(ln.invoice_id, ln.billed_at, trailer_model.id, trailer_model.trailer_id,
+                              trailer_model.job_name, trailer_model.job_number, trailer_model.location,
+                              ln.category, ln.item_number, ln.item_name, ln.expected_qty, ln.missing_qty,
+                              ln.redtag_qty, ln.billable_qty, ln.billable_unit, ln.unit_price, ln.line_total)
+             .join(trailer_model, trailer_model.id == ln.trailer_id))
+        q = _between(q, ln.billed_at, start, end).order_by(ln.billed_at, ln.invoice_id, ln.sort_order)
+        yield from q.yield_per(YIELD_PER)
+
+
+RESPONSE_HEADER = ['Response ID', 'Submitted', 'Trailer DB ID', 'Trailer #', 'Job Name', 'Job #',
+                   'Category', 'Item Number', 'Item Name', 'Status', 'Quantity', 'Note']
+
+
+def _response_rows(start, end):
+    for resp_model, trailer_model in ((ArchivedInventoryResponse, ArchivedTrailer),
+                                      (InventoryResponse, Trailer)):
+        q = (db.session.query(resp_model.id, resp_model.created_at, trailer_model.id,
+                              trailer_model.trailer_id, trailer_model.job_name, trailer_model.job_number,
+                              resp_model.category, resp_model.item_number, resp_model.item_name,
+                              resp_model.status, resp_model.quantity, resp_model.note)
+             .join(trailer_model, trailer_model.id == resp_model.trailer_id))
+        q = _between(q, resp_model.created_at, start, end).order_by(resp_model.created_at, resp_model.id)
+        yield from q.yield_per(YIELD_PER)
+
+
+ORDER_HEADER = ['Order #', 'Date', 'Type', 'Status', 'Billed', 'Requested By', 'Trailer DB ID',
+                'Order Total', 'Line Item Number', 'Line Item Name', 'Quantity', 'Unit Price', 'Line Total']
+
+
+def _order_rows(start, end):
+    """One row per order line (orders without lines get a single blank-line row)."""
+    o, ln = WarehouseOrder, WarehouseOrderLine
+    q = (db.session.query(o.id, o.created_at, o.order_type, o.status, o.billed, o.requester_name,
+                          o.trailer_id, o.order_total, ln.item_number, ln.item_name, ln.quantity,
+                          ln.unit_price, ln.line_total)
+         .outerjoin(ln, ln.order_id == o.id))
+    q = _between(q, o.created_at, start, end).order_by(o.created_at, o.id, ln.id)
+    yield from q.yield_per(YIELD_PER)
+
+
+# ---------- Routes ----------
+@exports_bp.route('/')
+@billing_required
+@read_only
+def exports_index():
+    return render_template('billing_exports.html')
+
+
+@exports_bp.route('/invoices')
+@billing_required
+@read_only
+def export_invoices():
+    start, end = _date_range()
+    return _export('billed_invoices', INVOICE_HEADER, _invoice_rows(start, end))
+
+
+@exports_bp.route('/responses')
+@billing_required
+@read_only
+def export_responses():
+    start, end = _date_range()
+    return _export('inventory_responses', RESPONSE_HEADER, _response_rows(start, end))
+
+
+@exports_bp.route('/orders')
+@billing_required
+@read_only
+def export_orders():
+    start, end = _date_range()
+    return _export('warehouse_orders', ORDER_HEADER, _order_rows(start, end))
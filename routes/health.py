@@ -0,0 +1,62 @@
+# routes/health.py — load balancer probes
+from flask import Blueprint, current_app, jsonify
+from sqlalchemy import text
+from database import db, schema_version, SCHEMA_VERSION
+import threading
+import time
+
+health_bp = Blueprint('health', __name__)
+# Held while a readiness DB check runs, so a hung check can't pile up threads
+_check_lock = threading.Lock()
+
+
+@health_bp.route('/healthz')
+def healthz():
+    """Process is up and serving; touches nothing else."""
+    return jsonify(status='ok')
+
+
+def _check_db(engine, timeout_ms, result):
+    """Pool checkout, connect and the schema read, on a worker thread readyz can stop waiting for."""
+    try:
+        with engine.connect() as conn:
+            if conn.dialect.name == 'postgresql':
+                conn.execute(text(f"SET LOCAL statement_timeout = {timeout_ms}"))
+            result['schema'] = schema_version(conn)
+            conn.rollback()
+    except Exception as e:
+        result['error'] = e
+    finally:
+        _check_lock.release()
+
+
+@health_bp.route('/readyz')
+def readyz():
+    """DB reachable within READYZ_DB_TIMEOUT_MS and migrated to at least SCHEMA_VERSION."""
+    timeout_ms = int(current_app.config.get('READYZ_DB_TIMEOUT_MS', 2000))
+    body = {'expected_schema': SCHEMA_VERSION, 'warmed_up': 'warmed_up' in current_app.extensions}
+    if not _check_lock.acquire(blocking=False):
+        body.update(status='unavailable', error='previous database check still running')
+        return jsonify(body), 503
+    result = {}
+    started = time.perf_counter()
+    worker = threading.Thread(target=_check_db, args=(db.engine, timeout_ms, result), daemon=True)
+    worker.start()
+    worker.join(timeout_ms / 1000)
+    if worker.is_alive():
+        current_app.logger.warning(f"[READYZ] database check exceeded {timeout_ms} ms")
+        body.update(status='unavailable', error='database check timed out')
+        return jsonify(body), 503
+    if 'error' in result:
+        current_app.logger.warning(f"[READYZ] database check failed: {result['error']}")
+        body.update(status='unavailable', error='database check failed')
+        return jsonify(body), 503
+    body['schema'] = result['schema']
+    body['db_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    if body['schema'] is None or body['schema'] < SCHEMA_VERSION:
+        body['status'] = 'migrations pending'
+    else:
+        body['status'] = 'ready'
+        return jsonify(body)
+    return jsonify(body), 503
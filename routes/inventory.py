@@ -1,16 +1,24 @@
 # routes/inventory.py
 from flask import (
     Blueprint, render_template, request, redirect, url_for,
-    flash, send_from_directory, abort, current_app
+    flash, send_from_directory, abort, current_app, Response, jsonify
 )
 from models import Trailer, InventoryResponse, Invoice
 from database import db
 from utils.invoice_generator import generate_invoice
-from utils.tooling_lists import get_tooling_list  # helper to fetch list by name
+from utils.tooling_list_versions import get_tooling_list_for_trailer, pin_version
+from utils.form_fragments import render_form_items, existing_overlay
+from utils.invoice_lines import bill_invoice, unbill_invoice, unbill_trailer_invoices
+from utils import trailer_events, idempotency
+from utils.db_routing import read_only
+from utils.change_log import record_bulk
 from sqlalchemy import desc
 from datetime import datetime, timedelta
 from collections import defaultdict
+import json
 import os
+import queue
+import time
 
 inventory_bp = Blueprint('inventory', __name__)
 
@@ -68,10 +76,59 @@ def dashboard():
         query = query.filter(Trailer.tooling_list_name == tooling_list_name)
 
     trailers = query.order_by(desc(Trailer.id)).all()
-    return render_template('dashboard.html', trailers=trailers)
+    return render_template('dashboard.html', trailers=trailers, events_cursor=trailer_events.latest_cursor())
+
+
+# How long one SSE connection stays open before the browser reconnects
+EVENT_STREAM_SECONDS = 300
+
+
+@inventory_bp.route('/events/trailers')
+def trailer_events_stream():
+    """Server-sent events: one `status` event per trailer status change."""
+    q = trailer_events.subscribe()
+    if q is None:
+        # Every stream pins a worker thread; past the cap the dashboard polls instead
+        return Response('Too many live dashboards on this worker; poll instead.\n', status=503,
+                        mimetype='text/plain', headers={'Retry-After': str(EVENT_STREAM_SECONDS)})
+
+    def stream():
+        deadline = time.monotonic() + EVENT_STREAM_SECONDS
+        yield 'retry: 3000\n\n'
+        while time.monotonic() < deadline:
+            try:
+                payload = q.get(timeout=15)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            yield f'event: status\ndata: {payload}\n\n'
+
+    response = Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(lambda: trailer_events.unsubscribe(q))
+    return response
+
+
+@inventory_bp.route('/events/trailers/poll')
+def trailer_events_poll():
+    """Polling fallback for the dashboard: ?since=<cursor> -> {events: [...], cursor}."""
+    try:
+        since = int(request.args.get('since') or 0)
+    except ValueError:
+        abort(400, 'since must be an integer')
+    payloads, cursor = trailer_events.status_changes_since(since)
+    return jsonify(events=[json.loads(p) for p in payloads], cursor=cursor)
+
+
+@inventory_bp.route('/trailer/<int:trailer_id>/dashboard-row')
+def dashboard_row(trailer_id):
+    """Single dashboard <tr>, fetched by the dashboard to patch a row in place."""
+    trailer = Trailer.query.get_or_404(trailer_id)
+    return render_template('dashboard_row.html', trailer=trailer)
 
 # ---------- Global Invoices Tab (all invoices) ----------
 @inventory_bp.route('/invoices')
+@read_only
 def view_invoices():
     q = (request.args.get('q') or "").strip().lower()
 
@@ -137,6 +194,8 @@ def delete_invoice(invoice_id):
     except Exception:
         current_app.logger.exception("Failed to remove invoice file")
 
+    if invoice.billed:
+        unbill_invoice(invoice)  # take it out of the revenue rollup too
     db.session.delete(invoice)
     db.session.commit()
     flash('Invoice deleted.', 'info')
@@ -146,15 +205,18 @@ def delete_invoice(invoice_id):
 def toggle_billed(invoice_id):
     import json as _json
     invoice = Invoice.query.get_or_404(invoice_id)
-    invoice.billed = not invoice.billed
 
-    # Snapshot current prices when marking as billed so they never change
-    if invoice.billed and not invoice.line_items_json:
+    if invoice.billed:
+        unbill_invoice(invoice)
+    elif invoice.line_items_json:
+        # Re-billing keeps the prices snapshotted the first time
+        bill_invoice(invoice, _json.loads(invoice.line_items_json))
+    else:
+        # Snapshot current prices when marking as billed so they never change
         from routes.billing import _compute_line_items
         trailer = Trailer.query.get(invoice.trailer_id)
-        if trailer:
-            line_items, _ = _compute_line_items(trailer)
-            invoice.line_items_json = _json.dumps(line_items)
+        line_items = _compute_line_items(trailer)[0] if trailer else []
+        bill_invoice(invoice, line_items)
 
     db.session.commit()
     return redirect(url_for('inventory.view_invoices'))
@@ -224,6 +286,7 @@ def edit_trailer(trailer_id):
         trailer.tooling_list_name = request.form.get('tooling_list_name') or trailer.tooling_list_name
         trailer.assigned_user = request.form.get('assigned_user') or trailer.assigned_user
         trailer.extra_tooling = tooling_items
+        previous_status = trailer.status
 
         # Capture/overwrite LN-25 and notes from the form
         _apply_ln25_from_form(trailer, request.form)
@@ -233,6 +296,7 @@ def edit_trailer(trailer_id):
         status = request.form.get('status')
         if status:
             trailer.status = status
+        trailer_events.publish_status_change(trailer, previous_status)
 
         db.session.commit()
         flash('Trailer details updated.', 'success')
@@ -243,6 +307,7 @@ def edit_trailer(trailer_id):
 @inventory_bp.route('/trailer/<int:trailer_id>/delete', methods=['POST'])
 def delete_trailer(trailer_id):
     trailer = Trailer.query.get_or_404(trailer_id)
+    unbill_trailer_invoices(trailer.id)
     db.session.delete(trailer)
     db.session.commit()
     flash('Trailer deleted.', 'info')
@@ -262,21 +327,29 @@ def update_ln25(trailer_id):
 def inventory_form(trailer_id):
     trailer = Trailer.query.get_or_404(trailer_id)
 
+    # Pin the list version on first open so later list edits don't change this trailer
+    pinned = trailer.tooling_list_version_id
+    pin_version(trailer)
     list_name = (trailer.tooling_list_name or trailer.inventory_type or "").strip()
-    tooling_list = get_tooling_list(list_name) or []
+    tooling_list = get_tooling_list_for_trailer(trailer)
     current_app.logger.info(f"[INV_FORM] trailer={trailer.id} list_name='{list_name}' items={len(tooling_list)}")
 
     # Mark In Progress on first open
     if trailer.status == 'Pending':
         trailer.status = 'In Progress'
+        trailer_events.publish_status_change(trailer, 'Pending')
+    if db.session.dirty or trailer.tooling_list_version_id != pinned:
         db.session.commit()
 
     return render_template(
         'inventory_form.html',
         trailer=trailer,
         tooling_list=tooling_list,
+        items_html=render_form_items(tooling_list, trailer.tooling_list_version_id, False),
+        existing_overlay=existing_overlay(None),
         credit_back_items=trailer.extra_tooling or [],
         existing=None,
+        idempotency_key=idempotency.new_key(),
         read_only=False
     )
 
@@ -286,7 +359,7 @@ def view_form(trailer_id):
     trailer = Trailer.query.get_or_404(trailer_id)
 
     list_name = (trailer.tooling_list_name or trailer.inventory_type or "").strip()
-    tooling_list = get_tooling_list(list_name) or []
+    tooling_list = get_tooling_list_for_trailer(trailer)
     current_app.logger.info(f"[INV_VIEW] trailer={trailer.id} list_name='{list_name}' items={len(tooling_list)}")
 
     existing_responses = InventoryResponse.query.filter_by(trailer_id=trailer.id).all()
@@ -306,6 +379,8 @@ def view_form(trailer_id):
         'inventory_form.html',
         trailer=trailer,
         tooling_list=tooling_list,
+        items_html=render_form_items(tooling_list, trailer.tooling_list_version_id, True),
+        existing_overlay=existing_overlay(existing),
         credit_back_items=trailer.extra_tooling or [],
         existing=existing,
         read_only=True
@@ -320,16 +395,8 @@ def pull_list(trailer_id):
                      .filter(InventoryResponse.trailer_id == trailer_id)
                      .all())
 
-    # Build expected qty map from tooling list
-    list_name = (trailer.tooling_list_name or trailer.inventory_type or "").strip()
-    tooling_list = get_tooling_list(list_name) or []
-    expected_qty_map = {}
-    for item in tooling_list:
-        num = str(item.get('Item Number', '')).strip()
-        try:
-            expected_qty_map[num] = int(item.get('Quantity', 0))
-        except Exception:
-            expected_qty_map[num] = 0
+    # Build expected qty map from the list version this trailer was inventoried against
+    tooling_list = get_tooling_list_for_trailer(trailer)
 
     # --- Group main flagged items (Missing/Red Tag) by Category ---
     flagged = [r for r in all_responses if r.status in ("Missing", "Red Tag") and (r.category or '').strip().lower() != 'extra tooling']
@@ -352,7 +419,7 @@ def pull_list(trailer_id):
             rows.append({
                 "item_name": item_name,
                 "item_number": item_number,
-                "expected_qty": expected_qty_map.get(str(item_number), 0),
+                "expected_qty": tooling_list.expected_qty(item_number),
                 "missing_qty": counts.get("Missing", 0),
                 "redtag_qty": counts.get("Red Tag", 0),
             })
@@ -420,10 +487,15 @@ def edit_submission(trailer_id):
     trailer = Trailer.query.get_or_404(trailer_id)
 
     list_name = (trailer.tooling_list_name or trailer.inventory_type or "").strip()
-    tooling_list = get_tooling_list(list_name) or []
+    tooling_list = get_tooling_list_for_trailer(trailer)
     current_app.logger.info(f"[INV_EDIT] trailer={trailer.id} list_name='{list_name}' items={len(tooling_list)}")
 
     if request.method == 'POST':
+        idem_key = idempotency.clean_key(request.form.get(idempotency.KEY_FIELD))
+        already = idempotency.claim(idem_key, trailer.id, request.endpoint)
+        if already:
+            return redirect(already)
+
         who = (request.form.get('assigned_user') or request.form.get('submitted_by') or "").strip()
         if who:
             trailer.assigned_user = who
@@ -433,8 +505,10 @@ def edit_submission(trailer_id):
 
         # Clear previous responses & invoices
         InventoryResponse.query.filter_by(trailer_id=trailer.id).delete()
+        unbill_trailer_invoices(trailer.id)
+        old_invoice_ids = [i for (i,) in db.session.query(Invoice.id).filter_by(trailer_id=trailer.id)]
         Invoice.query.filter_by(trailer_id=trailer.id).delete()
-        db.session.commit()
+        record_bulk('invoice', old_invoice_ids, 'delete')
 
         responses = []
         flagged_items = []
@@ -468,7 +542,6 @@ def edit_submission(trailer_id):
                         flagged_items.append(r)
 
         db.session.add_all(responses)
-        db.session.commit()
 
         if flagged_items:
             invoice_path = generate_invoice(trailer.id, flagged_items) or ""
@@ -507,9 +580,10 @@ def edit_submission(trailer_id):
         if extra_responses:
             db.session.add_all(extra_responses)
 
-        db.session.commit()
+        # One transaction with the receipt, so a replayed POST never half-applies
+        target = idempotency.commit_with_receipt(idem_key, url_for('inventory.pull_list', trailer_id=trailer.id))
         flash('Submission updated. Pull list regenerated.', 'success')
-        return redirect(url_for('inventory.pull_list', trailer_id=trailer.id))
+        return redirect(target)
 
     # GET -> prefill map
     existing_responses = InventoryResponse.query.filter_by(trailer_id=trailer.id).all()
@@ -529,7 +603,10 @@ def edit_submission(trailer_id):
         'inventory_form.html',
         trailer=trailer,
         tooling_list=tooling_list,
+        items_html=render_form_items(tooling_list, trailer.tooling_list_version_id, False),
+        existing_overlay=existing_overlay(existing),
         credit_back_items=trailer.extra_tooling or [],
         existing=existing,
+        idempotency_key=idempotency.new_key(),
         read_only=False
     )
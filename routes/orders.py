@@ -2,11 +2,14 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from models import Trailer, WarehouseOrder, WarehouseOrderLine
 from database import db
+from utils.product_index import auto_link_item_number
+from utils.db_routing import read_only
 
 orders_bp = Blueprint('orders', __name__, url_prefix='/orders')
 
 
 @orders_bp.route('/')
+@read_only
 def orders_list():
     orders = WarehouseOrder.query.order_by(WarehouseOrder.created_at.desc()).all()
     trailers = {t.id: t for t in Trailer.query.all()}
@@ -49,7 +52,9 @@ def new_order():
                 qty = 0
             if qty <= 0:
                 continue
-            db.session.add(WarehouseOrderLine(order_id=order.id, item_name=name, quantity=qty))
+            # Free-text lines: link straight away when the catalog match is unambiguous
+            db.session.add(WarehouseOrderLine(order_id=order.id, item_name=name, quantity=qty,
+                                              item_number=auto_link_item_number(name)))
             any_added = True
 
         if not any_added:
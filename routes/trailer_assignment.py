@@ -1,9 +1,11 @@
 # routes/trailer_assignment.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
 from models import Trailer, InventoryResponse, Invoice
 from database import db
 from utils.tooling_lists import tooling_lists
 from utils.invoice_generator import generate_invoice
+from utils import trailer_events, idempotency
+from utils.tooling_list_versions import get_tooling_list_for_trailer, pin_version
 
 trailer_assignment_bp = Blueprint('trailer_assignment', __name__)
 
@@ -153,7 +155,9 @@ def update_trailer_post(trailer_id):
     t.foreman_name = foreman_name or None
     t.tooling_list_name = tooling_list
     t.inventory_type = tooling_list
+    previous_status = t.status
     t.status = status
+    trailer_events.publish_status_change(t, previous_status)
     if extra_tooling_data is not None:
         t.extra_tooling = extra_tooling_data
 
@@ -164,108 +168,117 @@ def update_trailer_post(trailer_id):
 # -----------------------------------------------------------------------------
 # UPDATE (submission) — per-item statuses
 # -----------------------------------------------------------------------------
-@trailer_assignment_bp.route('/trailer/<int:trailer_id>/update', methods=['POST'], strict_slashes=False)
-@trailer_assignment_bp.route('/trailer/<int:trailer_id>/update/', methods=['POST'], strict_slashes=False)
-def trailer_update(trailer_id):
-    trailer = Trailer.query.get_or_404(trailer_id)
+def parse_qty_from_text(txt):
+    """Pull a positive integer from a free-text input. Non-digits are ignored."""
+    if txt is None:
+        return 0
+    s = ''.join(ch for ch in str(txt) if ch.isdigit())
+    if not s:
+        return 0
+    try:
+        n = int(s)
+        return n if n > 0 else 0
+    except Exception:
+        return 0
+
+
+def _line(item_number, item_name, category, missing=None, redtag=None, complete=False):
+    """One submitted item: missing/redtag are (qty, note) or None."""
+    return {'item_number': str(item_number), 'item_name': item_name, 'category': category,
+            'missing': missing, 'redtag': redtag, 'complete': bool(complete)}
+
+
+def _save_submission(trailer, lines, previous_status, idem_key=None):
+    """Replace the trailer's responses with `lines`, record the invoice, mark Completed (commits)."""
+    InventoryResponse.query.filter_by(trailer_id=trailer.id).delete()
+
+    responses = []
+    flagged = []
+    for ln in lines:
+        base = dict(trailer_id=trailer.id, item_number=ln['item_number'],
+                    item_name=ln['item_name'], category=ln['category'])
+        for status, flag in (('Missing', ln['missing']), ('Red Tag', ln['redtag'])):
+            if flag and flag[0] > 0:
+                r = InventoryResponse(status=status, quantity=flag[0], note=flag[1] or "", **base)
+                responses.append(r); flagged.append(r)
+        if ln['complete']:
+            responses.append(InventoryResponse(status='Complete', note='', quantity=0, **base))
+
+    if responses:
+        db.session.add_all(responses)
+
+    # Create an invoice record (file optional)
+    if flagged:
+        try:
+            invoice_path = generate_invoice(trailer.id, flagged) or ""
+        except Exception:
+            current_app.logger.exception("Invoice generation failed; proceeding without file.")
+            invoice_path = ""
+        db.session.add(Invoice(trailer_id=trailer.id, file_path=invoice_path))
+    else:
+        db.session.add(Invoice(trailer_id=trailer.id, file_path=""))
 
-    submitted_by = (request.form.get('submitted_by') or request.form.get('assigned_user') or '').strip()
+    trailer.status = 'Completed'
+    pin_version(trailer)
+    trailer_events.publish_status_change(trailer, previous_status)
+    target = idempotency.commit_with_receipt(idem_key, url_for('inventory.pull_list', trailer_id=trailer.id))
+    flash('Inventory submitted. Trailer marked Completed and invoice recorded.', 'success')
+    return target
+
+
+def _apply_submission_meta(trailer, submitted_by, notes, ln25_val):
     if submitted_by:
         trailer.assigned_user = submitted_by
-
-    ln25_val = _get_ln25_from_form(request.form)
     used_attr = _apply_ln25_to_model(trailer, ln25_val)
     if ln25_val:
         current_app.logger.info(f"[UPDATE SUBMIT] LN-25 form='{ln25_val}' -> model_attr='{used_attr}' for trailer_id={trailer.id}")
+    if notes:
+        trailer.notes = notes
+
+
+@trailer_assignment_bp.route('/trailer/<int:trailer_id>/update', methods=['POST'], strict_slashes=False)
+@trailer_assignment_bp.route('/trailer/<int:trailer_id>/update/', methods=['POST'], strict_slashes=False)
+def trailer_update(trailer_id):
+    """Classic urlencoded form POST (kept for browsers without JS)."""
+    trailer = Trailer.query.get_or_404(trailer_id)
+    f = request.form.get
+    idem_key = idempotency.clean_key(f(idempotency.KEY_FIELD))
+    already = idempotency.claim(idem_key, trailer.id, request.endpoint)
+    if already:
+        return redirect(already)
+    previous_status = trailer.status
+
+    _apply_submission_meta(
+        trailer,
+        (f('submitted_by') or f('assigned_user') or '').strip(),
+        (f('trailer_notes_hidden') or f('trailer_notes') or '').strip(),
+        _get_ln25_from_form(request.form),
+    )
 
     # Optional meta passthroughs
     if 'location' in request.form:
-        trailer.location = (request.form.get('location') or trailer.location or '').strip()
+        trailer.location = (f('location') or trailer.location or '').strip()
     if 'status' in request.form:
-        trailer.status = (request.form.get('status') or trailer.status or 'Pending').strip()
+        trailer.status = (f('status') or trailer.status or 'Pending').strip()
     if 'job_name' in request.form:
-        trailer.job_name = (request.form.get('job_name') or trailer.job_name or '').strip()
+        trailer.job_name = (f('job_name') or trailer.job_name or '').strip()
     if 'job_number' in request.form:
-        trailer.job_number = (request.form.get('job_number') or trailer.job_number or '').strip()
+        trailer.job_number = (f('job_number') or trailer.job_number or '').strip()
 
-    # Save notes from the inventory form
-    notes_val = (request.form.get('trailer_notes_hidden') or request.form.get('trailer_notes') or '').strip()
-    if notes_val:
-        trailer.notes = notes_val
-
-    # Fresh submission
-    InventoryResponse.query.filter_by(trailer_id=trailer.id).delete()
-
-    f = request.form.get
-
-    def parse_qty_from_text(txt):
-        """Pull a positive integer from a free-text input. Non-digits are ignored."""
-        if txt is None:
-            return 0
-        s = ''.join(ch for ch in str(txt) if ch.isdigit())
-        if not s:
-            return 0
-        try:
-            n = int(s)
-            return n if n > 0 else 0
-        except Exception:
-            return 0
-
-    responses = []
-    flagged = []
+    def flag(prefix, suffix):
+        if not f(f"{prefix}_{suffix}"):
+            return None
+        note = f(f"{prefix}_note_{suffix.replace('status_', '')}") or ""
+        return (parse_qty_from_text(note), note)
 
+    lines = []
     # -------- MAIN INVENTORY (discover lines via the hidden *_item_name fields) --------
-    base_keys = set()
     for key in request.form.keys():
-        if key.endswith('_item_name'):
-            base_keys.add(key[:-len('_item_name')])
-
-    for base in base_keys:
-        item_number = base
-        item_name   = f(f"{base}_item_name") or ''
-        category    = f(f"{base}_category")  or 'General'
-
-        is_missing  = bool(f(f"{base}_status_missing"))
-        is_redtag   = bool(f(f"{base}_status_redtag"))
-        is_complete = bool(f(f"{base}_status_complete"))
-
-        miss_qty = parse_qty_from_text(f(f"{base}_note_missing"))
-        red_qty  = parse_qty_from_text(f(f"{base}_note_redtag"))
-
-        if is_missing and miss_qty > 0:
-            r = InventoryResponse(
-                trailer_id=trailer.id,
-                item_number=str(item_number),
-                item_name=item_name,
-                status='Missing',
-                note=f(f"{base}_note_missing") or "",
-                quantity=miss_qty,
-                category=category
-            )
-            responses.append(r); flagged.append(r)
-
-        if is_redtag and red_qty > 0:
-            r = InventoryResponse(
-                trailer_id=trailer.id,
-                item_number=str(item_number),
-                item_name=item_name,
-                status='Red Tag',
-                note=f(f"{base}_note_redtag") or "",
-                quantity=red_qty,
-                category=category
-            )
-            responses.append(r); flagged.append(r)
-
-        if is_complete:
-            responses.append(InventoryResponse(
-                trailer_id=trailer.id,
-                item_number=str(item_number),
-                item_name=item_name,
-                status='Complete',
-                note='',
-                quantity=0,
-                category=category
-            ))
+        if key.endswith('_item_name') and not key.startswith('cb_'):
+            base = key[:-len('_item_name')]
+            lines.append(_line(base, f(key) or '', f(f"{base}_category") or 'General',
+                               flag(base, 'status_missing'), flag(base, 'status_redtag'),
+                               f(f"{base}_status_complete")))
 
     # -------- EXTRA TOOLING (use posted hidden fields for each cb_* line) --------
     cb_indices = set()
@@ -274,69 +287,108 @@ def trailer_update(trailer_id):
             idx = key[len('cb_'):-len('_item_name')]
             if idx.isdigit():
                 cb_indices.add(int(idx))
-
     for i in sorted(cb_indices):
-        item_name   = f(f"cb_{i}_item_name") or ''
-        item_number = f(f"cb_{i}_item_number") or ''
-
-        cb_missing  = bool(f(f"cb_{i}_missing"))
-        cb_redtag   = bool(f(f"cb_{i}_redtag"))
-        cb_complete = bool(f(f"cb_{i}_complete"))
-
-        miss_qty = parse_qty_from_text(f(f"cb_{i}_note_missing"))
-        red_qty  = parse_qty_from_text(f(f"cb_{i}_note_redtag"))
-
-        if cb_missing and miss_qty > 0:
-            r = InventoryResponse(
-                trailer_id=trailer.id,
-                item_number=str(item_number),
-                item_name=item_name,
-                status='Missing',
-                note=f(f"cb_{i}_note_missing") or "",
-                quantity=miss_qty,
-                category='Extra Tooling'
-            )
-            responses.append(r); flagged.append(r)
-
-        if cb_redtag and red_qty > 0:
-            r = InventoryResponse(
-                trailer_id=trailer.id,
-                item_number=str(item_number),
-                item_name=item_name,
-                status='Red Tag',
-                note=f(f"cb_{i}_note_redtag") or "",
-                quantity=red_qty,
-                category='Extra Tooling'
-            )
-            responses.append(r); flagged.append(r)
-
-        if cb_complete:
-            responses.append(InventoryResponse(
-                trailer_id=trailer.id,
-                item_number=str(item_number),
-                item_name=item_name,
-                status='Complete',
-                note='',
-                quantity=0,
-                category='Extra Tooling'
-            ))
+        lines.append(_line(f(f"cb_{i}_item_number") or '', f(f"cb_{i}_item_name") or '', 'Extra Tooling',
+                           flag(f"cb_{i}", 'missing'), flag(f"cb_{i}", 'redtag'), f(f"cb_{i}_complete")))
 
-    if responses:
-        db.session.add_all(responses)
+    return redirect(_save_submission(trailer, lines, previous_status, idem_key))
 
-    # Create an invoice record (file optional)
-    if flagged:
-        try:
-            invoice_path = generate_invoice(trailer.id, flagged) or ""
-        except Exception:
-            current_app.logger.exception("Invoice generation failed; proceeding without file.")
-            invoice_path = ""
-        db.session.add(Invoice(trailer_id=trailer.id, file_path=invoice_path))
-    else:
-        db.session.add(Invoice(trailer_id=trailer.id, file_path=""))
 
-    trailer.status = 'Completed'
-    db.session.commit()
+# JSON body for /trailer/<id>/submit:
+#   {"idempotency_key": str, "submitted_by": str, "notes": str, "ln_25s": str,
+#    "items":  {"<item number>": ITEM, ...},     # only items with something ticked
+#    "extras": {"<credit-back index>": ITEM, ...}}
+#   ITEM = {"missing": {"qty": int?, "note": str}, "redtag": {...}, "complete": bool}
+# Item names and categories come from the trailer's pinned list, not the client.
+_ITEM_KEYS = {'missing', 'redtag', 'complete'}
 
-    flash('Inventory submitted. Trailer marked Completed and invoice recorded.', 'success')
-    return redirect(url_for('inventory.pull_list', trailer_id=trailer.id))
+
+def _parse_flag(value, where, errors):
+    if value is None:
+        return None
+    if not isinstance(value, dict) or not set(value) <= {'qty', 'note'}:
+        errors.append(f'{where}: expected {{"qty", "note"}}')
+        return None
+    note = value.get('note') or ''
+    qty = value.get('qty')
+    if not isinstance(note, str):
+        errors.append(f'{where}.note: expected a string')
+        return None
+    if qty is None:
+        qty = parse_qty_from_text(note)
+    elif not isinstance(qty, int) or isinstance(qty, bool) or qty < 0:
+        errors.append(f'{where}.qty: expected a non-negative integer')
+        return None
+    return (qty, note)
+
+
+def _parse_item(value, where, errors):
+    if not isinstance(value, dict) or not set(value) <= _ITEM_KEYS:
+        errors.append(f'{where}: expected an object with keys {sorted(_ITEM_KEYS)}')
+        return None
+    if not isinstance(value.get('complete', False), bool):
+        errors.append(f'{where}.complete: expected true/false')
+        return None
+    return (_parse_flag(value.get('missing'), f'{where}.missing', errors),
+            _parse_flag(value.get('redtag'), f'{where}.redtag', errors),
+            value.get('complete', False))
+
+
+def parse_submission_json(trailer, payload):
+    """Validate a JSON submission. Returns (lines, meta, errors)."""
+    errors = []
+    if not isinstance(payload, dict):
+        return [], {}, ['body must be a JSON object']
+    unknown = set(payload) - {'idempotency_key', 'submitted_by', 'notes', 'ln_25s', 'items', 'extras'}
+    if unknown:
+        errors.append(f'unknown field(s): {", ".join(sorted(unknown))}')
+    meta = {}
+    for key in ('submitted_by', 'notes', 'ln_25s'):
+        val = payload.get(key) or ''
+        if not isinstance(val, str):
+            errors.append(f'{key}: expected a string')
+            val = ''
+        meta[key] = val.strip()
+
+    items, extras = payload.get('items') or {}, payload.get('extras') or {}
+    if not isinstance(items, dict) or not isinstance(extras, dict):
+        return [], meta, errors + ['items/extras: expected objects keyed by item number / index']
+
+    tooling_list = get_tooling_list_for_trailer(trailer)
+    lines = []
+    for num, value in items.items():
+        row = tooling_list.get(num)
+        if row is None:
+            errors.append(f'items.{num}: not on this trailer\'s tooling list')
+            continue
+        parsed = _parse_item(value, f'items.{num}', errors)
+        if parsed:
+            lines.append(_line(row.item_number, row.item_name, row.category, *parsed))
+
+    credit_back = trailer.extra_tooling or []
+    for idx, value in extras.items():
+        if not str(idx).isdigit() or int(idx) >= len(credit_back):
+            errors.append(f'extras.{idx}: no such credit-back line')
+            continue
+        cb = credit_back[int(idx)]
+        parsed = _parse_item(value, f'extras.{idx}', errors)
+        if parsed:
+            lines.append(_line(cb.get('item_number') or '', cb.get('item_name') or '', 'Extra Tooling', *parsed))
+    return lines, meta, errors
+
+
+@trailer_assignment_bp.route('/trailer/<int:trailer_id>/submit', methods=['POST'])
+def trailer_submit_json(trailer_id):
+    """Compact JSON submission used by the inventory form's script."""
+    trailer = Trailer.query.get_or_404(trailer_id)
+    payload = request.get_json(silent=True)
+    idem_key = idempotency.clean_key(payload.get(idempotency.KEY_FIELD) if isinstance(payload, dict) else None)
+    already = idempotency.claim(idem_key, trailer.id, request.endpoint)
+    if already:
+        return jsonify(ok=True, redirect=already, replayed=True)
+    previous_status = trailer.status
+    lines, meta, errors = parse_submission_json(trailer, payload)
+    if errors:
+        return jsonify(ok=False, errors=errors[:20]), 400
+    _apply_submission_meta(trailer, meta['submitted_by'], meta['notes'], meta['ln_25s'] or None)
+    return jsonify(ok=True, redirect=_save_submission(trailer, lines, previous_status, idem_key))
@@ -0,0 +1,128 @@
+# utils/archive.py
+"""
+Archive tier for finished trailers (`flask archive-trailers`).
+
+A trailer is archived once it is Completed, every invoice on it is billed,
+nothing has been written for it in ARCHIVE_AFTER_DAYS (invoice created or
+billed, inventory response, trailer edit in the change log), and no
+warehouse order points at it. The trailer, its inventory responses, its invoices and
+their billed lines are copied into the *_archive tables with INSERT ... SELECT and then
+deleted from the hot tables, one batch per transaction, so the dashboard
+and billing queries only ever scan live work.
+"""
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, delete, exists, insert, or_, select
+
+from database import db
+from models import (
+    Trailer, InventoryResponse, Invoice, InvoiceLine, WarehouseOrder, ChangeLog,
+    ArchivedTrailer, ArchivedInventoryResponse, ArchivedInvoice, ArchivedInvoiceLine,
+)
+from utils.change_log import record_bulk
+
+# (hot model, archive model, column linking rows to the trailer), parent first
+_TIERS = [
+    (Trailer, ArchivedTrailer, 'id'),
+    (InventoryResponse, ArchivedInventoryResponse, 'trailer_id'),
+    (Invoice, ArchivedInvoice, 'trailer_id'),
+    (InvoiceLine, ArchivedInvoiceLine, 'trailer_id'),
+]
+
+
+def archivable_trailer_ids(cutoff, limit=None):
+    """Ids of trailers eligible for archiving with no activity on/after `cutoff`."""
+    t = Trailer.__table__
+    inv = Invoice.__table__
+    resp = InventoryResponse.__table__
+    order = WarehouseOrder.__table__
+    log = ChangeLog.__table__
+    q = (select(t.c.id)
+         .where(t.c.status == 'Completed')
+         .where(exists().where(inv.c.trailer_id == t.c.id))
+         .where(~exists().where(and_(inv.c.trailer_id == t.c.id,
+                                     or_(inv.c.billed.is_(False), inv.c.created_at >= cutoff,
+                                         inv.c.billed_at >= cutoff))))
+         .where(~exists().where(and_(resp.c.trailer_id == t.c.id, resp.c.created_at >= cutoff)))
+         .where(~exists().where(and_(log.c.entity == 'trailer', log.c.entity_id == t.c.id,
+                                     log.c.created_at >= cutoff)))
+         .where(~exists().where(order.c.trailer_id == t.c.id))
+         .order_by(t.c.id))
+    if limit:
+        q = q.limit(limit)
+    return [row[0] for row in db.session.execute(q)]
+
+
+def _copy(src_model, dst_model, key, ids):
+    """INSERT INTO dst SELECT ... FROM src WHERE key IN ids (columns taken from dst)."""
+    src, dst = src_model.__table__, dst_model.__table__
+    cols = [c.name for c in src.columns if c.name in dst.c]
+    db.session.execute(insert(dst).from_select(
+        cols, select(*[src.c[c] for c in cols]).where(src.c[key].in_(ids))))
+
+
+def _move(from_hot, ids):
+    """Copy the trailers in `ids` plus their rows across tiers, then delete the originals."""
+    counts = {}
+    inv_model = Invoice if from_hot else ArchivedInvoice
+    invoice_ids = [i for (i,) in db.session.query(inv_model.id).filter(inv_model.trailer_id.in_(ids))]
+    # Parents first on insert (FKs in the target tier), children first on delete
+    for hot, archive, key in _TIERS:
+        src, dst = (hot, archive) if from_hot else (archive, hot)
+        _copy(src, dst, key, ids)
+    for hot, archive, key in reversed(_TIERS):
+        src = hot if from_hot else archive
+        table = src.__table__
+        counts[hot.__tablename__] = db.session.execute(delete(table).where(table.c[key].in_(ids))).rowcount
+    action = 'archived' if from_hot else 'restored'
+    record_bulk('trailer', ids, action)
+    record_bulk('invoice', invoice_ids, action)
+    return counts
+
+
+def archive_trailers(older_than_days=None, batch_size=500, echo=None):
+    """Move eligible trailers (with responses and invoices) to the archive. Returns {table: rows}."""
+    if older_than_days is None:
+        older_than_days = current_app.config.get('ARCHIVE_AFTER_DAYS', 365)
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    echo = echo or (lambda msg: None)
+    totals = {hot.__tablename__: 0 for hot, _, _ in _TIERS}
+
+    while True:
+        ids = archivable_trailer_ids(cutoff, limit=batch_size)
+        if not ids:
+            break
+        for table, n in _move(True, ids).items():
+            totals[table] += n
+        db.session.commit()
+        echo(f'archived {totals["trailer"]} trailer(s) so far')
+    return totals
+
+
+def restore_trailer(trailer_id):
+    """Move one archived trailer (and its rows) back into the hot tables. Returns True if found."""
+    if db.session.get(ArchivedTrailer, trailer_id) is None:
+        return False
+    _move(False, [trailer_id])
+    db.session.commit()
+    return True
+
+
+@click.command('archive-trailers')
+@click.option('--older-than-days', type=int, default=None,
+              help='Inactivity threshold (defaults to ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', default=500, show_default=True, help='Trailers moved per transaction.')
+@click.option('--dry-run', is_flag=True, help='Only report how many trailers would move.')
+@with_appcontext
+def archive_trailers_command(older_than_days, batch_size, dry_run):
+    """Move old completed-and-billed trailers into the archive tables."""
+    if dry_run:
+        days = older_than_days if older_than_days is not None else current_app.config.get('ARCHIVE_AFTER_DAYS', 365)
+        ids = archivable_trailer_ids(datetime.now() - timedelta(days=days))
+        click.echo(f'{len(ids)} trailer(s) would be archived.')
+        return
+    counts = archive_trailers(older_than_days, batch_size, echo=click.echo)
+    click.echo('Archived ' + ', '.join(f'{n} {table}' for table, n in counts.items()) + ' row(s).')
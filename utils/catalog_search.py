@@ -0,0 +1,18 @@
+# utils/catalog_search.py
+"""
+One search over everything that carries an item number: warehouse
+products, specialty tools, item prices and tooling list items.
+
+Answered by the shared item index (utils/product_index.py), which already
+holds every source keyed by kind: results are ranked by match tier, then
+kind, so one search box can answer across the whole catalog.
+"""
+from utils.product_index import KINDS, get_item_index
+
+KIND_LABELS = {'product': 'Warehouse Product', 'tool': 'Specialty Tool',
+               'price': 'Item Price', 'list_item': 'Tooling List Item'}
+
+
+def search_catalog(text, limit=50, kinds=None):
+    """Ranked Matches for `text` across `kinds` (all of them by default)."""
+    return get_item_index().typeahead(text, limit=limit, kinds=kinds or KINDS)
@@ -0,0 +1,196 @@
+# utils/change_log.py
+"""
+Append-only change log feeding /api/changes.
+
+A session after_flush hook turns every ORM insert/update/delete of the
+tracked models into pending change_log rows, and before_commit writes them
+on the session's connection, so the log commits with the change itself
+and route handlers don't have to do anything. Core bulk statements that
+bypass the ORM select the affected ids first and call record_bulk(); rows
+the database changes itself (stock_movement.product_id SET NULL on product
+delete) are logged by the hooks. Rows from a rolled-back transaction or
+savepoint are dropped unwritten. Consumers page through the log by id
+(the cursor).
+
+On PostgreSQL the log rows are inserted under a transaction-level advisory
+lock taken in before_commit, so log ids are handed out in commit order and
+a reader can never see a higher id before a lower one commits. The lock is
+held only for that insert and the commit itself, not for the request's
+other writes. SQLite has a single writer, which gives the same guarantee.
+"""
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, insert, inspect as sa_inspect, select, text
+from sqlalchemy.orm import Session
+
+from database import db
+from models import (
+    ChangeLog, Trailer, Invoice, WarehouseOrder, WarehouseOrderLine, WarehouseProduct, StockMovement,
+)
+
+# model -> (entity name, columns left out of `data`)
+TRACKED = {
+    Trailer: ('trailer', ()),
+    Invoice: ('invoice', ('line_items_json',)),
+    WarehouseOrder: ('warehouse_order', ()),
+    WarehouseOrderLine: ('warehouse_order_line', ()),
+    WarehouseProduct: ('product', ()),
+    StockMovement: ('stock_movement', ()),
+}
+ENTITIES = tuple(entity for entity, _ in TRACKED.values())
+# pg_advisory_xact_lock key serializing change_log writers (any constant unique to this app)
+WRITE_LOCK_KEY = 7_301_049
+_NULLED_KEY = 'change_log_nulled_movements'
+_PENDING_KEY = 'change_log_pending'  # [(SessionTransaction, rows)] awaiting commit
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _data(obj, exclude):
+    """Loaded column values only: reading expired columns here would cost a SELECT per row."""
+    state = sa_inspect(obj)
+    return {attr.key: _json_value(state.dict[attr.key])
+            for attr in state.mapper.column_attrs
+            if attr.key in state.dict and attr.key not in exclude}
+
+
+def _changed_fields(obj):
+    state = sa_inspect(obj)
+    return [attr.key for attr in state.mapper.column_attrs
+            if state.attrs[attr.key].history.has_changes()]
+
+
+def _rows_for_flush(session):
+    rows = []
+    for obj in session.new:
+        tracked = TRACKED.get(type(obj))
+        if tracked:
+            rows.append({'entity': tracked[0], 'entity_id': obj.id, 'action': 'insert',
+                         'changed_fields': None, 'data': _data(obj, tracked[1])})
+    for obj in session.dirty:
+        tracked = TRACKED.get(type(obj))
+        if not tracked or obj in session.deleted:
+            continue
+        fields = _changed_fields(obj)
+        if not fields:
+            continue  # relationship-only change, nothing in this row changed
+        action = 'update'
+        if isinstance(obj, Invoice) and 'billed' in fields:
+            action = 'billed' if obj.billed else 'unbilled'
+        rows.append({'entity': tracked[0], 'entity_id': obj.id, 'action': action,
+                     'changed_fields': fields, 'data': _data(obj, tracked[1])})
+    for obj in session.deleted:
+        tracked = TRACKED.get(type(obj))
+        if tracked:
+            rows.append({'entity': tracked[0], 'entity_id': obj.id, 'action': 'delete',
+                         'changed_fields': None, 'data': None})
+    return rows
+
+
+def _queue(session, rows):
+    """Hold `rows` until commit, tagged with the (possibly nested) transaction that produced them."""
+    if rows:
+        transaction = session.get_nested_transaction() or session.get_transaction()
+        session.info.setdefault(_PENDING_KEY, []).append((transaction, rows))
+
+
+def _within(transaction, ancestor):
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_db_cascades(session, flush_context, instances):
+    """Movements whose product_id the database will SET NULL when this flush deletes their product."""
+    product_ids = [obj.id for obj in session.deleted if isinstance(obj, WarehouseProduct) and obj.id]
+    if not product_ids:
+        return
+    ids = session.info.setdefault(_NULLED_KEY, set())
+    ids.update(session.execute(select(StockMovement.id)
+                               .where(StockMovement.product_id.in_(product_ids))).scalars())
+
+
+@event.listens_for(Session, 'after_flush')
+def _log_flush(session, flush_context):
+    rows = _rows_for_flush(session)
+    nulled = session.info.pop(_NULLED_KEY, set())
+    deleted = {obj.id for obj in session.deleted if isinstance(obj, WarehouseProduct)}
+    nulled.update(obj.id for obj in session.new if isinstance(obj, StockMovement) and obj.product_id in deleted)
+    rows.extend({'entity': 'stock_movement', 'entity_id': i, 'action': 'update',
+                 'changed_fields': ['product_id'], 'data': {'product_id': None}} for i in sorted(nulled))
+    _queue(session, rows)
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_pending(session):
+    if session.in_nested_transaction():
+        return  # a savepoint release; the outer commit writes everything
+    session.flush()  # commit's own flush runs after this hook; log its changes too
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    conn = session.connection()
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': WRITE_LOCK_KEY})
+    conn.execute(insert(ChangeLog.__table__), [row for _, rows in pending for row in rows])
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction):
+    pending = session.info.get(_PENDING_KEY)
+    if pending:
+        pending[:] = [(t, rows) for t, rows in pending if not _within(t, previous_transaction)]
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _clear_pending(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def record_bulk(entity, ids, action, fields=None):
+    """Log a Core bulk statement the ORM hook can't see (written at commit, no commit).
+
+    Select the affected ids before running the statement.
+    """
+    rows = [{'entity': entity, 'entity_id': i, 'action': action,
+             'changed_fields': list(fields) if fields else None, 'data': None} for i in ids]
+    _queue(db.session(), rows)
+
+
+def changes_since(cursor, limit, entities=None):
+    """Up to `limit` ChangeLog rows after `cursor`, oldest first, plus whether more are ready."""
+    q = ChangeLog.query.filter(ChangeLog.id > cursor)
+    if entities:
+        q = q.filter(ChangeLog.entity.in_(entities))
+    rows = q.order_by(ChangeLog.id).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+
+def prune_change_log(older_than_days=None):
+    """Delete log rows older than CHANGE_LOG_RETENTION_DAYS. Commits; returns rows deleted."""
+    if older_than_days is None:
+        older_than_days = current_app.config.get('CHANGE_LOG_RETENTION_DAYS', 90)
+    cutoff = datetime.now() - timedelta(days=older_than_days)
+    deleted = db.session.execute(delete(ChangeLog).where(ChangeLog.created_at < cutoff)).rowcount
+    db.session.commit()
+    return deleted
+
+
+@click.command('prune-change-log')
+@click.option('--older-than-days', type=int, default=None,
+              help='Retention (defaults to CHANGE_LOG_RETENTION_DAYS).')
+@with_appcontext
+def prune_change_log_command(older_than_days):
+    """Delete change feed rows older than the retention window."""
+    click.echo(f'{prune_change_log(older_than_days)} change log row(s) deleted.')
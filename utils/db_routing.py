@@ -0,0 +1,66 @@
+# utils/db_routing.py
+"""
+Read-replica routing for reporting and list pages.
+
+Views decorated with @read_only flag the request's session so
+RoutingSession (database.py) sends their SELECTs to the DATABASE_REPLICA_URL
+bind; writes always go to the primary. A user who just committed something
+is pinned to the primary for REPLICA_READ_AFTER_WRITE_SECONDS (timestamp in
+their Flask session cookie), so they never see a page that predates their
+own change because the replica is lagging. Without a replica configured
+the decorator does nothing.
+"""
+import time
+from functools import wraps
+
+from flask import current_app, has_request_context, session as flask_session
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import db, REPLICA_BIND, REPLICA_INFO_KEY
+
+_LAST_WRITE_KEY = '_db_write_at'   # Flask session (cookie) key
+_WROTE_KEY = 'db_routing_wrote'    # SQLAlchemy session.info key
+
+
+def replica_enabled():
+    return REPLICA_BIND in db.engines
+
+
+def _wrote_recently():
+    last = flask_session.get(_LAST_WRITE_KEY)
+    window = current_app.config.get('REPLICA_READ_AFTER_WRITE_SECONDS', 10)
+    return last is not None and time.time() - last < window
+
+
+def read_only(view):
+    """Serve this view's reads from the replica (unless the user wrote within the window)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if replica_enabled() and not _wrote_recently():
+            db.session.info[REPLICA_INFO_KEY] = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+# ---------- Remember each user's last commit ----------
+@event.listens_for(Session, 'after_flush')
+def _mark_flush(session, flush_context):
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _remember_write(session):
+    if session.info.pop(_WROTE_KEY, False) and has_request_context() and replica_enabled():
+        flask_session[_LAST_WRITE_KEY] = time.time()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_write(session, previous_transaction):
+    session.info.pop(_WROTE_KEY, None)
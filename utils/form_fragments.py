@@ -0,0 +1,47 @@
+# utils/form_fragments.py
+"""
+Pre-rendered inventory form item markup.
+
+The item accordion is most of inventory_form.html and depends only on the
+tooling list version and read-only mode, so it is rendered once per
+(version_id, read_only) and reused for every trailer on that version.
+What a trailer has already answered is sent separately as a small JSON
+overlay (existing_overlay) that the page applies on load.
+"""
+import threading
+
+from flask import render_template
+from markupsafe import Markup
+
+_fragments = {}  # (version_id, read_only) -> Markup
+_lock = threading.Lock()
+
+
+def render_form_items(tooling_list, version_id, read_only):
+    """Item markup for `tooling_list`; cached when it is a pinned (immutable) version."""
+    if version_id is None:
+        return Markup(render_template('inventory_form_items.html', tooling_list=tooling_list, read_only=read_only))
+    key = (version_id, bool(read_only))
+    html = _fragments.get(key)
+    if html is None:
+        html = Markup(render_template('inventory_form_items.html', tooling_list=tooling_list, read_only=read_only))
+        with _lock:
+            _fragments[key] = html
+    return html
+
+
+def existing_overlay(existing):
+    """Compact {item_number: {...}} of checked statuses and notes from the `existing` prefill map."""
+    out = {}
+    for num, ex in (existing or {}).items():
+        statuses = ex.get('statuses') or ()
+        notes = ex.get('notes') or {}
+        entry = {
+            'missing': 'Missing' in statuses,
+            'redtag': 'Red Tag' in statuses,
+            'complete': 'Complete' in statuses,
+            'note_missing': notes.get('missing') or '',
+            'note_redtag': notes.get('redtag') or '',
+        }
+        out[num] = {k: v for k, v in entry.items() if v}
+    return out
@@ -0,0 +1,74 @@
+# utils/idempotency.py
+"""
+Idempotency keys for inventory submissions.
+
+Every rendered inventory form carries a fresh key (hidden field
+``idempotency_key``; the JSON submit sends the same value). The first
+submission with a key claims it by inserting a SubmissionReceipt before it
+touches anything else, and fills in the receipt's redirect when it commits
+the responses and invoice. A replay of that key (double tap, browser retry
+after a dropped connection), even one racing the first, is answered from
+the receipt before anything is deleted, rewritten or generated.
+"""
+import re
+import uuid
+from datetime import datetime, timedelta
+
+from flask import abort, current_app
+from sqlalchemy import delete, update
+
+from database import db
+from models import SubmissionReceipt
+
+KEY_FIELD = 'idempotency_key'
+_KEY_RE = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+
+def new_key():
+    return uuid.uuid4().hex
+
+
+def clean_key(raw):
+    """The submitted key, or None if absent/malformed (the submission then runs unguarded)."""
+    raw = (raw or '').strip() if isinstance(raw, str) else ''
+    return raw if _KEY_RE.match(raw) else None
+
+
+def claim(key, trailer_id, endpoint):
+    """
+    Claim `key` for this submission; call before anything is written. Returns
+    the redirect of an earlier submission with the key (answer with it and
+    write nothing), else None. 409 if the key belongs to another trailer.
+
+    The claim is a receipt row inserted with an empty redirect. Duplicates
+    racing on one key serialize on its primary key: the later INSERT waits
+    for the first transaction, then finds the committed receipt.
+    """
+    if not key:
+        return None
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    ttl_days = current_app.config.get('IDEMPOTENCY_KEY_TTL_DAYS', 7)
+    db.session.execute(delete(SubmissionReceipt)
+                       .where(SubmissionReceipt.created_at < datetime.now() - timedelta(days=ttl_days)))
+    stmt = (insert(SubmissionReceipt)
+            .values(key=key, trailer_id=trailer_id, endpoint=endpoint, redirect_url='')
+            .on_conflict_do_nothing(index_elements=['key']))
+    if db.session.execute(stmt).rowcount:
+        return None
+    row = (db.session.query(SubmissionReceipt.trailer_id, SubmissionReceipt.redirect_url)
+           .filter(SubmissionReceipt.key == key).first())
+    if row.trailer_id != trailer_id:
+        abort(409, 'idempotency key was issued for another trailer')
+    return row.redirect_url or None
+
+
+def commit_with_receipt(key, redirect_url):
+    """Commit the pending submission with its claimed receipt's redirect filled in. Returns the redirect."""
+    if key:
+        db.session.execute(update(SubmissionReceipt).where(SubmissionReceipt.key == key)
+                           .values(redirect_url=redirect_url))
+    db.session.commit()
+    return redirect_url
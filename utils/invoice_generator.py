@@ -2,6 +2,10 @@
 from datetime import datetime
 from pathlib import Path
 from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import db
 
 # Project structure: <project_root>/{templates, static/invoices}
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
@@ -12,6 +16,7 @@ env = Environment(
     loader=FileSystemLoader(str(TEMPLATES_DIR)),
     autoescape=select_autoescape(["html", "xml"]),
 )
+_WRITTEN_KEY = 'invoice_files_written'  # files whose Invoice row hasn't committed yet
 
 def generate_invoice(trailer_id, items):
     """
@@ -19,6 +24,7 @@ def generate_invoice(trailer_id, items):
     and save it to static/invoices/invoice_trailer_<id>_<timestamp>.html
 
     Returns the absolute filesystem path (string) to the saved HTML file.
+    The file is deleted again if the request's transaction doesn't commit.
     """
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -34,5 +40,20 @@ def generate_invoice(trailer_id, items):
         date=ts_pretty,
     )
 
+    created = not out_path.exists()  # same-minute regenerations reuse the name; never delete those
     out_path.write_text(html, encoding="utf-8")
+    if created:
+        db.session().info.setdefault(_WRITTEN_KEY, []).append(out_path)
     return str(out_path)
+
+
+@event.listens_for(Session, 'after_commit')
+def _keep_written(session):
+    session.info.pop(_WRITTEN_KEY, None)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _discard_written(session, transaction):
+    if transaction.parent is None:
+        for path in session.info.pop(_WRITTEN_KEY, ()):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,111 @@
+# utils/invoice_lines.py
+"""
+Billed trailer invoice lines as rows.
+
+confirm_invoice still snapshots the lines into Invoice.line_items_json, and
+also writes them to invoice_line (with the invoice's billed_at and trailer
+copied onto each row). Per-invoice totals, billed quantities per item and
+billed revenue per month are then plain SQL aggregates over an indexed
+table. Lines go away with their invoice (ON DELETE CASCADE), so deleting or
+regenerating an invoice unbills it. bill_invoice/unbill_invoice also keep
+the monthly revenue rollup (utils/revenue_rollup.py) in step.
+"""
+import json
+from datetime import datetime
+
+from sqlalchemy import delete, exists, func, insert, update
+
+from database import db
+from models import Invoice, InvoiceLine, ArchivedInvoice, ArchivedInvoiceLine
+from utils import revenue_rollup
+
+LINE_FIELDS = ('item_number', 'item_name', 'category', 'expected_qty', 'missing_qty', 'redtag_qty',
+               'billable_qty', 'billable_unit', 'unit_price', 'line_total', 'note')
+BACKFILL_BATCH = 500
+
+
+def line_rows(invoice_id, trailer_id, billed_at, line_items):
+    """invoice_line insert dicts for one invoice's line items, in order."""
+    return [dict({f: li.get(f) for f in LINE_FIELDS}, invoice_id=invoice_id, trailer_id=trailer_id,
+                 billed_at=billed_at, sort_order=i)
+            for i, li in enumerate(line_items)]
+
+
+def write_invoice_lines(invoice, line_items):
+    """Replace `invoice`'s lines with `line_items` (the _compute_line_items dicts). No commit."""
+    db.session.execute(delete(InvoiceLine).where(InvoiceLine.invoice_id == invoice.id))
+    if line_items:
+        db.session.execute(insert(InvoiceLine), line_rows(invoice.id, invoice.trailer_id, invoice.billed_at, line_items))
+
+
+def bill_invoice(invoice, line_items):
+    """Mark `invoice` billed now and snapshot `line_items` to JSON, invoice_line and the rollup. No commit."""
+    if invoice.billed:
+        revenue_rollup.apply_invoice(invoice, -1)  # re-confirming replaces the earlier billing
+    invoice.billed = True
+    invoice.billed_at = datetime.now()
+    invoice.line_items_json = json.dumps(line_items)
+    write_invoice_lines(invoice, line_items)
+    revenue_rollup.apply_invoice(invoice, 1)
+
+
+def unbill_invoice(invoice):
+    """Mark `invoice` unbilled and drop its lines (the JSON snapshot stays for re-billing). No commit."""
+    revenue_rollup.apply_invoice(invoice, -1)
+    invoice.billed = False
+    invoice.billed_at = None
+    db.session.execute(delete(InvoiceLine).where(InvoiceLine.invoice_id == invoice.id))
+
+
+def unbill_trailer_invoices(trailer_id):
+    """Unbill every billed invoice on a trailer before its invoices are deleted. No commit."""
+    for invoice in Invoice.query.filter_by(trailer_id=trailer_id, billed=True):
+        unbill_invoice(invoice)
+
+
+def invoice_line_items(invoice_id):
+    """An invoice's billed lines as the same dicts _compute_line_items returns, plus the SQL total."""
+    rows = (db.session.query(*[getattr(InvoiceLine, f) for f in LINE_FIELDS])
+            .filter(InvoiceLine.invoice_id == invoice_id)
+            .order_by(InvoiceLine.sort_order, InvoiceLine.id)
+            .all())
+    total = (db.session.query(func.coalesce(func.sum(InvoiceLine.line_total), 0.0))
+             .filter(InvoiceLine.invoice_id == invoice_id).scalar())
+    return [dict(zip(LINE_FIELDS, r)) for r in rows], float(total)
+
+
+def backfill_invoice_lines():
+    """Write lines for billed invoices (both tiers) that predate invoice_line. Idempotent; commits."""
+    done = 0
+    for inv_model, line_model in ((Invoice, InvoiceLine), (ArchivedInvoice, ArchivedInvoiceLine)):
+        last_id = None
+        while True:
+            batch = (db.session.query(inv_model.id, inv_model.trailer_id, inv_model.created_at,
+                                      inv_model.line_items_json)
+                     .filter(inv_model.billed.is_(True), inv_model.billed_at.is_(None))
+                     .order_by(inv_model.id).limit(BACKFILL_BATCH).all())
+            if not batch:
+                break
+            rows = []
+            for inv_id, trailer_id, created_at, items_json in batch:
+                has_lines = db.session.query(exists().where(line_model.invoice_id == inv_id)).scalar()
+                if not has_lines:
+                    rows.extend(line_rows(inv_id, trailer_id, created_at, json.loads(items_json or '[]')))
+            if rows:
+                if line_model is ArchivedInvoiceLine:
+                    # Archive rows keep their hot-tier id, so lines that never had one count down
+                    # from -1: they can't collide with invoice_line's sequence if restored
+                    if last_id is None:
+                        last_id = min(db.session.query(func.min(line_model.id)).scalar() or 0, 0)
+                    for r in rows:
+                        last_id -= 1
+                        r['id'] = last_id
+                db.session.execute(insert(line_model), rows)
+            # billed_at falls back to the invoice date for historical invoices
+            db.session.execute(update(inv_model)
+                               .where(inv_model.id.in_([b[0] for b in batch]))
+                               .values(billed_at=inv_model.created_at)
+                               .execution_options(synchronize_session=False))
+            db.session.commit()
+            done += len(batch)
+    return done
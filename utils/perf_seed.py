@@ -0,0 +1,236 @@
+# utils/perf_seed.py
+"""
+Deterministic production-scale data generator (`flask seed-perf`).
+
+Everything is derived from one random.Random(seed) and a fixed epoch (the
+newest possible created_at), so the same options always produce the same
+rows. Rows are generated lazily in batches and
+written with Core `table.insert()` executemany calls, which skips the ORM
+unit of work entirely.
+"""
+import json
+import random
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func
+
+from database import db
+from models import (
+    Trailer, InventoryResponse, Invoice, InvoiceLine, WarehouseProduct,
+    WarehouseOrder, WarehouseOrderLine,
+)
+from utils.invoice_lines import line_rows
+from utils.revenue_rollup import rebuild_revenue_rollup
+from utils.price_history import sales_price
+from utils.product_categories import backfill_product_categories
+from utils.tooling_lists import tooling_lists
+
+# Share of trailers in each status, and per-item flag rates on submitted forms
+STATUS_MIX = [('Completed', 0.70), ('In Progress', 0.10), ('Pending', 0.20)]
+MISSING_RATE = 0.04
+RED_TAG_RATE = 0.02
+BILLED_RATE = 0.60
+ORDER_BILLED_RATE = 0.70
+BILLING_LAG_DAYS = 14  # billed_at trails the invoice date by up to this much
+
+# created_at values count back from here unless --epoch says otherwise
+EPOCH = datetime(2026, 1, 1)
+
+_WORDS = ['Hammer', 'Grinder', 'Drill', 'Socket', 'Wrench', 'Chain', 'Shackle', 'Strap', 'Lead',
+          'Tape', 'Blade', 'Impact', 'Clamp', 'Gloves', 'Vest', 'Cord', 'Level', 'Bit', 'Hose', 'Valve']
+
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _bulk_insert(model, rows, batch_size):
+    """Core executemany insert of an iterable of dicts. Returns row count."""
+    table = model.__table__
+    conn = db.session.connection()
+    n = 0
+    for batch in _batched(rows, batch_size):
+        conn.execute(table.insert(), batch)
+        n += len(batch)
+    return n
+
+
+def _new_ids(model, after_id):
+    return [i for (i,) in db.session.query(model.id).filter(model.id > after_id).order_by(model.id)]
+
+
+def _max_id(model):
+    return db.session.query(func.coalesce(func.max(model.id), 0)).scalar()
+
+
+def generate(seed=1, trailers=20000, products=20000, orders=50000, days=730,
+             batch_size=10000, echo=None, epoch=EPOCH):
+    """Insert a synthetic dataset and commit. Returns {table: rows inserted}."""
+    rng = random.Random(seed)
+    echo = echo or (lambda msg: None)
+    now = epoch
+    list_names = list(tooling_lists.keys())
+    counts = {}
+
+    def when():
+        return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+    # --- Products: every tooling-list item first, then synthetic catalog rows ---
+    # Products already in the catalog keep their rows; their prices still feed seeded invoices
+    price_map = {num.upper(): sales_price(cost)
+                 for num, cost in db.session.query(WarehouseProduct.item_number, WarehouseProduct.unit_cost)}
+    existing = set(price_map)
+    catalog = {}
+    for items in tooling_lists.values():
+        for it in items:
+            catalog.setdefault(it['Item Number'].upper(), it['Item Name'])
+    product_rows = []
+    for num, name in catalog.items():
+        if len(product_rows) >= products:
+            break
+        product_rows.append((num, name))
+    i = 0
+    while len(product_rows) < products:
+        product_rows.append((f'PERF {i:07d}', f'{rng.choice(_WORDS)} {rng.choice(_WORDS)} {rng.randint(1, 48)}"'))
+        i += 1
+
+    def product_dicts():
+        for num, name in product_rows:
+            if num in existing:
+                continue
+            cost = round(rng.uniform(0.5, 600), 2)
+            price_map[num] = sales_price(cost)
+            yield {'item_number': num, 'item_name': name, 'quantity_on_hand': rng.randint(0, 400),
+                   'reorder_point': rng.randint(0, 25), 'unit_cost': cost, 'created_at': when()}
+    counts['warehouse_product'] = _bulk_insert(WarehouseProduct, product_dicts(), batch_size)
+    echo(f"warehouse_product: {counts['warehouse_product']}")
+
+    # --- Trailers spread across the four tooling lists ---
+    statuses = [s for s, _ in STATUS_MIX]
+    weights = [w for _, w in STATUS_MIX]
+    first_trailer = _max_id(Trailer)
+    trailer_meta = []  # (status, list_name, job_number, created_at) in insert order
+
+    def trailer_dicts():
+        for n in range(trailers):
+            status = rng.choices(statuses, weights)[0]
+            list_name = list_names[n % len(list_names)]
+            created = when()
+            job = rng.randint(1, max(1, trailers // 20))
+            trailer_meta.append((status, list_name, f'J{job:05d}', created))
+            yield {'trailer_id': f'T-{n:06d}', 'job_name': f'Job {job}', 'job_number': f'J{job:05d}',
+                   'location': f'Yard {job % 12}', 'inventory_type': list_name, 'tooling_list_name': list_name,
+                   'status': status, 'assigned_user': f'crew{rng.randint(1, 60)}',
+                   'foreman_name': f'foreman{rng.randint(1, 15)}'}
+    counts['trailer'] = _bulk_insert(Trailer, trailer_dicts(), batch_size)
+    trailer_ids = _new_ids(Trailer, first_trailer)
+    echo(f"trailer: {counts['trailer']}")
+
+    # --- Responses for every submitted trailer, plus one invoice each ---
+    invoices = []
+    invoice_items = []  # line_items per invoice, in insert order
+
+    def response_dicts():
+        for tid, (status, list_name, job_number, created) in zip(trailer_ids, trailer_meta):
+            if status != 'Completed':
+                continue
+            line_items = []
+            for it in tooling_lists[list_name]:
+                num, name, cat = it['Item Number'], it['Item Name'], it['Category']
+                base = {'trailer_id': tid, 'item_number': num, 'item_name': name,
+                        'category': cat, 'created_at': created}
+                roll = rng.random()
+                if roll < MISSING_RATE + RED_TAG_RATE:
+                    flag = 'Missing' if roll < MISSING_RATE else 'Red Tag'
+                    qty = rng.randint(1, max(1, it['Quantity'] or 1))
+                    yield dict(base, status=flag, quantity=qty, note=str(qty))
+                    price = price_map.get(num.upper(), 0.0)
+                    line_items.append({'item_number': num, 'item_name': name, 'category': cat,
+                                       'expected_qty': it['Quantity'],
+                                       'missing_qty': qty if flag == 'Missing' else 0,
+                                       'redtag_qty': qty if flag == 'Red Tag' else 0,
+                                       'billable_qty': qty, 'billable_unit': None, 'unit_price': price,
+                                       'line_total': price * qty, 'note': ''})
+                else:
+                    yield dict(base, status='Complete', quantity=0, note='')
+            billed = rng.random() < BILLED_RATE
+            billed_at = min(created + timedelta(seconds=rng.randint(0, BILLING_LAG_DAYS * 86400)), now)
+            invoices.append({'trailer_id': tid, 'file_path': '', 'billed': billed, 'created_at': created,
+                             'line_items_json': json.dumps(line_items) if billed else None,
+                             'billed_at': billed_at if billed else None,
+                             'billed_job_number': job_number if billed else None,
+                             'billed_list_name': list_name if billed else None})
+            invoice_items.append(line_items if billed else [])
+    counts['inventory_response'] = _bulk_insert(InventoryResponse, response_dicts(), batch_size)
+    echo(f"inventory_response: {counts['inventory_response']}")
+    first_invoice = _max_id(Invoice)
+    counts['invoice'] = _bulk_insert(Invoice, invoices, batch_size)
+    echo(f"invoice: {counts['invoice']}")
+
+    # Billed invoices get invoice_line rows stamped with their own billed_at, as bill_invoice writes them
+    def invoice_line_dicts():
+        for inv_id, inv, items in zip(_new_ids(Invoice, first_invoice), invoices, invoice_items):
+            yield from line_rows(inv_id, inv['trailer_id'], inv['billed_at'], items)
+    counts['invoice_line'] = _bulk_insert(InvoiceLine, invoice_line_dicts(), batch_size)
+    echo(f"invoice_line: {counts['invoice_line']}")
+
+    # --- Warehouse orders with lines (billed ones carry price snapshots) ---
+    first_order = _max_id(WarehouseOrder)
+    order_meta = []
+
+    def order_dicts():
+        for _ in range(orders):
+            billed = rng.random() < ORDER_BILLED_RATE
+            lines = [(rng.choice(product_rows), rng.randint(1, 12)) for _ in range(rng.randint(1, 8))]
+            order_meta.append((billed, lines))
+            total = sum(price_map.get(num, 0.0) * qty for (num, _), qty in lines) if billed else 0.0
+            yield {'trailer_id': rng.choice(trailer_ids) if trailer_ids and rng.random() < 0.8 else None,
+                   'order_type': 'PURCHASE' if rng.random() < 0.15 else 'SALE',
+                   'status': 'Billed' if billed else 'Pending', 'billed': billed,
+                   'order_total': round(total, 2), 'requester_name': f'crew{rng.randint(1, 60)}',
+                   'notes': '', 'created_at': when()}
+    counts['warehouse_order'] = _bulk_insert(WarehouseOrder, order_dicts(), batch_size)
+    order_ids = _new_ids(WarehouseOrder, first_order)
+
+    def line_dicts():
+        for oid, (billed, lines) in zip(order_ids, order_meta):
+            for (num, name), qty in lines:
+                price = price_map.get(num, 0.0) if billed else 0.0
+                yield {'order_id': oid, 'item_number': num if billed or rng.random() < 0.3 else None,
+                       'item_name': name, 'quantity': qty, 'unit_price': price, 'line_total': price * qty}
+    counts['warehouse_order_line'] = _bulk_insert(WarehouseOrderLine, line_dicts(), batch_size)
+    echo(f"warehouse_order: {counts['warehouse_order']}, lines: {counts['warehouse_order_line']}")
+
+    db.session.commit()
+
+    echo(f"billed_revenue_month: {rebuild_revenue_rollup()}")
+    backfill_product_categories()
+    return counts
+
+
+@click.command('seed-perf')
+@click.option('--seed', default=1, show_default=True, help='Random seed (same seed, same data).')
+@click.option('--trailers', default=20000, show_default=True)
+@click.option('--products', default=20000, show_default=True)
+@click.option('--orders', default=50000, show_default=True)
+@click.option('--days', default=730, show_default=True, help='Spread created_at over this many past days.')
+@click.option('--epoch', type=click.DateTime(), default=EPOCH.isoformat(), show_default=True,
+              help='Newest created_at; older rows count back from here.')
+@click.option('--batch-size', default=10000, show_default=True)
+@with_appcontext
+def seed_perf_command(seed, trailers, products, orders, days, epoch, batch_size):
+    """Bulk-load a deterministic production-scale dataset for performance work."""
+    started = datetime.now()
+    counts = generate(seed=seed, trailers=trailers, products=products, orders=orders,
+                      days=days, batch_size=batch_size, echo=click.echo, epoch=epoch)
+    elapsed = (datetime.now() - started).total_seconds()
+    click.echo(f'Inserted {sum(counts.values()):,} rows in {elapsed:.1f}s.')
@@ -0,0 +1,94 @@
+# utils/price_history.py
+"""
+Effective-dated item prices.
+
+The warehouse import keeps every PRICES sheet row in item_price_history,
+keyed by (item_number, effective_from), instead of only today's winner.
+prices_as_of() resolves the price in effect on a date for a whole batch of
+items in one query, so an invoice can be priced as of the trailer's
+inventory date. WarehouseProduct.unit_cost stays the current price; items
+with no history on or before the date fall back to it.
+"""
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import and_, func
+
+from database import db
+from models import InventoryResponse, ItemPriceHistory, WarehouseProduct
+
+# effective_from for PRICES rows without a date: in effect since forever
+UNDATED = date(1900, 1, 1)
+
+
+def sales_price(unit_cost):
+    """Sales price for a purchase cost (SALES_MARKUP, rounded to cents)."""
+    return round((unit_cost or 0.0) * current_app.config.get('SALES_MARKUP', 1.10), 2)
+
+
+def _base_cost(purchase, sales):
+    # Same rule the import uses for unit_cost: purchase price, else the sheet's sales price
+    return purchase if purchase else (sales or 0.0)
+
+
+def record_price_history(records):
+    """Upsert {ITEM: [(date or None, purchase, sales)]} from a PRICES sheet. No commit; returns row count."""
+    rows = {}
+    for item_number, entries in records.items():
+        for effective, purchase, sales in entries:
+            key = (item_number.strip().upper(), effective or UNDATED)
+            rows[key] = {'item_number': key[0], 'effective_from': key[1],
+                         'purchase_price': purchase, 'sales_price': sales}
+    if not rows:
+        return 0
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(ItemPriceHistory)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['item_number', 'effective_from'],
+        set_={'purchase_price': stmt.excluded.purchase_price, 'sales_price': stmt.excluded.sales_price,
+              'imported_at': func.now()})
+    db.session.execute(stmt, list(rows.values()))
+    return len(rows)
+
+
+def prices_as_of(item_numbers, as_of):
+    """{ITEM: sales price} in effect on `as_of` for a batch of item numbers.
+
+    One query over the (item_number, effective_from) index for the whole
+    batch; items with no history on or before `as_of` fall back to the
+    product's current unit_cost (a second query, only for those).
+    """
+    nums = {(n or '').strip().upper() for n in item_numbers} - {''}
+    if not nums:
+        return {}
+    h = ItemPriceHistory
+    latest = (db.session.query(h.item_number.label('item_number'),
+                               func.max(h.effective_from).label('effective_from'))
+              .filter(h.item_number.in_(nums), h.effective_from <= as_of)
+              .group_by(h.item_number)
+              .subquery())
+    rows = (db.session.query(h.item_number, h.purchase_price, h.sales_price)
+            .join(latest, and_(h.item_number == latest.c.item_number,
+                               h.effective_from == latest.c.effective_from))
+            .all())
+    out = {num: sales_price(_base_cost(purchase, sales)) for num, purchase, sales in rows}
+
+    missing = nums - out.keys()
+    if missing:
+        product_key = func.upper(func.trim(WarehouseProduct.item_number))
+        for num, unit_cost in (db.session.query(product_key, WarehouseProduct.unit_cost)
+                               .filter(product_key.in_(missing))):
+            out[num] = sales_price(unit_cost)
+    return out
+
+
+def inventory_date(trailer):
+    """Date the trailer was inventoried (its latest response), or None if it has none."""
+    latest = (db.session.query(func.max(InventoryResponse.created_at))
+              .filter(InventoryResponse.trailer_id == trailer.id).scalar())
+    if latest is None:
+        return None
+    return latest.date() if hasattr(latest, 'date') else date.fromisoformat(str(latest)[:10])
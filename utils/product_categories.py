@@ -0,0 +1,102 @@
+# utils/product_categories.py
+"""
+Stored warehouse product categories.
+
+A product's category is the category of the first tooling list item with
+the same item number (display form, 'Other' when no list has it). It is
+kept on warehouse_product.category so the stock page can group, count and
+page products in SQL. A session after_flush hook re-resolves the affected
+item numbers whenever products or tooling list items change through the
+ORM; bulk list edits (utils/tooling_list_editor.py) call
+refresh_product_categories() themselves.
+"""
+from sqlalchemy import bindparam, event, func, inspect as sa_inspect
+from sqlalchemy.orm import Session
+
+from database import db
+from models import ToolingListItem, WarehouseProduct
+from utils.change_log import record_bulk
+
+DEFAULT_CATEGORY = 'Other'
+# Item numbers per IN (...) clause
+_CHUNK = 500
+
+
+def category_label(raw):
+    return (raw or DEFAULT_CATEGORY).strip().replace('_', ' ').title() or DEFAULT_CATEGORY
+
+
+def _key(item_number):
+    return (item_number or '').strip().upper()
+
+
+def _chunks(values):
+    values = list(values)
+    for i in range(0, len(values), _CHUNK):
+        yield values[i:i + _CHUNK]
+
+
+def _refresh(conn, numbers=None):
+    """Re-resolve categories for products with these (normalized) item numbers, or all. Returns changed count."""
+    item_key = func.upper(func.trim(ToolingListItem.item_number))
+    product_key = func.upper(func.trim(WarehouseProduct.item_number))
+    list_q = (db.select(item_key, ToolingListItem.category)
+              .where(ToolingListItem.item_number.isnot(None))
+              .order_by(ToolingListItem.id))
+    product_q = db.select(WarehouseProduct.id, product_key, WarehouseProduct.category)
+
+    if numbers is None:
+        batches = [(list_q, product_q)]
+    else:
+        batches = [(list_q.where(item_key.in_(chunk)), product_q.where(product_key.in_(chunk)))
+                   for chunk in _chunks(n for n in set(numbers) if n)]
+
+    changes = []
+    for lq, pq in batches:
+        categories = {}
+        for num, category in conn.execute(lq):
+            categories.setdefault(num, category_label(category))
+        for pid, num, current in conn.execute(pq):
+            category = categories.get(num, DEFAULT_CATEGORY)
+            if category != current:
+                changes.append({'pid': pid, 'category': category})
+    if changes:
+        table = WarehouseProduct.__table__
+        conn.execute(table.update().where(table.c.id == bindparam('pid'))
+                     .values(category=bindparam('category')), changes)
+        record_bulk('product', [c['pid'] for c in changes], 'update', ['category'])
+    return len(changes)
+
+
+def refresh_product_categories(item_numbers=None):
+    """Re-resolve stored categories for `item_numbers` (any case), or every product. No commit."""
+    numbers = None if item_numbers is None else {_key(n) for n in item_numbers}
+    return _refresh(db.session.connection(), numbers)
+
+
+def backfill_product_categories():
+    """Fill in categories for products that predate the column (or were written by raw SQL). Commits."""
+    if db.session.query(WarehouseProduct.id).filter(WarehouseProduct.category.is_(None)).first() is not None:
+        refresh_product_categories()
+        db.session.commit()
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_after_flush(session, flush_context):
+    """Collect item numbers whose category may have changed and re-resolve them in this transaction."""
+    numbers = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, WarehouseProduct):
+            if obj in session.deleted:
+                continue
+            state = sa_inspect(obj)
+            if obj in session.new or state.attrs.item_number.history.has_changes() or obj.category is None:
+                numbers.add(_key(obj.item_number))
+        elif isinstance(obj, ToolingListItem):
+            state = sa_inspect(obj)
+            numbers.add(_key(obj.item_number))
+            for attr in ('item_number', 'category'):
+                numbers.update(_key(v) for v in state.attrs[attr].history.deleted or ())
+    numbers.discard('')
+    if numbers:
+        _refresh(session.connection(), numbers)
@@ -0,0 +1,397 @@
+# utils/product_index.py
+"""
+In-memory n-gram/token index over everything that carries an item number:
+warehouse products, specialty tools, item prices and tooling list items.
+
+Documents are keyed by (kind, id). The index is built once per process from
+each source's number/name columns, then kept current by session events:
+rows inserted/updated/deleted through the ORM are applied to the index
+after the transaction commits, and bulk list edits call
+reindex_tooling_list(). Every REBUILD_TTL_SECONDS the index is rebuilt in
+a background thread to pick up edits made by other worker processes;
+requests keep using the old copy meanwhile, and changes committed during
+the rebuild are replayed onto the new copy before it is swapped in.
+
+search() is the fuzzy n-gram ranking that links order lines to products;
+typeahead() is the ranked prefix/substring lookup behind the stock page,
+the product typeahead and catalog search (utils/catalog_search.py). Both
+default to products and take `kinds` to search other sources.
+"""
+import bisect
+import heapq
+import re
+import threading
+import time
+from collections import Counter, defaultdict, namedtuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Score at/above which an order line is linked without asking anyone
+AUTO_LINK_SCORE = 0.85
+# ...and the runner-up must trail by at least this much
+AUTO_LINK_MARGIN = 0.10
+# Rebuild from the DB in the background this often (picks up other workers' edits)
+REBUILD_TTL_SECONDS = 300
+# Only the candidates sharing the most n-grams are scored exactly
+MAX_CANDIDATES = 200
+# Grams on more than this share of the searched documents are too common to generate candidates
+COMMON_GRAM_SHARE = 0.05
+
+# Document kinds, in display order when scores tie
+KINDS = ('product', 'tool', 'price', 'list_item')
+PRODUCTS = ('product',)
+
+# typeahead() scores per match tier
+EXACT, NUMBER_PREFIX, NAME_PREFIX, SUBSTRING = 1.0, 0.8, 0.6, 0.4
+
+Match = namedtuple('Match', 'kind ref_id item_number item_name context score')
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+_ALPHA_DIGIT = re.compile(r'(?<=[a-z])(?=[0-9])|(?<=[0-9])(?=[a-z])')
+
+
+def normalize(text):
+    """Lowercase, turn punctuation into spaces, split '16oz' -> '16 oz', collapse whitespace."""
+    s = _NON_ALNUM.sub(' ', str(text or '').lower())
+    return ' '.join(_ALPHA_DIGIT.sub(' ', s).split())
+
+
+def grams(text):
+    """Return the set of padded trigrams plus whole tokens for `text`."""
+    norm = normalize(text)
+    out = set()
+    for tok in norm.split():
+        out.add('w:' + tok)
+        padded = f'  {tok} '
+        for i in range(len(padded) - 2):
+            out.add(padded[i:i + 3])
+    return out
+
+
+class ItemIndex:
+    """Inverted n-gram index: gram -> (kind, id) keys, plus exact number/name maps."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}                     # key -> (item_number, item_name, context, number_key,
+                                            #         name_norm, number_grams, name_grams)
+        self._postings = defaultdict(set)   # gram -> keys
+        self._by_number = defaultdict(set)  # UPPER item_number -> keys
+        self._by_name = defaultdict(set)    # normalized name -> keys
+        self._counts = Counter()            # kind -> documents
+        self._prefix_keys = None            # sorted [(number or name token, key)]; None = stale
+        self.built_at = 0.0
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def _tokens(number_key, name_norm):
+        return {number_key.lower()} | set(normalize(number_key).split()) | set(name_norm.split())
+
+    @staticmethod
+    def _discard(mapping, field, key):
+        keys = mapping.get(field)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del mapping[field]
+
+    def add(self, kind, ref_id, item_number, item_name, context=None):
+        key = (kind, ref_id)
+        with self._lock:
+            self.remove(kind, ref_id)
+            number_key = (item_number or '').strip().upper()
+            name_norm = normalize(item_name)
+            num_g, name_g = grams(item_number), grams(item_name)
+            self._docs[key] = (item_number or '', item_name or '', context, number_key, name_norm, num_g, name_g)
+            for gram in num_g | name_g:
+                self._postings[gram].add(key)
+            if number_key:
+                self._by_number[number_key].add(key)
+            if name_norm:
+                self._by_name[name_norm].add(key)
+            self._counts[kind] += 1
+            self._prefix_keys = None
+
+    def remove(self, kind, ref_id):
+        key = (kind, ref_id)
+        with self._lock:
+            doc = self._docs.pop(key, None)
+            if not doc:
+                return
+            number_key, name_norm, num_g, name_g = doc[3:]
+            for gram in num_g | name_g:
+                self._discard(self._postings, gram, key)
+            self._discard(self._by_number, number_key, key)
+            self._discard(self._by_name, name_norm, key)
+            self._counts[kind] -= 1
+            self._prefix_keys = None
+
+    def remove_where(self, kind, context):
+        """Drop every `kind` doc with this context (e.g. all items of one tooling list)."""
+        with self._lock:
+            for key in [k for k, doc in self._docs.items() if k[0] == kind and doc[2] == context]:
+                self.remove(*key)
+
+    def _match(self, key, score):
+        item_number, item_name, context = self._docs[key][:3]
+        return Match(key[0], key[1], item_number, item_name, context, round(score, 3))
+
+    @staticmethod
+    def _first(keys, allowed):
+        """The lowest-ranked-kind, lowest-id key of `keys` among `allowed` kinds, or None."""
+        keys = [k for k in keys or () if k[0] in allowed]
+        return min(keys, key=lambda k: (KINDS.index(k[0]), k[1])) if keys else None
+
+    @staticmethod
+    def _similarity(q, field_grams):
+        """Mean of Dice and query containment, so short queries inside long names still rank."""
+        if not field_grams:
+            return 0.0
+        n = len(q & field_grams)
+        return (2.0 * n / (len(q) + len(field_grams)) + n / len(q)) / 2.0
+
+    def search(self, text, limit=5, kinds=PRODUCTS):
+        """Return up to `limit` Matches ranked by n-gram similarity to the name or number."""
+        allowed = set(kinds)
+        with self._lock:
+            exact = (self._first(self._by_number.get(str(text or '').strip().upper()), allowed)
+                     or self._first(self._by_name.get(normalize(text)), allowed))
+            q = grams(text)
+            if not q:
+                return []
+
+            # Rarest grams first; skip very common ones once rarer grams found candidates
+            postings = sorted((self._postings.get(g, ()) for g in q), key=len)
+            common = max(50, int(sum(self._counts[k] for k in allowed) * COMMON_GRAM_SHARE))
+            shared = defaultdict(int)
+            for keys in postings:
+                if len(keys) > common and shared:
+                    break
+                for key in keys:
+                    if key[0] in allowed:
+                        shared[key] += 1
+
+            candidates = heapq.nlargest(MAX_CANDIDATES, shared, key=shared.get)
+            scored = []
+            for key in candidates:
+                if key == exact:
+                    continue
+                num_g, name_g = self._docs[key][5:]
+                scored.append((max(self._similarity(q, num_g), self._similarity(q, name_g)), key))
+            scored.sort(reverse=True)
+
+            out = [self._match(exact, 1.0)] if exact else []
+            out.extend(self._match(key, score) for score, key in scored[:limit - len(out)])
+            return out
+
+    def _sorted_prefix_keys(self):
+        if self._prefix_keys is None:
+            keys = []
+            for key, doc in self._docs.items():
+                keys.extend((tok, key) for tok in self._tokens(doc[3], doc[4]))
+            keys.sort()
+            self._prefix_keys = keys
+        return self._prefix_keys
+
+    def typeahead(self, text, limit=20, kinds=PRODUCTS):
+        """Prefix + substring lookup for search boxes.
+
+        Ranks exact item number, then item-number / name-word prefixes, then
+        substrings of the number or name; ties go by kind, then name.
+        Returns Matches (score = rank tier).
+        """
+        raw = str(text or '').strip().lower()
+        norm = normalize(text)
+        if not raw:
+            return []
+        allowed = set(kinds)
+        with self._lock:
+            tiers = {}
+
+            for key in self._by_number.get(raw.upper(), ()):
+                if key[0] in allowed:
+                    tiers[key] = EXACT
+
+            # Prefix: bisect into sorted numbers/name words, then check the whole query
+            keys = self._sorted_prefix_keys()
+            scan_cap = max(limit * 40, 400)
+            for prefix in {raw, norm.split()[0] if norm else raw}:
+                i = bisect.bisect_left(keys, (prefix,))
+                end = min(len(keys), i + scan_cap)
+                while i < end and keys[i][0].startswith(prefix):
+                    key = keys[i][1]
+                    i += 1
+                    if key[0] not in allowed:
+                        continue
+                    number_key, name_norm = self._docs[key][3:5]
+                    if number_key.lower().startswith(raw):
+                        tiers.setdefault(key, NUMBER_PREFIX)
+                    elif (' ' + name_norm).find(' ' + norm) >= 0:
+                        tiers.setdefault(key, NAME_PREFIX)
+
+            # Substring: intersect inner trigrams of each query word, then verify
+            inner = [tok[i:i + 3] for tok in norm.split() for i in range(len(tok) - 2)]
+            if inner and len(tiers) < limit:
+                postings = sorted((self._postings.get(g, set()) for g in inner), key=len)
+                for key in set.intersection(*postings) if postings else ():
+                    if key[0] not in allowed:
+                        continue
+                    number_key, name_norm = self._docs[key][3:5]
+                    if norm in name_norm or raw in number_key.lower():
+                        tiers.setdefault(key, SUBSTRING)
+
+            ranked = sorted(tiers.items(),
+                            key=lambda ks: (-ks[1], KINDS.index(ks[0][0]), self._docs[ks[0]][1].lower()))
+            return [self._match(key, tier) for key, tier in ranked[:limit]]
+
+    def best_match(self, text):
+        """Return the single product Match confident enough to auto-link, or None."""
+        ranked = self.search(text, limit=2)
+        if not ranked or ranked[0].score < AUTO_LINK_SCORE:
+            return None
+        if len(ranked) > 1 and ranked[0].score - ranked[1].score < AUTO_LINK_MARGIN:
+            return None
+        return ranked[0]
+
+
+# ---------- Sources ----------
+def _sources():
+    """(kind, model, context column or None) for every indexed table."""
+    from models import WarehouseProduct, SpecialtyTool, ItemPrice, ToolingListItem
+    return (
+        ('product', WarehouseProduct, None),
+        ('tool', SpecialtyTool, None),
+        ('price', ItemPrice, None),
+        ('list_item', ToolingListItem, 'list_name'),
+    )
+
+
+def _kind_of(obj):
+    for kind, model, context_attr in _sources():
+        if isinstance(obj, model):
+            return kind, context_attr
+    return None, None
+
+
+_index = None
+_index_lock = threading.Lock()
+_replay = None  # changes applied while a background rebuild runs; None = no rebuild running
+
+
+def _build():
+    fresh = ItemIndex()
+    fresh.built_at = time.monotonic()  # as of the start of the read
+    from database import db
+    for kind, model, context_attr in _sources():
+        cols = [model.id, model.item_number, model.item_name]
+        if context_attr:
+            cols.append(getattr(model, context_attr))
+        for row in db.session.query(*cols):
+            fresh.add(kind, *row)
+    return fresh
+
+
+def _rebuild_in_background(app):
+    global _index, _replay
+    try:
+        with app.app_context():
+            fresh = _build()
+    except Exception:
+        app.logger.exception('[INDEX] background rebuild failed; retrying after the TTL')
+        with _index_lock:
+            _index.built_at = time.monotonic()
+            _replay = None
+        return
+    with _index_lock:
+        for change in _replay:
+            change(fresh)
+        _index, _replay = fresh, None
+
+
+def get_item_index():
+    """Return the process-wide index: built on first use, refreshed in the background when stale."""
+    global _index, _replay
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = _build()
+    elif _replay is None and time.monotonic() - _index.built_at >= REBUILD_TTL_SECONDS:
+        from flask import current_app
+        with _index_lock:
+            if _replay is None:
+                _replay = []
+                threading.Thread(target=_rebuild_in_background, args=(current_app._get_current_object(),),
+                                 name='item-index-rebuild', daemon=True).start()
+    return _index
+
+
+def _apply(change):
+    """Run `change(index)` on the live index, and again on the new copy if a rebuild is running."""
+    with _index_lock:  # so a swap can't land between the two
+        change(_index)
+        if _replay is not None:
+            _replay.append(change)
+
+
+def auto_link_item_number(item_name):
+    """Item number of the product `item_name` confidently matches, else None."""
+    match = get_item_index().best_match(item_name)
+    return match.item_number if match else None
+
+
+def reindex_tooling_list(list_name):
+    """Re-read one list's items into the index (after bulk statements that skip ORM events)."""
+    if _index is None:
+        return
+    from database import db
+    from models import ToolingListItem
+    rows = (db.session.query(ToolingListItem.id, ToolingListItem.item_number, ToolingListItem.item_name)
+            .filter(ToolingListItem.list_name == list_name).all())
+
+    def change(index):
+        with index._lock:
+            index.remove_where('list_item', list_name)
+            for item_id, num, name in rows:
+                index.add('list_item', item_id, num, name, list_name)
+    _apply(change)
+
+
+# ---------- Keep the index current on ORM writes ----------
+_PENDING_KEY = 'item_index_pending'
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_item_changes(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, [])
+    for obj in list(session.new) + list(session.dirty):
+        kind, context_attr = _kind_of(obj)
+        if kind:
+            context = getattr(obj, context_attr) if context_attr else None
+            pending.append((kind, obj.id, obj.item_number, obj.item_name, context, False))
+    for obj in session.deleted:
+        kind, _ = _kind_of(obj)
+        if kind:
+            pending.append((kind, obj.id, None, None, None, True))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_item_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or _index is None:
+        return
+
+    def change(index):
+        for kind, ref_id, num, name, context, deleted in pending:
+            if deleted:
+                index.remove(kind, ref_id)
+            else:
+                index.add(kind, ref_id, num, name, context)
+    _apply(change)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_item_changes(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
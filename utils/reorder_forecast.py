@@ -0,0 +1,110 @@
+# utils/reorder_forecast.py
+"""
+Reorder point / quantity forecast for warehouse products.
+
+Daily consumption per product over the last FORECAST_WINDOW_DAYS comes from
+billed SALE warehouse order lines and billed trailer invoice lines, summed
+per item per day in SQL. The whole catalog is then one products x days
+NumPy matrix: recency-weighted mean and spread of daily use give a reorder
+point (lead-time demand + safety stock) and an order-up-to quantity for
+every product in a few array operations.
+
+Results are cached in reorder_suggestion; `flask forecast-reorder` (or the
+Recompute button on the warehouse page) replaces them.
+"""
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, func, insert, or_
+
+from database import db
+from models import (
+    WarehouseProduct, WarehouseOrder, WarehouseOrderLine, InvoiceLine, ReorderSuggestion,
+)
+
+
+def _daily_usage(start):
+    """(item_number, day, qty) per item per day since `start`, both demand sources."""
+    o, ol, il = WarehouseOrder, WarehouseOrderLine, InvoiceLine
+    orders = (db.session.query(func.upper(func.trim(ol.item_number)), func.date(o.created_at),
+                               func.sum(ol.quantity))
+              .join(o, o.id == ol.order_id)
+              .filter(o.billed.is_(True), or_(o.order_type == 'SALE', o.order_type.is_(None)),
+                      o.created_at >= start, ol.item_number.isnot(None))
+              .group_by(func.upper(func.trim(ol.item_number)), func.date(o.created_at)))
+    invoices = (db.session.query(func.upper(func.trim(il.item_number)), func.date(il.billed_at),
+                                 func.sum(il.billable_qty))
+                .filter(il.billed_at >= start, il.billable_qty > 0)
+                .group_by(func.upper(func.trim(il.item_number)), func.date(il.billed_at)))
+    return orders.all() + invoices.all()
+
+
+def compute_suggestions(now=None):
+    """Recompute reorder_suggestion for the whole catalog. Commits; returns rows written."""
+    import numpy as np
+
+    cfg = current_app.config
+    window = int(cfg.get('FORECAST_WINDOW_DAYS', 90))
+    half_life = float(cfg.get('FORECAST_HALF_LIFE_DAYS', 30))
+    lead = float(cfg.get('REORDER_LEAD_TIME_DAYS', 14))
+    z = float(cfg.get('REORDER_SERVICE_Z', 1.65))
+    cover = float(cfg.get('REORDER_COVER_DAYS', 30))
+    now = now or datetime.now()
+    first_day = (now - timedelta(days=window - 1)).date()
+
+    products = (db.session.query(WarehouseProduct.id, WarehouseProduct.item_number,
+                                 WarehouseProduct.quantity_on_hand)
+                .order_by(WarehouseProduct.id).all())
+    db.session.execute(delete(ReorderSuggestion))
+    if not products:
+        db.session.commit()
+        return 0
+
+    ids = np.array([p.id for p in products])
+    on_hand = np.array([p.quantity_on_hand or 0 for p in products], dtype=np.float64)
+    index = {}
+    for i, p in enumerate(products):
+        index.setdefault((p.item_number or '').strip().upper(), i)
+
+    usage = _daily_usage(datetime.combine(first_day, datetime.min.time()))
+    demand = np.zeros((len(products), window), dtype=np.float64)
+    if usage:
+        rows = np.array([index.get(num, -1) for num, _, _ in usage])
+        days = (np.array([str(day)[:10] for _, day, _ in usage], dtype='datetime64[D]')
+                - np.datetime64(first_day, 'D')).astype(np.int64)
+        qty = np.array([float(q or 0) for _, _, q in usage])
+        keep = (rows >= 0) & (days >= 0) & (days < window)
+        np.add.at(demand, (rows[keep], days[keep]), qty[keep])
+
+    # Newest day weighs 1, a day `half_life` older weighs 0.5
+    weights = 0.5 ** ((window - 1 - np.arange(window)) / half_life)
+    weights /= weights.sum()
+    daily = demand @ weights
+    std = np.sqrt(((demand - daily[:, None]) ** 2) @ weights)
+
+    reorder_point = np.ceil(daily * lead + z * std * np.sqrt(lead))
+    order_qty = np.maximum(np.ceil(reorder_point + daily * cover - on_hand), 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_of_cover = np.where(daily > 0, on_hand / daily, np.nan)
+
+    used = np.flatnonzero(daily > 0)
+    if used.size:
+        db.session.execute(insert(ReorderSuggestion), [
+            {'product_id': pid, 'daily_usage': round(d, 4), 'usage_std': round(s, 4),
+             'reorder_point': int(rp), 'order_qty': int(q), 'days_of_cover': round(c, 1),
+             'computed_at': now}
+            for pid, d, s, rp, q, c in zip(ids[used].tolist(), daily[used].tolist(), std[used].tolist(),
+                                           reorder_point[used].tolist(), order_qty[used].tolist(),
+                                           days_of_cover[used].tolist())
+        ])
+    db.session.commit()
+    return int(used.size)
+
+
+@click.command('forecast-reorder')
+@with_appcontext
+def forecast_reorder_command():
+    """Recompute reorder point/quantity suggestions from recent billed usage."""
+    click.echo(f'{compute_suggestions()} product suggestion(s) written.')
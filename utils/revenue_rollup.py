@@ -0,0 +1,149 @@
+# utils/revenue_rollup.py
+"""
+Monthly billed trailer revenue rollup (billed_revenue_month).
+
+One row per (month billed, job number, tooling list) with invoice count,
+line count and revenue. bill_invoice/unbill_invoice (utils/invoice_lines.py)
+apply each invoice's totals as a delta with an atomic upsert, so the metrics
+page reads a few dozen pre-summed rows instead of touching invoices.
+The (job, list) key is saved on the invoice when it is billed and
+unbilling reverses that saved cell, so editing a billed trailer's job or
+list never splits its revenue across two cells. `flask
+rebuild-revenue-rollup` recomputes everything from invoice_line (both
+tiers) using the same saved keys.
+"""
+from datetime import date
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, func, update
+
+from database import db, month_bucket, as_month
+from models import (
+    BilledRevenueMonth, Invoice, InvoiceLine, ArchivedInvoice, ArchivedInvoiceLine, Trailer, ArchivedTrailer,
+)
+from utils.tooling_list_versions import list_name_for
+
+
+def _month(dt):
+    return date(dt.year, dt.month, 1)
+
+
+def _upsert(rows):
+    """Add each row's counts/revenue to its (month, job, list) cell, creating it if needed."""
+    if not rows:
+        return
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(BilledRevenueMonth)
+    t = BilledRevenueMonth.__table__
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['month', 'job_number', 'tooling_list_name'],
+        set_={
+            'job_name': stmt.excluded.job_name,
+            'invoice_count': t.c.invoice_count + stmt.excluded.invoice_count,
+            'line_count': t.c.line_count + stmt.excluded.line_count,
+            'revenue': t.c.revenue + stmt.excluded.revenue,
+        })
+    db.session.execute(stmt, rows)
+
+
+def apply_invoice(invoice, sign):
+    """Add (sign=1) or remove (sign=-1) a billed invoice's current lines. Call with lines in place. No commit.
+
+    Adding saves the trailer's job/list on the invoice; removing reverses
+    that saved cell (the trailer's current values only for invoices billed
+    before the key was stored).
+    """
+    if invoice.billed_at is None:
+        return
+    lines, revenue = (db.session.query(func.count(InvoiceLine.id), func.coalesce(func.sum(InvoiceLine.line_total), 0.0))
+                      .filter(InvoiceLine.invoice_id == invoice.id).one())
+    trailer = db.session.get(Trailer, invoice.trailer_id)
+    if sign > 0 or invoice.billed_job_number is None:
+        invoice.billed_job_number = (trailer.job_number if trailer else None) or ''
+        invoice.billed_list_name = (list_name_for(trailer) if trailer else None) or ''
+    if not lines:
+        return
+    _upsert([{
+        'month': _month(invoice.billed_at),
+        'job_number': invoice.billed_job_number,
+        'job_name': trailer.job_name if trailer else None,
+        'tooling_list_name': invoice.billed_list_name or '',
+        'invoice_count': sign,
+        'line_count': sign * lines,
+        'revenue': sign * float(revenue),
+    }])
+
+
+def rebuild_revenue_rollup():
+    """Recompute the whole rollup from invoice_line and invoice_line_archive. Commits; returns row count."""
+    cells = {}
+    for line_model, inv_model, trailer_model in ((InvoiceLine, Invoice, Trailer),
+                                                 (ArchivedInvoiceLine, ArchivedInvoice, ArchivedTrailer)):
+        job_col = func.coalesce(inv_model.billed_job_number, trailer_model.job_number, '')
+        list_col = func.coalesce(inv_model.billed_list_name,
+                                 func.trim(func.coalesce(trailer_model.tooling_list_name,
+                                                         trailer_model.inventory_type, '')))
+        rows = (db.session.query(month_bucket(line_model.billed_at).label('month'),
+                                 job_col.label('job_number'),
+                                 func.max(trailer_model.job_name).label('job_name'),
+                                 list_col.label('list_name'),
+                                 func.count(func.distinct(line_model.invoice_id)),
+                                 func.count(line_model.id),
+                                 func.coalesce(func.sum(line_model.line_total), 0.0))
+                .join(inv_model, inv_model.id == line_model.invoice_id)
+                .join(trailer_model, trailer_model.id == line_model.trailer_id)
+                .filter(line_model.billed_at.isnot(None))
+                .group_by('month', 'job_number', 'list_name')
+                .all())
+        for month, job_number, job_name, list_name, invoices, lines, revenue in rows:
+            key = (_month(as_month(month)), job_number, list_name)
+            cell = cells.setdefault(key, {'month': key[0], 'job_number': job_number, 'job_name': job_name,
+                                          'tooling_list_name': list_name, 'invoice_count': 0,
+                                          'line_count': 0, 'revenue': 0.0})
+            cell['invoice_count'] += invoices
+            cell['line_count'] += lines
+            cell['revenue'] += float(revenue)
+    db.session.execute(delete(BilledRevenueMonth))
+    if cells:
+        db.session.execute(BilledRevenueMonth.__table__.insert(), list(cells.values()))
+    db.session.commit()
+    return len(cells)
+
+
+def backfill_rollup_keys():
+    """Save the rollup key on billed invoices from before it was stored, then rebuild. Commits; returns count."""
+    done = 0
+    for inv_model, trailer_model in ((Invoice, Trailer), (ArchivedInvoice, ArchivedTrailer)):
+        t = trailer_model
+        job = (db.select(func.coalesce(t.job_number, '')).where(t.id == inv_model.trailer_id)
+               .scalar_subquery())
+        list_name = (db.select(func.trim(func.coalesce(t.tooling_list_name, t.inventory_type, '')))
+                     .where(t.id == inv_model.trailer_id).scalar_subquery())
+        done += db.session.execute(
+            update(inv_model)
+            .where(inv_model.billed_at.isnot(None), inv_model.billed_job_number.is_(None))
+            .values(billed_job_number=job, billed_list_name=list_name)
+            .execution_options(synchronize_session=False)).rowcount
+    db.session.commit()
+    if done:
+        rebuild_revenue_rollup()  # earlier trailer edits may have split cells
+    return done
+
+
+def ensure_revenue_rollup():
+    """Build the rollup on first boot after upgrading (empty table, billed lines present)."""
+    if db.session.query(BilledRevenueMonth.id).first() is None and (
+            db.session.query(InvoiceLine.id).first() is not None
+            or db.session.query(ArchivedInvoiceLine.id).first() is not None):
+        rebuild_revenue_rollup()
+
+
+@click.command('rebuild-revenue-rollup')
+@with_appcontext
+def rebuild_revenue_rollup_command():
+    """Recompute billed_revenue_month from all billed invoice lines."""
+    click.echo(f'{rebuild_revenue_rollup()} rollup row(s) written.')
@@ -0,0 +1,144 @@
+# utils/stock_ledger.py
+"""
+Append-only stock movement ledger for WarehouseProduct.quantity_on_hand.
+
+Every code path that changes stock goes through record_movement() /
+set_quantity() so the change is written to `stock_movement` in the same
+transaction. Products that predate the ledger get an opening balance when
+init_db migrates (and again before each snapshot run, for rows written by
+raw SQL). `snapshot-stock` (run from cron) writes a StockSnapshot per
+product, so stock_as_of() only has to read one snapshot plus the ledger
+rows written after it.
+"""
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, insert
+
+from database import db
+from models import StockMovement, StockSnapshot, WarehouseProduct
+from utils.change_log import record_bulk
+
+# Movement reasons (stored in stock_movement.reason)
+OPENING_BALANCE = 'opening_balance'
+IMPORT = 'import'
+MANUAL_ADD = 'manual_add'
+MANUAL_EDIT = 'manual_edit'
+PRODUCT_DELETE = 'product_delete'
+TRAILER_INVOICE = 'trailer_invoice'
+ORDER_SALE = 'order_sale'
+ORDER_PURCHASE = 'order_purchase'
+
+
+def record_movement(product, delta, reason, source_id=None):
+    """Apply `delta` to product.quantity_on_hand and append a ledger row (no commit)."""
+    delta = int(delta or 0)
+    if not delta:
+        return None
+    product.quantity_on_hand = (product.quantity_on_hand or 0) + delta
+    movement = StockMovement(
+        product=product,
+        item_number=product.item_number,
+        delta=delta,
+        reason=reason,
+        source_id=source_id,
+    )
+    db.session.add(movement)
+    return movement
+
+
+def set_quantity(product, new_qty, reason, source_id=None):
+    """Set quantity_on_hand to `new_qty`, recording the difference as a movement."""
+    return record_movement(product, int(new_qty or 0) - (product.quantity_on_hand or 0), reason, source_id)
+
+
+def stock_as_of(product_id, when):
+    """Return the quantity on hand for `product_id` at `when` (database clock: UTC on SQLite)."""
+    snap = (StockSnapshot.query
+            .filter(StockSnapshot.product_id == product_id, StockSnapshot.taken_at <= when)
+            .order_by(StockSnapshot.taken_at.desc(), StockSnapshot.id.desc())
+            .first())
+    base_qty = snap.quantity if snap else 0
+    after_id = snap.last_movement_id if snap else 0
+
+    delta = (db.session.query(func.coalesce(func.sum(StockMovement.delta), 0))
+             .filter(StockMovement.product_id == product_id,
+                     StockMovement.id > after_id,
+                     StockMovement.created_at <= when)
+             .scalar())
+    return base_qty + int(delta or 0)
+
+
+def _ensure_opening_balances():
+    """Give each product without an opening balance one for whatever its ledger doesn't explain.
+
+    The opening delta is quantity_on_hand minus the movements already
+    recorded, dated when the product was created, so a pre-ledger product
+    that moved before its first snapshot still sums to quantity_on_hand.
+    """
+    ledger = (db.session.query(StockMovement.product_id, func.sum(StockMovement.delta).label('total'))
+              .filter(StockMovement.product_id.isnot(None))
+              .group_by(StockMovement.product_id)
+              .subquery())
+    opened = db.session.query(StockMovement.product_id).filter(StockMovement.reason == OPENING_BALANCE)
+    gap = func.coalesce(WarehouseProduct.quantity_on_hand, 0) - func.coalesce(ledger.c.total, 0)
+    rows = (db.session.query(WarehouseProduct.id, WarehouseProduct.item_number, gap, WarehouseProduct.created_at)
+            .outerjoin(ledger, ledger.c.product_id == WarehouseProduct.id)
+            .filter(~WarehouseProduct.id.in_(opened), gap != 0)
+            .all())
+    if rows:
+        ids = db.session.scalars(insert(StockMovement).returning(StockMovement.id), [
+            {'product_id': pid, 'item_number': num, 'delta': int(delta), 'reason': OPENING_BALANCE,
+             'created_at': created_at}
+            for pid, num, delta, created_at in rows]).all()
+        record_bulk('stock_movement', ids, 'insert')
+    return len(rows)
+
+
+def backfill_opening_balances():
+    """Write opening balances at migration time, before products start moving. Commits."""
+    count = _ensure_opening_balances()
+    db.session.commit()
+    return count
+
+
+def take_snapshots():
+    """Write one StockSnapshot per product that moved since its last snapshot. Returns count."""
+    _ensure_opening_balances()
+
+    latest_ids = (db.session.query(func.max(StockSnapshot.id))
+                  .group_by(StockSnapshot.product_id))
+    latest = {s.product_id: s for s in StockSnapshot.query.filter(StockSnapshot.id.in_(latest_ids)).all()}
+
+    # One grouped pass over the ledger: sum/max per product since its last snapshot
+    last = (db.session.query(StockSnapshot.product_id, StockSnapshot.last_movement_id)
+            .filter(StockSnapshot.id.in_(latest_ids))
+            .subquery())
+    rows = (db.session.query(
+                StockMovement.product_id,
+                func.sum(StockMovement.delta).label('delta'),
+                func.max(StockMovement.id).label('max_id'))
+            .outerjoin(last, last.c.product_id == StockMovement.product_id)
+            .filter(StockMovement.product_id.isnot(None))
+            .filter(StockMovement.id > func.coalesce(last.c.last_movement_id, 0))
+            .group_by(StockMovement.product_id)
+            .all())
+
+    now = func.now()  # same clock as StockMovement.created_at
+    for row in rows:
+        prev = latest.get(row.product_id)
+        db.session.add(StockSnapshot(
+            product_id=row.product_id,
+            quantity=(prev.quantity if prev else 0) + int(row.delta or 0),
+            last_movement_id=row.max_id,
+            taken_at=now,
+        ))
+    db.session.commit()
+    return len(rows)
+
+
+@click.command('snapshot-stock')
+@with_appcontext
+def snapshot_stock_command():
+    """Write stock snapshots (schedule daily so as-of lookups stay short)."""
+    count = take_snapshots()
+    click.echo(f'Wrote {count} stock snapshot(s).')
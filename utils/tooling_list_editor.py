@@ -0,0 +1,146 @@
+# utils/tooling_list_editor.py
+"""
+Whole-list edits for ToolingListItem.
+
+The billing list editor sends the complete edited list (existing rows carry
+their id, new rows don't; order = position). apply_list_batch() diffs that
+against the DB and applies every delete/update/insert with one bulk
+statement each, plus the new list version, in a single transaction.
+Paste-in text and XLSX uploads are parsed into the same shape and matched
+to existing rows by item number.
+"""
+import csv
+import io
+
+from sqlalchemy import delete, insert, update
+
+from database import db
+from models import ToolingListItem
+from utils.product_index import reindex_tooling_list
+from utils.product_categories import refresh_product_categories
+from utils.tooling_list_versions import publish_version
+from utils.tooling_lists import normalize_list
+
+FIELDS = ('item_number', 'item_name', 'category', 'quantity')
+
+# Header cells recognised in pasted text / uploaded sheets (lowercased)
+_HEADER_ALIASES = {
+    'item number': 'item_number', 'item #': 'item_number', 'item no': 'item_number', 'number': 'item_number',
+    'item name': 'item_name', 'name': 'item_name', 'description': 'item_name',
+    'category': 'category',
+    'quantity': 'quantity', 'qty': 'quantity',
+}
+
+
+class ListBatchError(ValueError):
+    """The submitted list can't be applied (bad ids, missing fields)."""
+
+
+def _clean(rows):
+    """Normalize text/category/quantity the same way the hardcoded lists are."""
+    normalized = normalize_list([{'Item Number': r.get('item_number'), 'Item Name': r.get('item_name'),
+                                  'Category': r.get('category'), 'Quantity': r.get('quantity')}
+                                 for r in rows])
+    out = []
+    for src, d in zip(rows, normalized):
+        out.append({'id': src.get('id'), 'item_number': d['Item Number'], 'item_name': d['Item Name'],
+                    'category': d['Category'], 'quantity': d['Quantity']})
+    return out
+
+
+def apply_list_batch(list_name, rows):
+    """Make `list_name` exactly `rows` (ordered). Returns {'added','updated','deleted','unchanged'}."""
+    if not isinstance(rows, list):
+        raise ListBatchError('items must be a list')
+    rows = _clean([r for r in rows if isinstance(r, dict)])
+    for i, r in enumerate(rows, 1):
+        if not r['item_number'] or not r['item_name']:
+            raise ListBatchError(f'row {i}: item number and item name are required')
+
+    existing = {it.id: it for it in ToolingListItem.query.filter_by(list_name=list_name)}
+    updates, inserts, kept = [], [], set()
+    for position, r in enumerate(rows):
+        values = {f: r[f] for f in FIELDS}
+        values['sort_order'] = position
+        item_id = r.get('id')
+        if item_id in (None, ''):
+            inserts.append(dict(values, list_name=list_name))
+            continue
+        try:
+            item_id = int(item_id)
+        except (TypeError, ValueError):
+            raise ListBatchError(f'row {position + 1}: bad id {item_id!r}')
+        current = existing.get(item_id)
+        if current is None or item_id in kept:
+            raise ListBatchError(f'row {position + 1}: item {item_id} is not in {list_name}')
+        kept.add(item_id)
+        if any(getattr(current, k) != v for k, v in values.items()):
+            updates.append(dict(values, id=item_id))
+    deletes = [i for i in existing if i not in kept]
+
+    if deletes:
+        db.session.execute(delete(ToolingListItem).where(ToolingListItem.id.in_(deletes)))
+    if updates:
+        db.session.execute(update(ToolingListItem), updates)  # bulk UPDATE by primary key
+    if inserts:
+        db.session.execute(insert(ToolingListItem), inserts)
+    if deletes or updates or inserts:
+        refresh_product_categories({it.item_number for it in existing.values()}
+                                   | {r['item_number'] for r in rows})
+        publish_version(list_name)
+    db.session.commit()
+    if deletes or updates or inserts:
+        reindex_tooling_list(list_name)
+    return {'added': len(inserts), 'updated': len(updates), 'deleted': len(deletes),
+            'unchanged': len(kept) - len(updates)}
+
+
+def replace_list(list_name, rows):
+    """Apply an id-less list (paste/upload), reusing existing rows that share an item number."""
+    by_number = {}
+    for it in ToolingListItem.query.filter_by(list_name=list_name):
+        by_number.setdefault((it.item_number or '').strip().upper(), it.id)
+    matched = []
+    for r in rows:
+        item_id = by_number.pop(str(r.get('item_number') or '').strip().upper(), None)
+        matched.append(dict(r, id=item_id))
+    return apply_list_batch(list_name, matched)
+
+
+def _rows_from_table(table):
+    """Map rows of cells to item dicts; a recognised header row sets the column order."""
+    table = [[str(c).strip() if c is not None else '' for c in row] for row in table]
+    table = [row for row in table if any(row)]
+    if not table:
+        return []
+    header = [_HEADER_ALIASES.get(c.lower()) for c in table[0]]
+    if 'item_number' in header and 'item_name' in header:
+        columns, body = header, table[1:]
+    else:
+        columns, body = list(FIELDS), table
+    out = []
+    for row in body:
+        item = {col: row[i] for i, col in enumerate(columns) if col and i < len(row)}
+        item.setdefault('category', 'General')
+        item.setdefault('quantity', 1)
+        out.append(item)
+    return out
+
+
+def parse_pasted_list(text):
+    """Rows pasted from a spreadsheet (tab-separated) or CSV: number, name, category, qty."""
+    text = (text or '').strip()
+    if not text:
+        return []
+    dialect = 'excel-tab' if '\t' in text.splitlines()[0] else 'excel'
+    return _rows_from_table(csv.reader(io.StringIO(text), dialect=dialect))
+
+
+def parse_xlsx_list(fileobj):
+    """First sheet of an uploaded workbook, same column rules as pasted text."""
+    import openpyxl
+    wb = openpyxl.load_workbook(fileobj, data_only=True, read_only=True)
+    try:
+        return _rows_from_table(wb.worksheets[0].iter_rows(values_only=True))
+    finally:
+        wb.close()
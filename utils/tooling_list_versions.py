@@ -0,0 +1,139 @@
+# utils/tooling_list_versions.py
+"""
+Immutable tooling list versions.
+
+ToolingListItem stays the editable copy of each list. publish_version()
+freezes its current contents into a ToolingListVersion (only when they
+changed, by content hash), and each trailer pins the version it was
+inventoried against. Forms, pull lists and invoices read the pinned
+version, so later list edits never change historical expected quantities.
+Version contents never change, so they are cached for the life of the
+process. Unpinned trailers read their list's latest version, so the live
+list is cached too: every list edit publishes a new version (a new cache
+key), which is how an edit invalidates it.
+"""
+import hashlib
+import json
+import threading
+
+from sqlalchemy import event, func, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models import Trailer, ToolingListVersion, ToolingListVersionItem
+from utils.tooling_lists import ToolingList, get_tooling_list
+from utils.change_log import record_bulk
+
+_items_cache = {}  # version_id -> ToolingList
+_cache_lock = threading.Lock()
+
+
+def list_name_for(trailer):
+    return (trailer.tooling_list_name or trailer.inventory_type or '').strip()
+
+
+def _content_hash(items):
+    rows = [(it.get('Item Number'), it.get('Item Name'), it.get('Category'), it.get('Quantity')) for it in items]
+    return hashlib.sha1(json.dumps(rows, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def latest_version(list_name):
+    return (ToolingListVersion.query.filter_by(list_name=list_name)
+            .order_by(ToolingListVersion.version.desc()).first())
+
+
+def publish_version(list_name):
+    """Return the version matching the list's current contents, creating it if needed (no commit)."""
+    items = get_tooling_list(list_name) or []
+    digest = _content_hash(items)
+    latest = latest_version(list_name)
+    if latest is not None and latest.content_hash == digest:
+        return latest
+    try:
+        with db.session.begin_nested():
+            version = ToolingListVersion(list_name=list_name, version=(latest.version if latest else 0) + 1,
+                                         content_hash=digest, item_count=len(items))
+            db.session.add(version)
+            db.session.flush()
+            if items:
+                db.session.execute(insert(ToolingListVersionItem), [
+                    {'version_id': version.id, 'item_number': it.get('Item Number'),
+                     'item_name': it.get('Item Name'), 'category': it.get('Category'),
+                     'quantity': it.get('Quantity') or 0, 'sort_order': i}
+                    for i, it in enumerate(items)
+                ])
+    except IntegrityError:
+        # Another worker published the same version number first; use theirs if it matches
+        latest = latest_version(list_name)
+        if latest is not None and latest.content_hash == digest:
+            return latest
+        raise
+    return version
+
+
+def get_version_items(version_id):
+    """A version's items as a ToolingList. Cached forever (versions are immutable)."""
+    cached = _items_cache.get(version_id)
+    if cached is not None:
+        return cached
+    rows = (db.session.query(ToolingListVersionItem.item_number, ToolingListVersionItem.item_name,
+                             ToolingListVersionItem.category, ToolingListVersionItem.quantity)
+            .filter(ToolingListVersionItem.version_id == version_id)
+            .order_by(ToolingListVersionItem.sort_order, ToolingListVersionItem.id)
+            .all())
+    version = db.session.get(ToolingListVersion, version_id)
+    items = ToolingList.from_rows(version.list_name if version else None, rows)
+    with _cache_lock:
+        _items_cache[version_id] = items
+    return items
+
+
+def pin_version(trailer):
+    """Pin `trailer` to its list's current version if it isn't pinned yet (no commit)."""
+    if trailer.tooling_list_version_id is None:
+        name = list_name_for(trailer)
+        if name:
+            trailer.tooling_list_version_id = publish_version(name).id
+    return trailer.tooling_list_version_id
+
+
+def current_list(list_name):
+    """The live list as of its latest published version (cached), or get_tooling_list() if never published."""
+    version_id = (db.session.query(ToolingListVersion.id).filter_by(list_name=list_name)
+                  .order_by(ToolingListVersion.version.desc()).limit(1).scalar())
+    if version_id is None:
+        return get_tooling_list(list_name)
+    return get_version_items(version_id)
+
+
+def get_tooling_list_for_trailer(trailer):
+    """The items `trailer` was inventoried against; the live list if it was never pinned."""
+    if trailer.tooling_list_version_id:
+        return get_version_items(trailer.tooling_list_version_id)
+    return current_list(list_name_for(trailer))
+
+
+def backfill_trailer_versions():
+    """Pin every started (non-Pending) unpinned trailer to its list's current version."""
+    name_col = func.trim(func.coalesce(Trailer.tooling_list_name, Trailer.inventory_type, ''))
+    names = [n for (n,) in (db.session.query(name_col)
+                            .filter(Trailer.tooling_list_version_id.is_(None), Trailer.status != 'Pending')
+                            .distinct()) if n]
+    for name in names:
+        version = publish_version(name)
+        unpinned = (Trailer.tooling_list_version_id.is_(None), Trailer.status != 'Pending', name_col == name)
+        ids = [i for (i,) in db.session.query(Trailer.id).filter(*unpinned)]
+        db.session.execute(update(Trailer)
+                           .where(*unpinned)
+                           .values(tooling_list_version_id=version.id)
+                           .execution_options(synchronize_session=False))
+        record_bulk('trailer', ids, 'update', ['tooling_list_version_id'])
+    db.session.commit()
+    return len(names)
+
+
+@event.listens_for(Trailer.tooling_list_name, 'set')
+def _unpin_on_list_change(target, value, oldvalue, initiator):
+    """Switching a trailer to another list drops its pin; it re-pins on next open/submit."""
+    if oldvalue not in (value, None) and isinstance(oldvalue, str):
+        target.tooling_list_version_id = None
@@ -52,6 +52,103 @@ def normalize_list(list_obj: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         out.append(d)
     return out
 
+class ToolingItem:
+    """One list row. Read-only; also answers item['Item Number'] / item.get('Quantity') like the old dicts."""
+    __slots__ = ("item_number", "item_name", "category", "quantity")
+
+    _KEYS = {"Item Number": "item_number", "Item Name": "item_name",
+             "Category": "category", "Quantity": "quantity"}
+
+    def __init__(self, item_number, item_name, category, quantity):
+        object.__setattr__(self, "item_number", item_number)
+        object.__setattr__(self, "item_name", item_name)
+        object.__setattr__(self, "category", category)
+        object.__setattr__(self, "quantity", quantity)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ToolingItem is immutable")
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, self._KEYS[key])
+        except KeyError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        attr = self._KEYS.get(key)
+        return getattr(self, attr) if attr else default
+
+    def keys(self):
+        return self._KEYS.keys()
+
+    def __repr__(self):
+        return f"<ToolingItem {self.item_number!r} x{self.quantity}>"
+
+
+class CategoryGroup(tuple):
+    """(category, items) — same .grouper / .list names as Jinja's groupby results."""
+    __slots__ = ()
+    grouper = property(lambda self: self[0])
+    list = property(lambda self: self[1])
+
+
+class ToolingList:
+    """
+    Immutable, indexed tooling list: a tuple of ToolingItem rows plus an
+    item-number index and category groups built once, so per-request code
+    doesn't rebuild them. Iterates/len()s like the old list of dicts.
+    """
+    __slots__ = ("name", "items", "by_number", "groups")
+
+    def __init__(self, name, items):
+        items = tuple(items)
+        by_number = {}
+        grouped = {}
+        for it in items:
+            by_number[it.item_number] = it
+            grouped.setdefault(it.category, []).append(it)
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "items", items)
+        object.__setattr__(self, "by_number", by_number)
+        # Sorted by category name, matching the templates' former |groupby('Category')
+        object.__setattr__(self, "groups", tuple(CategoryGroup((cat, tuple(rows)))
+                                                  for cat, rows in sorted(grouped.items(), key=lambda kv: kv[0] or "")))
+
+    @classmethod
+    def from_rows(cls, name, rows):
+        """Build from (item_number, item_name, category, quantity) tuples, cleaning text like normalize_list."""
+        return cls(name, (ToolingItem(_clean_text(num), _clean_text(item_name), _fix_category(cat), coerce_quantity(qty))
+                          for num, item_name, cat, qty in rows))
+
+    @classmethod
+    def from_dicts(cls, name, dicts):
+        return cls.from_rows(name, ((d.get("Item Number"), d.get("Item Name"), d.get("Category"), d.get("Quantity"))
+                                    for d in dicts))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ToolingList is immutable")
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def get(self, item_number):
+        """Row for `item_number` (stripped), or None."""
+        return self.by_number.get(str(item_number or "").strip())
+
+    def expected_qty(self, item_number):
+        row = self.get(item_number)
+        return row.quantity if row else 0
+
+    def __repr__(self):
+        return f"<ToolingList {self.name!r} items={len(self.items)}>"
+
+
 # Back-compat alias for any older imports/usages in your codebase
 def _normalize_tooling_list(list_obj, list_name=None):
     """
@@ -519,23 +616,24 @@ tooling_lists = {
 }
 
 # Normalize once at import so everyone gets clean integer quantities
-tooling_lists = {name: _normalize_tooling_list(items, name) for name, items in tooling_lists.items()}
+tooling_lists = {name: ToolingList.from_dicts(name, items) for name, items in tooling_lists.items()}
 
 def get_tooling_list(name: str):
     """Return tooling list items. Tries DB first, falls back to hardcoded."""
     key = (name or "").strip()
     try:
         from models import ToolingListItem
-        db_items = (ToolingListItem.query
-                    .filter_by(list_name=key)
-                    .order_by(ToolingListItem.sort_order, ToolingListItem.id)
-                    .all())
-        if db_items:
-            return [{'Item Number': it.item_number, 'Item Name': it.item_name,
-                     'Category': it.category, 'Quantity': it.quantity} for it in db_items]
+        from database import db
+        rows = (db.session.query(ToolingListItem.item_number, ToolingListItem.item_name,
+                                 ToolingListItem.category, ToolingListItem.quantity)
+                .filter(ToolingListItem.list_name == key)
+                .order_by(ToolingListItem.sort_order, ToolingListItem.id)
+                .all())
+        if rows:
+            return ToolingList.from_rows(key, rows)
     except Exception:
         pass
-    return tooling_lists.get(key, [])
+    return tooling_lists.get(key, ToolingList(key, ()))
 
 
 def get_all_list_names():
@@ -0,0 +1,170 @@
+# utils/trailer_events.py
+"""
+Trailer status-change pub/sub for the dashboard's server-sent events.
+
+Publishing happens inside the caller's transaction, so a rolled-back
+request never announces a change:
+
+  * PostgreSQL: `pg_notify('trailer_status', ...)` is queued in the same
+    transaction and delivered on commit to every worker. Each worker runs
+    one LISTEN thread that fans notifications out to its local subscribers.
+  * Other backends (single-box SQLite): there is no cross-process notify,
+    so each worker runs one thread that polls the change log (utils/
+    change_log.py, written in the same transaction as the status change)
+    every EVENT_POLL_SECONDS once the first dashboard has subscribed.
+
+Each open stream holds a gthread worker thread, so a worker serves at most
+EVENT_STREAMS_PER_WORKER streams; past that subscribe() returns None and
+the dashboard polls status_changes_since() instead.
+"""
+import json
+import queue
+import select
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import func, text
+
+from database import db
+from models import ChangeLog
+from utils import change_log  # noqa: F401 -- its after_flush hook writes the rows polled below
+
+CHANNEL = 'trailer_status'
+
+
+class _Broker:
+    """Fan-out of payload strings to per-connection queues (one process)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def publish(self, payload):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(payload)
+            except queue.Full:
+                pass  # slow client; it will resync on reconnect
+
+    def subscribe(self, limit=None):
+        """Register a new queue, or return None when `limit` subscribers are already open."""
+        with self._lock:
+            if limit and len(self._subscribers) >= limit:
+                return None
+            q = queue.Queue(maxsize=100)
+            self._subscribers.add(q)
+            return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+broker = _Broker()
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _is_postgres(engine):
+    return engine.dialect.name == 'postgresql'
+
+
+def publish_status_change(trailer, previous_status):
+    """Announce trailer.status if it differs from `previous_status` (call before commit)."""
+    if trailer.status == previous_status:
+        return
+    payload = json.dumps({
+        'id': trailer.id,
+        'status': trailer.status,
+        'previous': previous_status,
+    })
+    if _is_postgres(db.engine):
+        db.session.execute(text('SELECT pg_notify(:channel, :payload)'),
+                           {'channel': CHANNEL, 'payload': payload})
+    # Elsewhere the change log row written by this flush is what the pollers pick up
+
+
+# ---------- Change-log polling (SQLite fan-out and the dashboard's fallback) ----------
+def latest_cursor():
+    return db.session.query(func.coalesce(func.max(ChangeLog.id), 0)).scalar()
+
+
+def status_changes_since(cursor, limit=200):
+    """Trailer status payloads logged after `cursor`, plus the cursor to pass next time."""
+    rows = (ChangeLog.query
+            .filter(ChangeLog.entity == 'trailer', ChangeLog.id > cursor)
+            .order_by(ChangeLog.id).limit(limit).all())
+    payloads = [json.dumps({'id': r.entity_id, 'status': r.data['status']})
+                for r in rows
+                if r.action == 'update' and 'status' in (r.changed_fields or ()) and r.data]
+    return payloads, (rows[-1].id if rows else cursor)
+
+
+def _poll_forever(app, interval, cursor):
+    """Feed the broker from the change log (the cursor keeps moving even with no subscribers)."""
+    while True:
+        time.sleep(interval)
+        try:
+            with app.app_context():
+                payloads, cursor = status_changes_since(cursor)
+            if len(broker):
+                for payload in payloads:
+                    broker.publish(payload)
+        except Exception:
+            app.logger.exception('[EVENTS] change log poll failed')
+
+
+def _listen_forever(engine, logger):
+    """LISTEN on a dedicated (detached) connection and feed the broker; reconnects on error."""
+    while True:
+        try:
+            raw = engine.raw_connection()
+            raw.detach()  # keep this long-lived connection out of the pool
+            conn = raw.driver_connection
+            conn.set_isolation_level(0)  # autocommit so notifications arrive immediately
+            with conn.cursor() as cur:
+                cur.execute(f'LISTEN {CHANNEL}')
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    broker.publish(conn.notifies.pop(0).payload)
+        except Exception:
+            logger.exception('[EVENTS] LISTEN connection lost; retrying in 5s')
+            time.sleep(5)
+
+
+def ensure_listener():
+    """Start this process's LISTEN (PostgreSQL) or change-log polling thread once."""
+    global _listener
+    if _listener is not None:
+        return
+    engine = db.engine
+    with _listener_lock:
+        if _listener is None:
+            if _is_postgres(engine):
+                target, args = _listen_forever, (engine, current_app.logger)
+            else:
+                target = _poll_forever
+                args = (current_app._get_current_object(), current_app.config.get('EVENT_POLL_SECONDS', 1.0),
+                        latest_cursor())
+            _listener = threading.Thread(target=target, args=args, name='trailer-events-listener', daemon=True)
+            _listener.start()
+
+
+def subscribe():
+    """A Queue of JSON payload strings, or None if this worker is at EVENT_STREAMS_PER_WORKER."""
+    ensure_listener()
+    return broker.subscribe(current_app.config.get('EVENT_STREAMS_PER_WORKER', 4))
+
+
+def unsubscribe(q):
+    broker.unsubscribe(q)
@@ -0,0 +1,73 @@
+# utils/warmup.py
+"""
+Warm-up before a process takes traffic.
+
+warm_up() fills the per-process caches the first requests after a deploy
+would otherwise pay for: mapper configuration, compiled Jinja templates,
+tooling list versions with their pre-rendered form markup, the product
+search index, and the product/price queries behind invoices. gunicorn.conf.py runs it in the
+master before forking, so every worker shares the result. warm_pool() opens
+DB connections and must run in each worker (pools are per process).
+"""
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from database import db
+
+HEAVY_TEMPLATES = (
+    'inventory_form.html', 'inventory_form_items.html', 'billing_invoice.html',
+    'dashboard.html', 'dashboard_row.html', 'pull_list.html',
+)
+
+
+def warm_up(app):
+    """Fill template, tooling list and query caches. Returns a summary dict."""
+    from models import ItemPrice, WarehouseProduct
+    from utils.form_fragments import render_form_items
+    from utils.product_index import get_item_index
+    from utils.tooling_list_versions import get_version_items, publish_version
+    from utils.tooling_lists import get_all_list_names
+
+    started = time.perf_counter()
+    configure_mappers()
+    for name in HEAVY_TEMPLATES:
+        app.jinja_env.get_template(name)
+
+    lists = 0
+    with app.test_request_context():
+        for name in get_all_list_names():
+            version = publish_version(name)  # no-op unless the list changed since its last version
+            db.session.commit()
+            items = get_version_items(version.id)
+            render_form_items(items, version.id, False)
+            render_form_items(items, version.id, True)
+            lists += 1
+        indexed = len(get_item_index())
+        WarehouseProduct.query.all()
+        ItemPrice.query.all()
+        db.session.remove()
+
+    summary = {'templates': len(HEAVY_TEMPLATES), 'tooling_lists': lists, 'indexed_items': indexed,
+               'seconds': round(time.perf_counter() - started, 3)}
+    app.extensions['warmed_up'] = summary
+    app.logger.info(f"[WARMUP] {summary}")
+    return summary
+
+
+def warm_pool(app, connections=None):
+    """Check out and return `connections` connections per engine so the first requests don't connect."""
+    n = connections or app.config.get('WARMUP_POOL_CONNECTIONS', 2)
+    with app.app_context():
+        conns = []
+        try:
+            for engine in db.engines.values():  # primary and replica, if configured
+                for _ in range(n):
+                    conn = engine.connect()
+                    conns.append(conn)
+                    conn.execute(text('SELECT 1'))
+        finally:
+            for conn in conns:
+                conn.close()
+    return n